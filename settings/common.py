@@ -496,6 +496,22 @@ FEEDBACK_EMAIL = "support@taiga.io"
 STATS_ENABLED = False
 STATS_CACHE_TIMEOUT = 60*60  # In second
 
+# Per project stats (backlog, members and issues), invalidated on every change
+PROJECT_STATS_CACHE_TIMEOUT = 24*60*60  # In second
+
+# Markdown render cache settings
+MDRENDER_CACHE_TIMEOUT = 7*24*60*60  # In second
+MDRENDER_CACHE_LOCAL_SIZE = 1000  # Rendered texts kept in the in-process cache
+
+# Orders of the user stories and tasks lists, spaced so a moved element
+# doesn't shift the rest. A list is spaced again in background when a move
+# shifts more elements than the threshold
+ORDERS_STRIDE = 1000
+ORDERS_REBALANCE_THRESHOLD = 50
+
+# Timeline module settings
+TIMELINE_VISIBILITY_CACHE_TIMEOUT = 24*60*60  # In second
+
 # 0 notifications will work in a synchronous way
 # >0 an external process will check the pending notifications and will send them
 # collapsed during that interval
@@ -519,6 +535,10 @@ EXPORTS_TTL = 60 * 60 * 24  # 24 hours
 
 CELERY_ENABLED = False
 WEBHOOKS_ENABLED = False
+WEBHOOKS_REQUEST_TIMEOUT = 10  # In second
+WEBHOOKS_MAX_CONCURRENCY = 10  # Requests sent at once by a worker
+WEBHOOKS_MAX_RETRIES = 2
+WEBHOOKS_RETRY_BACKOFF = 0.5  # In second, doubled on every retry
 
 
 # If is True /front/sitemap.xml show a valid sitemap of taiga-front client
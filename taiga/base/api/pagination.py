@@ -23,12 +23,17 @@ from django.core.paginator import (
     Paginator,
     InvalidPage,
 )
+from django.db.models import Q
 from django.http import Http404
 from django.utils.translation import ugettext as _
 
 from .settings import api_settings
 from .templatetags.api import replace_query_param
 
+import base64
+import binascii
+import datetime
+import json
 import warnings
 
 
@@ -128,6 +133,95 @@ class LazyPaginator(Paginator):
     page_range = property(_get_page_range)
 
 
+class CursorPage(object):
+    """
+    Page of a keyset (cursor) paginated queryset.
+
+    The next page is obtained filtering by the ordering values of the last
+    object of this page, so the cost of a page is constant whatever the
+    depth instead of growing with the OFFSET.
+    """
+
+    def __init__(self, object_list, per_page, next_cursor=None):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class CursorPaginator(object):
+    """Implement keyset (cursor) pagination over a fixed ordering."""
+
+    def __init__(self, object_list, per_page, ordering):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.ordering = ordering
+
+    def _get_fields(self):
+        opts = self.object_list.model._meta
+        return [opts.get_field(field.lstrip("-")) for field in self.ordering]
+
+    def encode_cursor(self, obj):
+        # Datetimes are serialized with full precision (DjangoJSONEncoder
+        # truncates microseconds) so no object is skipped or repeated.
+        values = []
+        for field in self._get_fields():
+            value = getattr(obj, field.attname)
+            if isinstance(value, (datetime.datetime, datetime.date)):
+                value = value.isoformat()
+            values.append(value)
+
+        data = json.dumps(values).encode("utf-8")
+        return base64.urlsafe_b64encode(data).decode("ascii")
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        except (ValueError, UnicodeError, binascii.Error):
+            raise InvalidPage("Invalid cursor")
+
+        fields = self._get_fields()
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise InvalidPage("Invalid cursor")
+
+        try:
+            return [field.to_python(value) for field, value in zip(fields, values)]
+        except Exception:
+            raise InvalidPage("Invalid cursor")
+
+    def get_cursor_filter(self, values):
+        """
+        Build the filter for the objects after `values`, i.e.
+        (a > va) OR (a = va AND b > vb) OR ... honoring each field direction.
+        """
+        cursor_filter = Q()
+        for i, field in enumerate(self.ordering):
+            conditions = {f.lstrip("-"): v for f, v in zip(self.ordering[:i], values[:i])}
+            lookup = "{}__lt" if field.startswith("-") else "{}__gt"
+            conditions[lookup.format(field.lstrip("-"))] = values[i]
+            cursor_filter |= Q(**conditions)
+        return cursor_filter
+
+    def page(self, cursor=None):
+        qs = self.object_list.order_by(*self.ordering)
+        if cursor:
+            qs = qs.filter(self.get_cursor_filter(self.decode_cursor(cursor)))
+
+        # Retrieve one more object to check if there is a next page.
+        objects = list(qs[:self.per_page + 1])
+        next_cursor = None
+        if len(objects) > self.per_page:
+            objects = objects[:self.per_page]
+            next_cursor = self.encode_cursor(objects[-1])
+
+        return CursorPage(objects, self.per_page, next_cursor)
+
+
 class PaginationMixin(object):
     # Pagination settings
     paginate_by = api_settings.PAGINATE_BY
@@ -136,6 +230,12 @@ class PaginationMixin(object):
     page_kwarg = 'page'
     paginator_class = Paginator
 
+    # Keyset (cursor) pagination settings. Views with a stable and unique
+    # ordering, eg. ("-created", "-id"), can set it to allow clients to
+    # paginate with ?cursor=<value of x-pagination-cursor-next header>.
+    cursor_param = 'cursor'
+    cursor_ordering = None
+
     def get_paginate_by(self, queryset=None, **kwargs):
         """
         Return the size of pages to use with pagination.
@@ -172,6 +272,9 @@ class PaginationMixin(object):
         if "HTTP_X_DISABLE_PAGINATION" in self.request.META:
             return None
 
+        if self.cursor_ordering and self.cursor_param in self.request.QUERY_PARAMS:
+            return self.paginate_queryset_by_cursor(queryset)
+
         if "HTTP_X_LAZY_PAGINATION" in self.request.META:
             self.paginator_class = LazyPaginator
 
@@ -244,5 +347,36 @@ class PaginationMixin(object):
 
         return page
 
+    def paginate_queryset_by_cursor(self, queryset):
+        """
+        Paginate a queryset using keyset pagination over `cursor_ordering`,
+        returning a `CursorPage` or `None` if pagination is not configured
+        for this view.
+        """
+        page_size = self.get_paginate_by()
+        if not page_size:
+            return None
+
+        paginator = CursorPaginator(queryset, page_size, self.cursor_ordering)
+        cursor = self.request.QUERY_PARAMS.get(self.cursor_param)
+        try:
+            page = paginator.page(cursor)
+        except InvalidPage as e:
+            raise Http404(_('Invalid cursor (%(cursor)s): %(message)s') % {
+                                'cursor': cursor,
+                                'message': str(e)
+            })
+
+        self.headers["x-paginated"] = "true"
+        self.headers["x-paginated-by"] = page.per_page
+
+        if page.has_next():
+            url = self.request.build_absolute_uri()
+            url = replace_query_param(url, self.cursor_param, page.next_cursor)
+            self.headers["X-Pagination-Next"] = url
+            self.headers["x-pagination-cursor-next"] = page.next_cursor
+
+        return page
+
     def get_pagination_serializer(self, page):
         return self.get_serializer(page.object_list, many=True)
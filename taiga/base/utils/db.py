@@ -18,16 +18,24 @@
 
 from django.contrib.contenttypes.models import ContentType
 from django.db import connection
+from django.db import models
 from django.db import transaction
 from django.shortcuts import _get_queryset
 
 from django_pglocks import advisory_lock
 
 from . import functions
+from .iterators import split_by_n
+
+from contextlib import closing
+from operator import itemgetter
 
 import re
 
 
+BULK_UPDATE_CHUNK_SIZE = 5000
+
+
 def get_object_or_none(klass, *args, **kwargs):
     """
     Uses get() to return an object, or None if the object does not exist.
@@ -121,28 +129,56 @@ def update_in_bulk(instances, list_of_new_values, callback=None, precall=None):
         callback(instance)
 
 
-def update_attr_in_bulk_for_ids(values, attr, model):
+def _get_array_type(field):
+    # Serial columns are plain integers when used as values
+    if isinstance(field, models.AutoField):
+        return "integer"
+    return field.db_type(connection)
+
+
+@transaction.atomic
+def update_attr_in_bulk_for_ids(values, attr, model, filters=None, chunk_size=BULK_UPDATE_CHUNK_SIZE):
     """Update a table using a list of ids.
 
+    The ids and the new values are bound as two arrays and unnested in the
+    database, so every statement is the same whatever the number of elements.
+
     :params values: Dict of new values where the key is the pk of the element to update.
     :params attr: attr to update
     :params model: Model of the ids.
+    :params filters: Dict of extra column values the updated rows must match.
+    :params chunk_size: Max number of elements updated by each statement.
     """
-    values = [str((id, order)) for id, order in values.items()]
+    if not values:
+        return
+
+    tbl = model._meta.db_table
+    pk = model._meta.pk
+    field = model._meta.get_field(attr)
+    filters = filters or {}
+
+    where = "".join(' AND "{tbl}"."{column}" = %s'.format(tbl=tbl, column=column)
+                    for column in sorted(filters))
     sql = """
-        UPDATE {tbl}
-        SET {attr}=update_values.column2
-        FROM (
-          VALUES
-            {values}
-        ) AS update_values
-        WHERE {tbl}.id=update_values.column1;
-    """.format(tbl=model._meta.db_table,
-               values=', '.join(values),
-               attr=attr)
-
-    cursor = connection.cursor()
-    cursor.execute(sql)
+        UPDATE "{tbl}"
+           SET "{column}" = "update_values"."value"
+          FROM unnest(%s::{pk_type}[], %s::{value_type}[]) AS "update_values"("id", "value")
+         WHERE "{tbl}"."{pk}" = "update_values"."id"{where};
+    """.format(tbl=tbl,
+               column=field.column,
+               pk=pk.column,
+               pk_type=_get_array_type(pk),
+               value_type=_get_array_type(field),
+               where=where)
+    filters_params = [filters[column] for column in sorted(filters)]
+
+    # Rows are always updated in the same order to avoid deadlocks between
+    # concurrent updates
+    items = sorted(values.items(), key=itemgetter(0))
+    with closing(connection.cursor()) as cursor:
+        for chunk in split_by_n(items, chunk_size):
+            ids, new_values = zip(*chunk)
+            cursor.execute(sql, [list(ids), list(new_values)] + filters_params)
 
 
 def to_tsquery(term):
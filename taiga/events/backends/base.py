@@ -15,16 +15,31 @@
 
 import abc
 import importlib
+import threading
 
 from django.core.exceptions import ImproperlyConfigured
 from django.conf import settings
 
 
 class BaseEventsPushBackend(object, metaclass=abc.ABCMeta):
+    # Max size in bytes of a message, None means no limit
+    max_message_size = None
+
     @abc.abstractmethod
     def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
         pass
 
+    def emit_events(self, events):
+        """
+        Emit many events at once. `events` is an iterable of
+        (message, routing_key, channel) tuples.
+
+        Backends that can publish several events in one go should
+        override it.
+        """
+        for message, routing_key, channel in events:
+            self.emit_event(message, routing_key=routing_key, channel=channel)
+
 
 def load_class(path):
     """
@@ -46,6 +61,10 @@ def load_class(path):
     return klass
 
 
+_backends = {}
+_backends_lock = threading.Lock()
+
+
 def get_events_backend(path:str=None, options:dict=None):
     if path is None:
         path = getattr(settings, "EVENTS_PUSH_BACKEND", None)
@@ -56,5 +75,12 @@ def get_events_backend(path:str=None, options:dict=None):
     if options is None:
         options = getattr(settings, "EVENTS_PUSH_BACKEND_OPTIONS", {})
 
-    cls = load_class(path)
-    return cls(**options)
+    # Backends keep their connections open, so they are built once per
+    # process and configuration
+    key = (path, repr(sorted(options.items())))
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            cls = load_class(path)
+            backend = _backends[key] = cls(**options)
+    return backend
@@ -13,13 +13,34 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import logging
+
+from contextlib import closing
+
 from django.db import transaction
 from django.db import connection
 
 from . import base
 
+log = logging.getLogger("taiga.events")
+
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_SIZE = 7999
+
+# Notifications sent per pg_notify statement
+NOTIFY_BATCH_SIZE = 500
+
+
+def _make_channel_name(routing_key:str, channel:str) -> str:
+    routing_key = routing_key.replace(".", "__")
+    # pg_notify takes the name as is, so fold it like the NOTIFY identifiers
+    return "{channel}_{routing_key}".format(channel=channel, routing_key=routing_key).lower()
+
 
 class EventsPushBackend(base.BaseEventsPushBackend):
+    max_message_size = MAX_PAYLOAD_SIZE
+
     @transaction.atomic
     def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
         routing_key = routing_key.replace(".", "__")
@@ -29,3 +50,26 @@ class EventsPushBackend(base.BaseEventsPushBackend):
         cursor = connection.cursor()
         cursor.execute(sql, [message])
         cursor.close()
+
+    @transaction.atomic
+    def emit_events(self, events):
+        """
+        Send all the notifications with one pg_notify statement per
+        NOTIFY_BATCH_SIZE events instead of one NOTIFY per event.
+        """
+        channels = []
+        payloads = []
+        for message, routing_key, channel in events:
+            if len(message.encode("utf-8")) > self.max_message_size:
+                log.error("Event payload for '%s' exceeds %s bytes, it is not sent",
+                          routing_key, self.max_message_size)
+                continue
+
+            channels.append(_make_channel_name(routing_key, channel))
+            payloads.append(message)
+
+        sql = "SELECT pg_notify(t.channel, t.payload) FROM unnest(%s::text[], %s::text[]) AS t(channel, payload)"
+        with closing(connection.cursor()) as cursor:
+            for i in range(0, len(payloads), NOTIFY_BATCH_SIZE):
+                cursor.execute(sql, [channels[i:i + NOTIFY_BATCH_SIZE],
+                                     payloads[i:i + NOTIFY_BATCH_SIZE]])
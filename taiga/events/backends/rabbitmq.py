@@ -15,7 +15,10 @@
 
 import json
 import logging
+import os
+import threading
 
+from collections import deque
 from amqp import Connection as AmqpConnection
 from amqp.basic_message import Message as AmqpMessage
 from urllib.parse import urlparse
@@ -45,22 +48,80 @@ def _make_rabbitmq_connection(url):
 
 
 class EventsPushBackend(base.BaseEventsPushBackend):
+    """
+    Publish the events through one AMQP connection and channel per process.
+
+    The connection is opened lazily on the first event, reopened after a
+    fork or a failure, and every exchange is declared only once per
+    connection.
+    """
     def __init__(self, url):
         self.url = url
+        self._lock = threading.RLock()
+        self._pid = None
+        self._connection = None
+        self._channel = None
+        self._declared_exchanges = set()
+
+    def _get_channel(self):
+        if self._pid != os.getpid():
+            # Connections can not be shared with the parent process after a fork
+            self._connection = None
+            self._channel = None
+            self._declared_exchanges = set()
+
+        if self._channel is None:
+            self._connection = _make_rabbitmq_connection(self.url)
+            self._channel = self._connection.channel()
+            self._pid = os.getpid()
+
+        return self._channel
+
+    def _close(self):
+        connection = self._connection
+        self._connection = None
+        self._channel = None
+        self._declared_exchanges = set()
+
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                log.debug("Error closing the AMQP connection", exc_info=True)
+
+    def _publish(self, events):
+        """
+        Publish the events of the `events` deque, removing each one once it
+        is published, so a retry only sends the remaining ones (the one that
+        failed may be sent twice).
+        """
+        rchannel = self._get_channel()
+        while events:
+            message, routing_key, channel = events[0]
+            if channel not in self._declared_exchanges:
+                rchannel.exchange_declare(exchange=channel, type="topic", auto_delete=True)
+                self._declared_exchanges.add(channel)
+
+            rchannel.basic_publish(AmqpMessage(message), routing_key=routing_key, exchange=channel)
+            events.popleft()
+
+    def emit_events(self, events):
+        events = deque(events)
+        if not events:
+            return
+
+        with self._lock:
+            try:
+                self._publish(events)
+            except Exception:
+                # The broker may have closed a stale connection, so retry
+                # once with a new one before giving up
+                self._close()
+                try:
+                    self._publish(events)
+                except Exception:
+                    self._close()
+                    log.error("Unhandled exception", exc_info=True)
 
     def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
-        connection = _make_rabbitmq_connection(self.url)
-
-        try:
-            rchannel = connection.channel()
-            message = AmqpMessage(message)
-
-            rchannel.exchange_declare(exchange=channel, type="topic", auto_delete=True)
-            rchannel.basic_publish(message, routing_key=routing_key, exchange=channel)
-            rchannel.close()
-
-        except Exception:
-            log.error("Unhandled exception", exc_info=True)
-
-        finally:
-            connection.close()
+        self.emit_events([(message, routing_key, channel)])
@@ -83,12 +83,7 @@ def emit_event_for_model(obj, *, type:str="change", channel:str="events",
                       data=data)
 
 
-def emit_event_for_ids(ids, content_type:str, projectid:int, *,
-                       type:str="change", channel:str="events", sessionid:str=None):
-    assert type in set(["create", "change", "delete"])
-    assert isinstance(ids, collections.Iterable)
-    assert content_type, "'content_type' parameter is mandatory"
-
+def _make_event_for_ids(ids, content_type:str, projectid:int, *, type:str="change"):
     app_name, model_name = content_type.split(".", 1)
     routing_key = "changes.project.{0}.{1}".format(projectid, app_name)
 
@@ -96,7 +91,54 @@ def emit_event_for_ids(ids, content_type:str, projectid:int, *,
             "matches": content_type,
             "pk": ids}
 
+    return routing_key, data
+
+
+def emit_event_for_ids(ids, content_type:str, projectid:int, *,
+                       type:str="change", channel:str="events", sessionid:str=None):
+    assert type in set(["create", "change", "delete"])
+    assert isinstance(ids, collections.Iterable)
+    assert content_type, "'content_type' parameter is mandatory"
+
+    routing_key, data = _make_event_for_ids(ids, content_type, projectid, type=type)
+
     return emit_event(routing_key=routing_key,
                       channel=channel,
                       sessionid=sessionid,
                       data=data)
+
+
+def _make_messages_for_ids(ids, content_type:str, projectid:int, type:str, sessionid:str,
+                           max_size:int=None):
+    """
+    Build the messages of a change event, splitting the pk list in as
+    many messages as needed to fit in `max_size` bytes.
+    """
+    routing_key, data = _make_event_for_ids(ids, content_type, projectid, type=type)
+    message = json.dumps({"session_id": sessionid, "data": data})
+
+    if (max_size is None or len(message.encode("utf-8")) <= max_size or
+            not isinstance(ids, list) or len(ids) < 2):
+        return [(message, routing_key)]
+
+    half = len(ids) // 2
+    return (_make_messages_for_ids(ids[:half], content_type, projectid, type, sessionid, max_size) +
+            _make_messages_for_ids(ids[half:], content_type, projectid, type, sessionid, max_size))
+
+
+def emit_events_for_ids(groups, *, channel:str="events"):
+    """
+    Sends one change event per group with all the backend messages
+    published at once. `groups` is an iterable of
+    (ids, content_type, projectid, type, sessionid) tuples.
+    """
+    backend = backends.get_events_backend()
+
+    messages = []
+    for ids, content_type, projectid, type, sessionid in groups:
+        assert type in set(["create", "change", "delete"])
+        for message, routing_key in _make_messages_for_ids(ids, content_type, projectid, type, sessionid,
+                                                           max_size=backend.max_message_size):
+            messages.append((message, routing_key, channel))
+
+    return backend.emit_events(messages)
@@ -16,6 +16,10 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import threading
+
+from collections import OrderedDict
+
 from django.db.models import signals
 from django.db import connection
 
@@ -27,6 +31,62 @@ from . import middleware as mw
 from . import events
 
 
+# Change events of the current transaction, grouped by
+# (content_type, project_id, type, session_id)
+_buffer = threading.local()
+
+
+def _flush_events():
+    pending = getattr(_buffer, "events", None)
+    _buffer.events = None
+    _buffer.callback = None
+    if not pending:
+        return
+
+    groups = []
+    for (content_type, projectid, type, sessionid), pks in pending.items():
+        pks = list(pks)
+        # A single change keeps the shape of the events emitted for one model
+        ids = pks[0] if len(pks) == 1 else pks
+        groups.append((ids, content_type, projectid, type, sessionid))
+
+    events.emit_events_for_ids(groups)
+
+
+def _is_flush_registered(callback):
+    return any(func is callback for sids, func in connection.run_on_commit)
+
+
+def _queue_event(instance, *, type:str, sessionid:str):
+    """
+    Buffer the change event of an instance until the current transaction
+    is committed. Only one message is emitted per routing key and change
+    type with the pk of every changed instance.
+    """
+    if instance._importing:
+        return
+
+    content_type = get_typename_for_model_instance(instance)
+    key = (content_type, instance.project_id, type, sessionid)
+
+    pending = getattr(_buffer, "events", None)
+    callback = getattr(_buffer, "callback", None)
+    if pending is not None and not _is_flush_registered(callback):
+        # The transaction that registered the flush was rolled back
+        pending = None
+
+    register = pending is None
+    if register:
+        pending = _buffer.events = OrderedDict()
+        callback = _buffer.callback = lambda: _flush_events()
+
+    pending.setdefault(key, OrderedDict())[instance.pk] = None
+
+    if register:
+        # Out of a transaction it is run (and the buffer flushed) right now
+        connection.on_commit(callback)
+
+
 def on_save_any_model(sender, instance, created, **kwargs):
     # Ignore any object that can not have project_id
     if not hasattr(instance, "project_id"):
@@ -43,8 +103,7 @@ def on_save_any_model(sender, instance, created, **kwargs):
     if created:
         type = "create"
 
-    emit_event = lambda: events.emit_event_for_model(instance, sessionid=sesionid, type=type)
-    connection.on_commit(emit_event)
+    _queue_event(instance, sessionid=sesionid, type=type)
 
 
 def on_delete_any_model(sender, instance, **kwargs):
@@ -57,5 +116,4 @@ def on_delete_any_model(sender, instance, **kwargs):
 
     sesionid = mw.get_current_session_id()
 
-    emit_event = lambda: events.emit_event_for_model(instance, sessionid=sesionid, type="delete")
-    connection.on_commit(emit_event)
+    _queue_event(instance, sessionid=sesionid, type="delete")
@@ -26,24 +26,64 @@ from django.contrib.auth import get_user_model
 
 from markdown.extensions import Extension
 from markdown.inlinepatterns import Pattern
+from markdown.preprocessors import Preprocessor
 from markdown.util import etree, AtomicString
 
+import re
+
+
+MENTION_RE = r"(@)([\w.-]+)"
+
 
 class MentionsExtension(Extension):
     def extendMarkdown(self, md, md_globals):
-        MENTION_RE = r"(@)([\w.-]+)"
+        md.preprocessors.add("mentions_prefetch",
+                             MentionsPrefetchPreprocessor(md),
+                             "_begin")
+
         mentionsPattern = MentionsPattern(MENTION_RE)
         mentionsPattern.md = md
         md.inlinePatterns.add("mentions", mentionsPattern, "_end")
 
 
+class MentionsPrefetchPreprocessor(Preprocessor):
+    """
+    Resolve all the users mentioned in the text with a single query. The
+    inline pattern gets them from `md.mentioned_users`.
+    """
+    mention_re = re.compile(MENTION_RE)
+
+    def run(self, lines):
+        usernames = set()
+        for line in lines:
+            usernames.update(m.group(2) for m in self.mention_re.finditer(line))
+
+        users = {}
+        if usernames:
+            users = {user.username: user
+                     for user in get_user_model().objects.filter(username__in=usernames)}
+
+        self.markdown.mentioned_users = {username: users.get(username, None) for username in usernames}
+        return lines
+
+
 class MentionsPattern(Pattern):
-    def handleMatch(self, m):
-        username = m.group(3)
+    def get_user(self, username):
+        mentioned_users = getattr(self.md, "mentioned_users", {})
+        if username in mentioned_users:
+            return mentioned_users[username]
 
+        # Not found by the prefetch preprocessor
         try:
-            user = get_user_model().objects.get(username=username)
+            return get_user_model().objects.get(username=username)
         except get_user_model().DoesNotExist:
+            return None
+
+    def handleMatch(self, m):
+        username = m.group(3)
+
+        user = self.get_user(username)
+        if user is None:
             return "@{}".format(username)
 
         url = "/profile/{}".format(username)
@@ -25,33 +25,68 @@
 
 from markdown.extensions import Extension
 from markdown.inlinepatterns import Pattern
+from markdown.preprocessors import Preprocessor
 from markdown.util import etree
 
 from taiga.projects.references.services import get_instance_by_ref
+from taiga.projects.references.services import get_instances_by_refs
 from taiga.front.templatetags.functions import resolve
 
+import re
+
+
+TAIGA_REFERENCE_RE = r'(?<=^|(?<=[^a-zA-Z0-9-\[]))#(\d+)'
 
-class TaigaReferencesExtension(Extension):
-    def __init__(self, project, *args, **kwargs):
-        self.project = project
-        return super().__init__(*args, **kwargs)
 
+class TaigaReferencesExtension(Extension):
+    """
+    Links to user stories, tasks and issues of the project bound to
+    the Markdown instance (`md.project`).
+    """
     def extendMarkdown(self, md, md_globals):
-        TAIGA_REFERENCE_RE = r'(?<=^|(?<=[^a-zA-Z0-9-\[]))#(\d+)'
-        referencesPattern = TaigaReferencesPattern(TAIGA_REFERENCE_RE, self.project)
+        md.preprocessors.add("taiga-references-prefetch",
+                             TaigaReferencesPrefetchPreprocessor(md),
+                             "_begin")
+
+        referencesPattern = TaigaReferencesPattern(TAIGA_REFERENCE_RE)
         referencesPattern.md = md
         md.inlinePatterns.add('taiga-references', referencesPattern, '_begin')
 
 
+class TaigaReferencesPrefetchPreprocessor(Preprocessor):
+    """
+    Resolve all the refs of the text with a single query. The inline
+    pattern gets them from `md.referenced_instances`.
+    """
+    reference_re = re.compile(TAIGA_REFERENCE_RE)
+
+    def run(self, lines):
+        obj_refs = set()
+        for line in lines:
+            obj_refs.update(m.group(1) for m in self.reference_re.finditer(line))
+
+        instances = {}
+        if obj_refs:
+            instances = get_instances_by_refs(self.markdown.project.id, {int(ref) for ref in obj_refs})
+
+        self.markdown.referenced_instances = {ref: instances.get(int(ref), None) for ref in obj_refs}
+        return lines
+
+
 class TaigaReferencesPattern(Pattern):
-    def __init__(self, pattern, project):
-        self.project = project
-        super().__init__(pattern)
+    def get_instance(self, obj_ref):
+        referenced_instances = getattr(self.md, "referenced_instances", {})
+        if obj_ref in referenced_instances:
+            return referenced_instances[obj_ref]
+
+        # Not found by the prefetch preprocessor
+        return get_instance_by_ref(self.md.project.id, obj_ref)
 
     def handleMatch(self, m):
         obj_ref = m.group(2)
+        project = self.md.project
 
-        instance = get_instance_by_ref(self.project.id, obj_ref)
+        instance = self.get_instance(obj_ref)
         if instance is None or instance.content_object is None:
             return "#{}".format(obj_ref)
 
@@ -66,7 +101,7 @@ class TaigaReferencesPattern(Pattern):
         else:
             return "#{}".format(obj_ref)
 
-        url = resolve(instance.content_type.model, self.project.slug, obj_ref)
+        url = resolve(instance.content_type.model, project.slug, obj_ref)
 
         link_text = "&num;{}".format(obj_ref)
 
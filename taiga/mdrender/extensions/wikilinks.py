@@ -30,29 +30,28 @@ import re
 
 
 class WikiLinkExtension(Extension):
-    def __init__(self, project, *args, **kwargs):
-        self.project = project
-        return super().__init__(*args, **kwargs)
-
+    """
+    Links to wiki pages of the project bound to the Markdown
+    instance (`md.project`).
+    """
     def extendMarkdown(self, md, md_globals):
         WIKILINK_RE = r"\[\[([\w0-9_ -]+)(\|[^\]]+)?\]\]"
         md.inlinePatterns.add("wikilinks",
-                              WikiLinksPattern(md, WIKILINK_RE, self.project),
+                              WikiLinksPattern(md, WIKILINK_RE),
                               "<not_strong")
         md.treeprocessors.add("relative_to_absolute_links",
-                              RelativeLinksTreeprocessor(md, self.project),
+                              RelativeLinksTreeprocessor(md),
                               "<prettify")
 
 
 class WikiLinksPattern(Pattern):
-    def __init__(self, md, pattern, project):
-        self.project = project
+    def __init__(self, md, pattern):
         self.md = md
         super().__init__(pattern)
 
     def handleMatch(self, m):
         label = m.group(2).strip()
-        url = resolve("wiki", self.project.slug, slugify(label))
+        url = resolve("wiki", self.md.project.slug, slugify(label))
 
         if m.group(3):
             title = m.group(3).strip()[1:]
@@ -71,10 +70,6 @@ SLUG_RE = re.compile(r"^[-a-zA-Z0-9_]+$")
 
 
 class RelativeLinksTreeprocessor(Treeprocessor):
-    def __init__(self, md, project):
-        self.project = project
-        super().__init__(md)
-
     def run(self, root):
         links = root.getiterator("a")
         for a in links:
@@ -82,7 +77,7 @@ class RelativeLinksTreeprocessor(Treeprocessor):
 
             if SLUG_RE.search(href):
                 # [wiki](wiki_page) -> <a href="FRONT_HOST/.../wiki/wiki_page" ...
-                url = resolve("wiki", self.project.slug, href)
+                url = resolve("wiki", self.markdown.project.slug, href)
                 a.set("href", url)
                 a.set("class", "reference wiki")
 
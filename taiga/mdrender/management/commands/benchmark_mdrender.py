@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2016 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2016 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2016 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2016 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Examples:
+# python manage.py benchmark_mdrender my-project-slug
+# python manage.py benchmark_mdrender my-project-slug --iterations 5000
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from taiga.mdrender import service
+from taiga.projects.models import Project
+
+import bleach
+import time
+
+
+SAMPLE_TEXT = """
+## Comment
+
+Some **bold** and ~~strike~~ text with a [link](http://example.com) and :smile:.
+
+* first item
+* second item
+
+    def foo():
+        return "bar"
+"""
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark of the markdown render with a new engine vs a reused engine per render"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_slug",
+                            help="Project used to render the texts.")
+
+        parser.add_argument("-i", "--iterations",
+                            action="store",
+                            dest="iterations",
+                            type=int,
+                            default=1000,
+                            help="Number of renders. (1000 by default)")
+
+    @override_settings(DEBUG=False)
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(slug=options["project_slug"])
+        except Project.DoesNotExist:
+            raise CommandError("Project '{}' does not exist".format(options["project_slug"]))
+
+        iterations = options["iterations"]
+
+        # The render cache is skipped on purpose, only the engine cost is measured
+        def _render_with_new_engine():
+            md = service._make_markdown()
+            md.project = project
+            md.extracted_data = {"mentions": [], "references": []}
+            return bleach.clean(md.convert(SAMPLE_TEXT))
+
+        def _render_with_reused_engine():
+            md = service._get_markdown(project)
+            return bleach.clean(md.convert(SAMPLE_TEXT))
+
+        self.stdout.write("{:>16} {:>12} {:>14}".format("engine", "renders/s", "ms per render"))
+
+        for name, render in (("new", _render_with_new_engine), ("reused", _render_with_reused_engine)):
+            start = time.perf_counter()
+            for i in range(iterations):
+                render()
+            elapsed = time.perf_counter() - start
+
+            self.stdout.write("{:>16} {:>12.0f} {:>14.3f}".format(
+                name, iterations / elapsed, elapsed * 1000 / iterations))
@@ -18,8 +18,13 @@
 
 import hashlib
 import functools
+import threading
+import time
 import bleach
 
+from collections import OrderedDict
+from contextlib import contextmanager
+
 # BEGIN PATCH
 import html5lib
 from html5lib.serializer.htmlserializer import HTMLSerializer
@@ -37,10 +42,12 @@ def _serialize(domtree):
 bleach._serialize = _serialize
 # END PATCH
 
+from django.conf import settings
 from django.core.cache import cache
 from django.utils.encoding import force_bytes
 
 from markdown import Markdown
+from markdown import version as markdown_version
 
 from .extensions.autolink import AutolinkExtension
 from .extensions.automail import AutomailExtension
@@ -66,16 +73,16 @@ bleach.ALLOWED_ATTRIBUTES["img"] = ["alt", "src"]
 bleach.ALLOWED_ATTRIBUTES["*"] = ["class", "style", "id"]
 
 
-def _make_extensions_list(project=None):
+def _make_extensions_list():
     return [AutolinkExtension(),
             AutomailExtension(),
             SemiSaneListExtension(),
             SpacedLinkExtension(),
             StrikethroughExtension(),
-            WikiLinkExtension(project),
+            WikiLinkExtension(),
             EmojifyExtension(),
             MentionsExtension(),
-            TaigaReferencesExtension(project),
+            TaigaReferencesExtension(),
             TargetBlankLinkExtension(),
             "markdown.extensions.extra",
             "markdown.extensions.codehilite",
@@ -87,37 +94,169 @@ def _make_extensions_list(project=None):
 import diff_match_patch
 
 
+# Bump it whenever the extensions list or any extension changes its
+# output, so the html rendered by older versions is never served again.
+RENDER_CACHE_VERSION = 1
+
+
+class RenderCache(object):
+    """
+    Cache of rendered texts with two tiers: a bounded in-process LRU in
+    front of the shared django cache. Both local and shared entries
+    expire after `timeout` seconds so renamed users or changed refs are
+    eventually rendered again.
+    """
+    def __init__(self, max_size=None, timeout=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def get_max_size(self):
+        if self.max_size is not None:
+            return self.max_size
+        return getattr(settings, "MDRENDER_CACHE_LOCAL_SIZE", 1000)
+
+    def get_timeout(self):
+        if self.timeout is not None:
+            return self.timeout
+        return getattr(settings, "MDRENDER_CACHE_TIMEOUT", 7*24*60*60)
+
+    def make_key(self, project, text):
+        sha1_hash = hashlib.sha1(force_bytes(text)).hexdigest()
+        return "mdrender:{}:{}:{}-{}".format(markdown_version, RENDER_CACHE_VERSION,
+                                             sha1_hash, project.id)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._local:
+                value, expires_at = self._local[key]
+                if expires_at > time.time():
+                    self._local.move_to_end(key)
+                    self.stats["local_hits"] += 1
+                    return value
+                del self._local[key]
+
+        value = cache.get(key)
+        if value is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self.stats["shared_hits"] += 1
+        self._set_local(key, value)
+        return value
+
+    def set(self, key, value):
+        cache.set(key, value, timeout=self.get_timeout())
+        self._set_local(key, value)
+
+    def _set_local(self, key, value):
+        max_size = self.get_max_size()
+        expires_at = time.time() + self.get_timeout()
+        with self._lock:
+            self._local[key] = (value, expires_at)
+            self._local.move_to_end(key)
+            while len(self._local) > max_size:
+                self._local.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def reset_stats(self):
+        self.stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0}
+
+
+render_cache = RenderCache()
+
+
+def get_render_cache_stats():
+    stats = dict(render_cache.stats)
+    stats["local_size"] = len(render_cache._local)
+    return stats
+
+
 def cache_by_sha(func):
     @functools.wraps(func)
     def _decorator(project, text):
-        sha1_hash = hashlib.sha1(force_bytes(text)).hexdigest()
-        key = "{}-{}".format(sha1_hash, project.id)
+        key = render_cache.make_key(project, text)
 
         # Try to get it from the cache
-        cached = cache.get(key)
+        cached = render_cache.get(key)
         if cached is not None:
             return cached
 
         returned_value = func(project, text)
-        cache.set(key, returned_value, timeout=None)
+        render_cache.set(key, returned_value)
         return returned_value
 
     return _decorator
 
 
+# Markdown engines are expensive to build (all the extensions have to be
+# loaded and registered) so every thread reuses its own engine.
+_engines = threading.local()
+
+
+def _make_markdown():
+    return Markdown(extensions=_make_extensions_list())
+
+
 def _get_markdown(project):
-    extensions = _make_extensions_list(project=project)
-    md = Markdown(extensions=extensions)
+    md = getattr(_engines, "markdown", None)
+    if md is None:
+        md = _engines.markdown = _make_markdown()
+
+    md.reset()
+    md.project = project
     md.extracted_data = {"mentions": [], "references": []}
     return md
 
 
+# Texts rendered inside the current thread batch_render() block
+_batch_state = threading.local()
+
+
+@contextmanager
+def batch_render():
+    """
+    Context manager for bulk operations (i.e. taking many history
+    snapshots): inside it `render` renders each unique text of a
+    project only once.
+    """
+    if getattr(_batch_state, "rendered", None) is not None:
+        # Nested blocks share the outer one
+        yield
+        return
+
+    _batch_state.rendered = {}
+    try:
+        yield
+    finally:
+        _batch_state.rendered = None
+
+
 @cache_by_sha
-def render(project, text):
+def _render(project, text):
     md = _get_markdown(project)
     return bleach.clean(md.convert(text))
 
 
+def render(project, text):
+    rendered = getattr(_batch_state, "rendered", None)
+    if rendered is None:
+        return _render(project, text)
+
+    key = (project.id, text)
+    if key not in rendered:
+        rendered[key] = _render(project, text)
+    return rendered[key]
+
+
 def render_and_extract(project, text):
     md = _get_markdown(project)
     result = bleach.clean(md.convert(text))
@@ -172,4 +311,4 @@ def get_diff_of_htmls(html1, html2):
     return diffutil.diff_pretty_html(diffs)
 
 
-__all__ = ["render", "get_diff_of_htmls", "render_and_extract"]
+__all__ = ["render", "get_diff_of_htmls", "render_and_extract", "get_render_cache_stats"]
@@ -290,7 +290,7 @@ class ProjectViewSet(LikedResourceMixin, HistoryResourceMixin,
     def stats(self, request, pk=None):
         project = self.get_object()
         self.check_permissions(request, "stats", project)
-        return response.Ok(services.get_stats_for_project(project))
+        return response.Ok(services.get_cached_project_stats(project, "stats", services.get_stats_for_project))
 
     def _regenerate_csv_uuid(self, project, field):
         uuid_value = uuid.uuid4().hex
@@ -302,13 +302,13 @@ class ProjectViewSet(LikedResourceMixin, HistoryResourceMixin,
     def member_stats(self, request, pk=None):
         project = self.get_object()
         self.check_permissions(request, "member_stats", project)
-        return response.Ok(services.get_member_stats_for_project(project))
+        return response.Ok(services.get_cached_project_stats(project, "member_stats", services.get_member_stats_for_project))
 
     @detail_route(methods=["GET"])
     def issues_stats(self, request, pk=None):
         project = self.get_object()
         self.check_permissions(request, "issues_stats", project)
-        return response.Ok(services.get_stats_for_project_issues(project))
+        return response.Ok(services.get_cached_project_stats(project, "issues_stats", services.get_stats_for_project_issues))
 
     @detail_route(methods=["POST"])
     def transfer_validate_token(self, request, pk=None):
@@ -94,6 +94,33 @@ def disconnect_task_status_signals():
                                  dispatch_uid="try_to_close_or_open_user_stories_when_edit_task_status")
 
 
+## Project stats Signals
+
+# Models whose changes modify the project stats
+STATS_MODELS = ["projects.Project", "projects.Membership", "projects.Points", "projects.IssueStatus",
+                "projects.IssueType", "projects.Priority", "projects.Severity",
+                "userstories.UserStory", "userstories.RolePoints", "tasks.Task", "issues.Issue",
+                "milestones.Milestone", "history.HistoryEntry"]
+
+
+def connect_project_stats_signals():
+    from . import signals as handlers
+    for model_name in STATS_MODELS:
+        model = apps.get_model(*model_name.split("."))
+        signals.post_save.connect(handlers.invalidate_project_stats, sender=model,
+                                  dispatch_uid="invalidate_project_stats_{}_save".format(model_name))
+        signals.post_delete.connect(handlers.invalidate_project_stats, sender=model,
+                                    dispatch_uid="invalidate_project_stats_{}_delete".format(model_name))
+
+
+def disconnect_project_stats_signals():
+    for model_name in STATS_MODELS:
+        model = apps.get_model(*model_name.split("."))
+        signals.post_save.disconnect(sender=model,
+                                     dispatch_uid="invalidate_project_stats_{}_save".format(model_name))
+        signals.post_delete.disconnect(sender=model,
+                                       dispatch_uid="invalidate_project_stats_{}_delete".format(model_name))
+
 
 class ProjectsAppConfig(AppConfig):
     name = "taiga.projects"
@@ -104,3 +131,4 @@ class ProjectsAppConfig(AppConfig):
         connect_memberships_signals()
         connect_us_status_signals()
         connect_task_status_signals()
+        connect_project_stats_signals()
@@ -32,6 +32,7 @@ from . import services
 
 class HistoryViewSet(ReadOnlyListViewSet):
     serializer_class = serializers.HistoryEntrySerializer
+    cursor_ordering = ("created_at", "id")
 
     content_type = None
 
@@ -51,8 +52,10 @@ class HistoryViewSet(ReadOnlyListViewSet):
         # Switch between paginated or standard style responses
         page = self.paginate_queryset(queryset)
         if page is not None:
+            services.prefetch_owners_in_history_queryset(page.object_list)
             serializer = self.get_pagination_serializer(page)
         else:
+            services.prefetch_owners_in_history_queryset(queryset)
             serializer = self.get_serializer(queryset, many=True)
 
         return response.Ok(serializer.data)
@@ -164,7 +167,6 @@ class HistoryViewSet(ReadOnlyListViewSet):
         obj = self.get_object()
         self.check_permissions(request, "retrieve", obj)
         qs = services.get_history_queryset_by_model_instance(obj)
-        qs = services.prefetch_owners_in_history_queryset(qs)
         return self.response_for_queryset(qs)
 
 
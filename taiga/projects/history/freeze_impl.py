@@ -226,7 +226,21 @@ def extract_issue_custom_attributes(obj) -> list:
                        "value": value}
 
 
-def project_freezer(project) -> dict:
+def _render_markdown_field(obj, field:str, previous_snapshot:dict=None) -> str:
+    """
+    Render the markdown of `field`, reusing the html of the previous
+    snapshot if the text has not changed.
+    """
+    text = getattr(obj, field)
+    html_field = "{}_html".format(field)
+    if (previous_snapshot is not None and html_field in previous_snapshot and
+            previous_snapshot.get(field, None) == text):
+        return previous_snapshot[html_field]
+
+    return mdrender(obj.project, text)
+
+
+def project_freezer(project, previous_snapshot=None) -> dict:
     fields = ("name",
               "slug",
               "created_at",
@@ -242,7 +256,7 @@ def project_freezer(project) -> dict:
     return _generic_extract(project, fields)
 
 
-def milestone_freezer(milestone) -> dict:
+def milestone_freezer(milestone, previous_snapshot=None) -> dict:
     snapshot = {
         "name": milestone.name,
         "slug": milestone.slug,
@@ -256,12 +270,9 @@ def milestone_freezer(milestone) -> dict:
     return snapshot
 
 
-def userstory_freezer(us) -> dict:
-    rp_cls = apps.get_model("userstories", "RolePoints")
-    rpqsd = rp_cls.objects.filter(user_story=us)
-
+def userstory_freezer(us, previous_snapshot=None) -> dict:
     points = {}
-    for rp in rpqsd:
+    for rp in us.role_points.all():
         points[str(rp.role_id)] = rp.points_id
 
     snapshot = {
@@ -275,7 +286,7 @@ def userstory_freezer(us) -> dict:
         "kanban_order": us.kanban_order,
         "subject": us.subject,
         "description": us.description,
-        "description_html": mdrender(us.project, us.description),
+        "description_html": _render_markdown_field(us, "description", previous_snapshot),
         "assigned_to": us.assigned_to_id,
         "milestone": us.milestone_id,
         "client_requirement": us.client_requirement,
@@ -286,7 +297,7 @@ def userstory_freezer(us) -> dict:
         "from_issue": us.generated_from_issue_id,
         "is_blocked": us.is_blocked,
         "blocked_note": us.blocked_note,
-        "blocked_note_html": mdrender(us.project, us.blocked_note),
+        "blocked_note_html": _render_markdown_field(us, "blocked_note", previous_snapshot),
         "custom_attributes": extract_user_story_custom_attributes(us),
         "tribe_gig": us.tribe_gig,
     }
@@ -294,7 +305,7 @@ def userstory_freezer(us) -> dict:
     return snapshot
 
 
-def issue_freezer(issue) -> dict:
+def issue_freezer(issue, previous_snapshot=None) -> dict:
     snapshot = {
         "ref": issue.ref,
         "owner": issue.owner_id,
@@ -305,20 +316,20 @@ def issue_freezer(issue) -> dict:
         "milestone": issue.milestone_id,
         "subject": issue.subject,
         "description": issue.description,
-        "description_html": mdrender(issue.project, issue.description),
+        "description_html": _render_markdown_field(issue, "description", previous_snapshot),
         "assigned_to": issue.assigned_to_id,
         "attachments": extract_attachments(issue),
         "tags": issue.tags,
         "is_blocked": issue.is_blocked,
         "blocked_note": issue.blocked_note,
-        "blocked_note_html": mdrender(issue.project, issue.blocked_note),
+        "blocked_note_html": _render_markdown_field(issue, "blocked_note", previous_snapshot),
         "custom_attributes": extract_issue_custom_attributes(issue),
     }
 
     return snapshot
 
 
-def task_freezer(task) -> dict:
+def task_freezer(task, previous_snapshot=None) -> dict:
     snapshot = {
         "ref": task.ref,
         "owner": task.owner_id,
@@ -326,7 +337,7 @@ def task_freezer(task) -> dict:
         "milestone": task.milestone_id,
         "subject": task.subject,
         "description": task.description,
-        "description_html": mdrender(task.project, task.description),
+        "description_html": _render_markdown_field(task, "description", previous_snapshot),
         "assigned_to": task.assigned_to_id,
         "attachments": extract_attachments(task),
         "taskboard_order": task.taskboard_order,
@@ -336,19 +347,19 @@ def task_freezer(task) -> dict:
         "is_iocaine": task.is_iocaine,
         "is_blocked": task.is_blocked,
         "blocked_note": task.blocked_note,
-        "blocked_note_html": mdrender(task.project, task.blocked_note),
+        "blocked_note_html": _render_markdown_field(task, "blocked_note", previous_snapshot),
         "custom_attributes": extract_task_custom_attributes(task),
     }
 
     return snapshot
 
 
-def wikipage_freezer(wiki) -> dict:
+def wikipage_freezer(wiki, previous_snapshot=None) -> dict:
     snapshot = {
         "slug": wiki.slug,
         "owner": wiki.owner_id,
         "content": wiki.content,
-        "content_html": mdrender(wiki.project, wiki.content),
+        "content_html": _render_markdown_field(wiki, "content", previous_snapshot),
         "attachments": extract_attachments(wiki),
     }
 
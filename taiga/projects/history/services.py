@@ -37,15 +37,18 @@ from functools import wraps
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.apps import apps
 from django.db import transaction as tx
 from django_pglocks import advisory_lock
 
 from taiga.mdrender.service import render as mdrender
+from taiga.mdrender.service import batch_render
 from taiga.base.utils.db import get_typename_for_model_class
 from taiga.base.utils.diff import make_diff as make_diff_from_dicts
 
 from .models import HistoryType
+from .signals import history_entries_created_in_bulk
 
 # Freeze implementatitions
 from .freeze_impl import project_freezer
@@ -161,13 +164,16 @@ def register_freeze_implementation(typename: str, fn=None):
 
 # Low level api
 
-def freeze_model_instance(obj: object) -> FrozenObj:
+def freeze_model_instance(obj: object, previous_snapshot: dict=None) -> FrozenObj:
     """
     Creates a new frozen object from model instance.
 
     The freeze process consists on converting model
     instances to hashable plain python objects and
     wrapped into FrozenObj.
+
+    The previous snapshot, if any, lets the freeze
+    implementation reuse unchanged rendered fields.
     """
 
     model_cls = obj.__class__
@@ -185,7 +191,7 @@ def freeze_model_instance(obj: object) -> FrozenObj:
 
     key = make_key_from_model_object(obj)
     impl_fn = _freeze_impl_map[typename]
-    snapshot = impl_fn(obj)
+    snapshot = impl_fn(obj, previous_snapshot=previous_snapshot)
     assert isinstance(snapshot, dict), "freeze handlers should return always a dict"
 
     return FrozenObj(key, snapshot)
@@ -254,9 +260,39 @@ def _rebuild_snapshot_from_diffs(keysnapshot, partials):
     return result
 
 
-def get_last_snapshot_for_key(key: str) -> FrozenObj:
+def _make_snapshot_cache_key(key: str) -> str:
+    return "history-last-snapshot:{}".format(key)
+
+
+def _cache_last_snapshot_for_key(key: str, entry_id: str, snapshot: dict, partials: int):
+    """
+    Store the materialized snapshot of `key` after the history entry
+    `entry_id`, and the number of partial diffs since the last real one.
+    """
+    timeout = getattr(settings, "HISTORY_SNAPSHOT_CACHE_TIMEOUT", 24*60*60)
+    value = {"entry_id": entry_id, "snapshot": snapshot, "partials": partials}
+    cache.set(_make_snapshot_cache_key(key), value, timeout=timeout)
+
+
+def _get_last_snapshot_for_key(key: str):
     entry_model = apps.get_model("history", "HistoryEntry")
 
+    last_entry_id = (entry_model.objects
+                     .filter(key=key)
+                     .order_by("-created_at")
+                     .values_list("id", flat=True)
+                     .first())
+
+    if last_entry_id is None:
+        return None, 0
+
+    # The materialized snapshot is only valid if it was built from the last
+    # entry (entries of rolled back transactions or created by the importer
+    # are not materialized)
+    cached = cache.get(_make_snapshot_cache_key(key))
+    if cached is not None and cached["entry_id"] == last_entry_id:
+        return FrozenObj(key, cached["snapshot"]), cached["partials"]
+
     # Search last snapshot
     qs = (entry_model.objects
           .filter(key=key, is_snapshot=True)
@@ -264,7 +300,7 @@ def get_last_snapshot_for_key(key: str) -> FrozenObj:
 
     keysnapshot = qs.first()
     if keysnapshot is None:
-        return None, True
+        return None, 0
 
     # Get all partial snapshots
     entries = tuple(entry_model.objects
@@ -273,12 +309,21 @@ def get_last_snapshot_for_key(key: str) -> FrozenObj:
                     .order_by("created_at"))
 
     snapshot = _rebuild_snapshot_from_diffs(keysnapshot.snapshot, entries)
+    _cache_last_snapshot_for_key(key, last_entry_id, snapshot, len(entries))
+    return FrozenObj(keysnapshot.key, snapshot), len(entries)
+
+
+def get_last_snapshot_for_key(key: str) -> FrozenObj:
+    fobj, partials = _get_last_snapshot_for_key(key)
+    if fobj is None:
+        return None, True
+
     max_partial_diffs = getattr(settings, "MAX_PARTIAL_DIFFS", 60)
 
-    if len(entries) >= max_partial_diffs:
-        return FrozenObj(keysnapshot.key, snapshot), True
+    if partials >= max_partial_diffs:
+        return fobj, True
 
-    return FrozenObj(keysnapshot.key, snapshot), False
+    return fobj, False
 
 
 # Public api
@@ -315,8 +360,10 @@ def take_snapshot(obj: object, *, comment: str="", user=None, delete: bool=False
     with advisory_lock("history-"+key):
         typename = get_typename_for_model_class(obj.__class__)
 
-        new_fobj = freeze_model_instance(obj)
-        old_fobj, need_real_snapshot = get_last_snapshot_for_key(key)
+        old_fobj, partials = _get_last_snapshot_for_key(key)
+        new_fobj = freeze_model_instance(obj, old_fobj.snapshot if old_fobj else None)
+        max_partial_diffs = getattr(settings, "MAX_PARTIAL_DIFFS", 60)
+        need_real_snapshot = old_fobj is None or partials >= max_partial_diffs
 
         entry_model = apps.get_model("history", "HistoryEntry")
         user_id = None if user is None else user.id
@@ -364,7 +411,100 @@ def take_snapshot(obj: object, *, comment: str="", user=None, delete: bool=False
             "is_snapshot": need_real_snapshot,
         }
 
-        return entry_model.objects.create(**kwargs)
+        entry = entry_model.objects.create(**kwargs)
+
+        # Materialize the snapshot so the next change of this object
+        # doesn't need to rebuild it from the partial diffs
+        if need_real_snapshot:
+            _cache_last_snapshot_for_key(key, entry.id, fdiff.snapshot, 0)
+        else:
+            snapshot = _rebuild_snapshot_from_diffs(old_fobj.snapshot, [fdiff])
+            _cache_last_snapshot_for_key(key, entry.id, snapshot, partials + 1)
+
+        return entry
+
+
+# Related objects read by the freezers, fetched at once for all the
+# instances by take_creation_snapshots_in_bulk
+_bulk_freeze_related = {
+    "userstories.userstory": (["status", "custom_attributes_values"],
+                              ["project__userstorycustomattributes", "attachments", "role_points"]),
+    "tasks.task": (["status", "custom_attributes_values"],
+                   ["project__taskcustomattributes", "attachments"]),
+    "issues.issue": (["status", "custom_attributes_values"],
+                     ["project__issuecustomattributes", "attachments"]),
+}
+
+
+def _freeze_model_instances_in_bulk(objs: list) -> dict:
+    """
+    Like `freeze_model_instance` for a list of instances of the same
+    model, fetching the related objects of all of them at once.
+    Return a dict of FrozenObj by pk.
+    """
+    model_cls = objs[0].__class__
+    typename = get_typename_for_model_class(model_cls)
+    if typename not in _freeze_impl_map:
+        raise RuntimeError("No implementation found for {}".format(typename))
+
+    select_related, prefetch_related = _bulk_freeze_related.get(typename, ([], []))
+    qs = (model_cls.objects.filter(pk__in=[obj.pk for obj in objs])
+                           .select_related(*select_related)
+                           .prefetch_related(*prefetch_related))
+
+    impl_fn = _freeze_impl_map[typename]
+    return {obj.pk: FrozenObj(make_key_from_model_object(obj), impl_fn(obj)) for obj in qs}
+
+
+@tx.atomic
+def take_creation_snapshots_in_bulk(objs: list, *, user=None) -> list:
+    """
+    Given a list of new model instances of the same model,
+    create their history entries of "create" type with one
+    insert.
+
+    Instead of a post_save signal per entry, the
+    `history_entries_created_in_bulk` signal is sent once so
+    the rest of apps (timeline, webhooks...) can handle all
+    of them at once.
+    """
+    if not objs:
+        return []
+
+    entry_model = apps.get_model("history", "HistoryEntry")
+    typename = get_typename_for_model_class(objs[0].__class__)
+    user_id = None if user is None else user.id
+    user_name = "" if user is None else user.get_full_name()
+
+    entries = []
+    instances = []
+    with batch_render():
+        fobjs = _freeze_model_instances_in_bulk(objs)
+        for obj in objs:
+            if obj.pk not in fobjs:
+                continue
+
+            fdiff = make_diff(None, fobjs[obj.pk])
+            entries.append(entry_model(user={"pk": user_id, "name": user_name},
+                                       project_id=obj.project_id,
+                                       key=fdiff.key,
+                                       type=HistoryType.create,
+                                       snapshot=fdiff.snapshot,
+                                       diff=fdiff.diff,
+                                       values=make_diff_values(typename, fdiff),
+                                       comment="",
+                                       comment_html=mdrender(obj.project, ""),
+                                       is_hidden=is_hidden_snapshot(fdiff),
+                                       is_snapshot=True))
+            instances.append(obj)
+
+    entry_model.objects.bulk_create(entries)
+
+    for entry in entries:
+        _cache_last_snapshot_for_key(entry.key, entry.id, entry.snapshot, 0)
+
+    history_entries_created_in_bulk.send(sender=entry_model, entries=entries, instances=instances)
+    return entries
 
 
 # High level query api
@@ -385,7 +525,7 @@ def get_history_queryset_by_model_instance(obj: object, types=(HistoryType.chang
 
 
 def prefetch_owners_in_history_queryset(qs):
-    user_ids = [u["pk"] for u in qs.values_list("user", flat=True)]
+    user_ids = [history_entry.user["pk"] for history_entry in qs]
     users = get_user_model().objects.filter(id__in=user_ids)
     users_by_id = {u.id: u for u in users}
     for history_entry in qs:
@@ -248,7 +248,7 @@ class IssueViewSet(OCCResourceMixin, VotedResourceMixin, HistoryResourceMixin, W
                 data["bulk_issues"], project=project, owner=request.user,
                 status=project.default_issue_status, severity=project.default_severity,
                 priority=project.default_priority, type=project.default_issue_type,
-                callback=self.post_save, precall=self.pre_save)
+                user=request.user, precall=self.pre_save)
 
             issues = self.get_queryset().filter(id__in=[i.id for i in issues])
             issues_serialized = self.get_serializer_class()(issues, many=True)
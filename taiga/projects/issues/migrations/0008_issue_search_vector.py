@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# NOTE: This column is needed by taiga.searches.services
+ADD_SEARCH_VECTOR_COLUMN = """
+    ALTER TABLE issues_issue
+     ADD COLUMN search_vector tsvector;
+"""
+
+DROP_SEARCH_VECTOR_COLUMN = """
+    ALTER TABLE issues_issue
+    DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+CREATE_SEARCH_VECTOR_FUNCTION = """
+    CREATE OR REPLACE FUNCTION issues_issue_search_vector_update()
+                       RETURNS trigger
+                            AS $issues_issue_search_vector_update$
+                         BEGIN
+                               NEW.search_vector :=
+                           setweight(to_tsvector('english_nostop',
+                                     coalesce(NEW.subject, '') || ' ' ||
+                                     coalesce(NEW.ref::text, '')), 'A') ||
+                           setweight(to_tsvector('english_nostop',
+                                     coalesce(inmutable_array_to_string(NEW.tags), '')), 'B') ||
+                           setweight(to_tsvector('english_nostop',
+                                     coalesce(NEW.description, '')), 'C');
+                               RETURN NEW;
+                           END; $issues_issue_search_vector_update$
+                      LANGUAGE plpgsql;
+"""
+
+DROP_SEARCH_VECTOR_FUNCTION = """
+    DROP FUNCTION IF EXISTS issues_issue_search_vector_update() CASCADE;
+"""
+
+
+CREATE_SEARCH_VECTOR_TRIGGER = """
+    CREATE TRIGGER issues_issue_search_vector_update
+     BEFORE INSERT OR UPDATE OF subject, ref, tags, description
+                ON issues_issue
+          FOR EACH ROW
+   EXECUTE PROCEDURE issues_issue_search_vector_update();
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+    DROP TRIGGER IF EXISTS issues_issue_search_vector_update
+                        ON issues_issue;
+"""
+
+
+FILL_SEARCH_VECTOR_COLUMN = """
+    UPDATE issues_issue
+       SET search_vector =
+                           setweight(to_tsvector('english_nostop',
+                                     coalesce(issues_issue.subject, '') || ' ' ||
+                                     coalesce(issues_issue.ref::text, '')), 'A') ||
+                           setweight(to_tsvector('english_nostop',
+                                     coalesce(inmutable_array_to_string(issues_issue.tags), '')), 'B') ||
+                           setweight(to_tsvector('english_nostop',
+                                     coalesce(issues_issue.description, '')), 'C');
+"""
+
+
+CREATE_SEARCH_VECTOR_INDEX = """
+    CREATE INDEX issues_issue_search_vector_idx
+              ON issues_issue
+           USING gin(search_vector);
+"""
+
+DROP_SEARCH_VECTOR_INDEX = """
+    DROP INDEX IF EXISTS issues_issue_search_vector_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0007_auto_20160614_1201'),
+        ('projects', '0033_text_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL([ADD_SEARCH_VECTOR_COLUMN],
+                          [DROP_SEARCH_VECTOR_COLUMN]),
+        migrations.RunSQL([DROP_SEARCH_VECTOR_FUNCTION, CREATE_SEARCH_VECTOR_FUNCTION],
+                          [DROP_SEARCH_VECTOR_FUNCTION]),
+        migrations.RunSQL([DROP_SEARCH_VECTOR_TRIGGER, CREATE_SEARCH_VECTOR_TRIGGER],
+                          [DROP_SEARCH_VECTOR_TRIGGER]),
+        migrations.RunSQL([FILL_SEARCH_VECTOR_COLUMN],
+                          migrations.RunSQL.noop),
+        migrations.RunSQL([DROP_SEARCH_VECTOR_INDEX, CREATE_SEARCH_VECTOR_INDEX],
+                          [DROP_SEARCH_VECTOR_INDEX]),
+    ]
@@ -74,7 +74,7 @@ class Issue(OCCModelMixin, WatchedModelMixin, BlockedMixin, TaggedMixin, models.
             ("view_issue", "Can view issue"),
         )
 
-    def save(self, *args, **kwargs):
+    def set_default_values(self):
         if not self._importing or not self.modified_date:
             self.modified_date = timezone.now()
 
@@ -90,6 +90,8 @@ class Issue(OCCModelMixin, WatchedModelMixin, BlockedMixin, TaggedMixin, models.
         if not self.priority_id:
             self.priority = self.project.default_priority
 
+    def save(self, *args, **kwargs):
+        self.set_default_values()
         return super().save(*args, **kwargs)
 
     def __str__(self):
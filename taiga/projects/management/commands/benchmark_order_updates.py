@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2016 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2016 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2016 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2016 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Examples:
+# python manage.py benchmark_order_updates
+# python manage.py benchmark_order_updates --sizes 100,5000 --moves 200 --strides 1,1000
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from taiga.projects.services import apply_order_updates
+
+import random
+import time
+
+
+def _apply_order_updates_renumbering(base_orders, new_orders):
+    # The previous implementation, shifting every following element on each move
+    updated_order_ids = set()
+    sorted_new_orders = sorted(new_orders.items(), key=lambda e: e[1])
+
+    for id, new_order in sorted_new_orders:
+        old_order = base_orders[id]
+        for other_id, order in base_orders.items():
+            moving_backward = new_order <= old_order and order >= new_order and order < old_order
+            moving_forward = new_order >= old_order and order >= new_order
+            if moving_backward or moving_forward:
+                base_orders[other_id] += 1
+                updated_order_ids.add(other_id)
+
+    for id, order in new_orders.items():
+        if base_orders[id] != order:
+            base_orders[id] = order
+            updated_order_ids.add(id)
+
+    removing_keys = [id for id in base_orders if id not in updated_order_ids]
+    [base_orders.pop(id, None) for id in removing_keys]
+
+
+def _rebalance(orders, stride):
+    # Like taiga.projects.services.rebalance_orders, return the number of rows written
+    rows = 0
+    for position, id in enumerate(sorted(orders, key=lambda id: (orders[id], id)), 1):
+        if orders[id] != position * stride:
+            orders[id] = position * stride
+            rows += 1
+    return rows
+
+
+def _run_moves(apply, orders, moves, rand, rebalance=False):
+    rows = 0
+    rebalances = 0
+    elapsed = 0
+    for i in range(moves):
+        # Like the clients, an element is moved after another one taking the
+        # next order to the one of it
+        ids = sorted(orders, key=lambda id: (orders[id], id))
+        id, previous_id = rand.sample(ids, 2)
+        new_orders = {id: orders[previous_id] + 1}
+
+        updates = dict(orders)
+        start = time.perf_counter()
+        apply(updates, new_orders)
+        elapsed += time.perf_counter() - start
+        orders.update(updates)
+        rows += len(updates)
+
+        if rebalance and len(updates) - len(new_orders) > settings.ORDERS_REBALANCE_THRESHOLD:
+            rows += _rebalance(orders, settings.ORDERS_STRIDE)
+            rebalances += 1
+
+    return rows / moves, rebalances, elapsed * 1000 / moves
+
+
+class Command(BaseCommand):
+    help = "Benchmark the rows written per move by the order updates against the renumbering one"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-s", "--sizes",
+                            action="store",
+                            dest="sizes",
+                            default="100,1000,5000",
+                            metavar="N,N,...",
+                            help="Comma separated list of list sizes. ('100,1000,5000' by default)")
+
+        parser.add_argument("-m", "--moves",
+                            action="store",
+                            dest="moves",
+                            type=int,
+                            default=100,
+                            help="Number of random moves per list size. (100 by default)")
+
+        parser.add_argument("-t", "--strides",
+                            action="store",
+                            dest="strides",
+                            default="1,1000",
+                            metavar="N,N,...",
+                            help="Comma separated list of distances between the initial orders. 1 is a "
+                                 "dense list, like the ones before spacing the orders. ('1,1000' by default)")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(n) for n in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("Invalid sizes list '{}'".format(options["sizes"]))
+
+        try:
+            strides = [int(n) for n in options["strides"].split(",")]
+        except ValueError:
+            raise CommandError("Invalid strides list '{}'".format(options["strides"]))
+
+        moves = options["moves"]
+
+        self.stdout.write("{:>8} {:>7} {:>16} {:>14} {:>18} {:>11} {:>12} {:>9}".format(
+            "size", "stride", "renumber (rows)", "shift (rows)", "rebalance (rows)", "rebalances",
+            "renumber ms", "shift ms"))
+
+        for size, stride in [(size, stride) for size in sizes for stride in strides]:
+            base_orders = {id: (id + 1) * stride for id in range(size)}
+
+            # The same list and the same moves for every implementation
+            renumber_rows, _, renumber_ms = _run_moves(_apply_order_updates_renumbering, dict(base_orders),
+                                                       moves, random.Random(size))
+            shift_rows, _, shift_ms = _run_moves(apply_order_updates, dict(base_orders),
+                                                 moves, random.Random(size))
+            rebalance_rows, rebalances, _ = _run_moves(apply_order_updates, dict(base_orders),
+                                                       moves, random.Random(size), rebalance=True)
+
+            self.stdout.write("{:>8} {:>7} {:>16.1f} {:>14.1f} {:>18.1f} {:>11} {:>12.3f} {:>9.3f}".format(
+                size, stride, renumber_rows, shift_rows, rebalance_rows, rebalances, renumber_ms, shift_ms))
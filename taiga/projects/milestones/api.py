@@ -99,13 +99,10 @@ class MilestoneViewSet(HistoryResourceMixin, WatchedResourceMixin,
             'estimated_finish': milestone.estimated_finish,
             'total_points': total_points,
             'completed_points': milestone.closed_points.values(),
-            'total_userstories': milestone.cached_user_stories.count(),
-            'completed_userstories': milestone.cached_user_stories.filter(is_closed=True).count(),
-            'total_tasks': milestone.tasks.count(),
-            'completed_tasks': milestone.tasks.filter(status__is_closed=True).count(),
-            'iocaine_doses': milestone.tasks.filter(is_iocaine=True).count(),
             'days': []
         }
+        milestone_stats.update(milestone.get_counters())
+
         current_date = milestone.estimated_start
         sumTotalPoints = sum(total_points.values())
         optimal_points = sumTotalPoints
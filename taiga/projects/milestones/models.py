@@ -16,8 +16,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from django.db import models
-from django.db.models import Count
+from django.db import connection, models
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 from django.utils import timezone
@@ -25,12 +24,10 @@ from django.core.exceptions import ValidationError
 from django.utils.functional import cached_property
 
 from taiga.base.utils.slug import slugify_uniquely
-from taiga.base.utils.dicts import dict_sum
 from taiga.projects.notifications.mixins import WatchedModelMixin
 from django_pglocks import advisory_lock
 
-import itertools
-import datetime
+from contextlib import closing
 
 
 class Milestone(WatchedModelMixin, models.Model):
@@ -90,73 +87,120 @@ class Milestone(WatchedModelMixin, models.Model):
             super().save(*args, **kwargs)
 
     @cached_property
-    def cached_user_stories(self):
-        return (self.user_stories.prefetch_related("role_points", "role_points__points")
-                                 .annotate(num_tasks=Count("tasks")))
-
-    def _get_user_stories_points(self, user_stories):
-        role_points = [us.role_points.all() for us in user_stories]
-        flat_role_points = itertools.chain(*role_points)
-        flat_role_dicts = map(lambda x: {x.role_id: x.points.value if x.points.value else 0}, flat_role_points)
-        return dict_sum(*flat_role_dicts)
+    def _points_by_role(self):
+        # Total and closed points of the user stories of the milestone grouped by role
+        sql = """
+            SELECT "userstories_rolepoints"."role_id",
+                   COALESCE(SUM("projects_points"."value"), 0),
+                   BOOL_OR("userstories_userstory"."is_closed"),
+                   COALESCE(SUM(CASE WHEN "userstories_userstory"."is_closed"
+                                     THEN "projects_points"."value" END), 0)
+              FROM "userstories_rolepoints"
+        INNER JOIN "userstories_userstory"
+                ON "userstories_userstory"."id" = "userstories_rolepoints"."user_story_id"
+         LEFT JOIN "projects_points"
+                ON "projects_points"."id" = "userstories_rolepoints"."points_id"
+             WHERE "userstories_userstory"."milestone_id" = %(milestone_id)s
+          GROUP BY "userstories_rolepoints"."role_id"
+        """
+
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(sql, {"milestone_id": self.id})
+            rows = cursor.fetchall()
+
+        total_points = {role_id: total for role_id, total, has_closed, closed in rows}
+        closed_points = {role_id: closed for role_id, total, has_closed, closed in rows if has_closed}
+        return total_points, closed_points
 
     @property
     def total_points(self):
-        return self._get_user_stories_points(
-            [us for us in self.cached_user_stories]
-        )
+        return self._points_by_role[0]
 
     @property
     def closed_points(self):
-        return self._get_user_stories_points(
-            [us for us in self.cached_user_stories if us.is_closed]
-        )
+        return self._points_by_role[1]
+
+    def get_counters(self):
+        """
+        Get the number of user stories and tasks of the milestone, the closed ones
+        and the iocaine doses in a single query.
+        """
+        sql = """
+            SELECT "user_stories"."total",
+                   "user_stories"."completed",
+                   "tasks"."total",
+                   "tasks"."completed",
+                   "tasks"."iocaine_doses"
+              FROM (SELECT COUNT(*) AS "total",
+                           COUNT(CASE WHEN "is_closed" THEN 1 END) AS "completed"
+                      FROM "userstories_userstory"
+                     WHERE "milestone_id" = %(milestone_id)s) AS "user_stories",
+                   (SELECT COUNT(*) AS "total",
+                           COUNT(CASE WHEN "projects_taskstatus"."is_closed" THEN 1 END) AS "completed",
+                           COUNT(CASE WHEN "tasks_task"."is_iocaine" THEN 1 END) AS "iocaine_doses"
+                      FROM "tasks_task"
+                 LEFT JOIN "projects_taskstatus"
+                        ON "projects_taskstatus"."id" = "tasks_task"."status_id"
+                     WHERE "tasks_task"."milestone_id" = %(milestone_id)s) AS "tasks"
+        """
+
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(sql, {"milestone_id": self.id})
+            row = cursor.fetchone()
+
+        keys = ("total_userstories", "completed_userstories", "total_tasks",
+                "completed_tasks", "iocaine_doses")
+        return dict(zip(keys, row))
+
+    def _get_total_closed_points_by_date(self):
+        # Every finished task closes the proportional part of the points of its
+        # user story (total user story points divided by its number of tasks).
+        # Tasks finished before starting the sprint count on its first day and
+        # the increments are accumulated for every day of the sprint.
+        sql = """
+            WITH "user_stories" AS (
+                SELECT "userstories_userstory"."id",
+                       (SELECT COALESCE(SUM("projects_points"."value"), 0)
+                          FROM "userstories_rolepoints"
+                    INNER JOIN "projects_points"
+                            ON "projects_points"."id" = "userstories_rolepoints"."points_id"
+                         WHERE "userstories_rolepoints"."user_story_id" = "userstories_userstory"."id") AS "total_points",
+                       (SELECT COUNT(*)
+                          FROM "tasks_task"
+                         WHERE "tasks_task"."user_story_id" = "userstories_userstory"."id") AS "total_tasks"
+                  FROM "userstories_userstory"
+                 WHERE "userstories_userstory"."milestone_id" = %(milestone_id)s
+            ),
+            "increments" AS (
+                SELECT GREATEST(("tasks_task"."finished_date" AT TIME ZONE 'UTC')::date,
+                                %(estimated_start)s::date) AS "day",
+                       SUM("user_stories"."total_points" / "user_stories"."total_tasks") AS "points"
+                  FROM "tasks_task"
+            INNER JOIN "user_stories"
+                    ON "user_stories"."id" = "tasks_task"."user_story_id"
+                 WHERE "tasks_task"."milestone_id" = %(milestone_id)s
+                   AND "tasks_task"."finished_date" IS NOT NULL
+              GROUP BY 1
+            )
+            SELECT "days"."day"::date,
+                   SUM(COALESCE("increments"."points", 0)) OVER (ORDER BY "days"."day")
+              FROM generate_series(%(estimated_start)s::date,
+                                   %(estimated_finish)s::date,
+                                   '1 day') AS "days"("day")
+         LEFT JOIN "increments"
+                ON "increments"."day" = "days"."day"::date
+          ORDER BY "days"."day"
+        """
+
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(sql, {"milestone_id": self.id,
+                                 "estimated_start": self.estimated_start,
+                                 "estimated_finish": self.estimated_finish})
+            return {day: points for day, points in cursor.fetchall()}
 
     def total_closed_points_by_date(self, date):
         # Milestone instance will keep a cache of the total closed points by date
         if self._total_closed_points_by_date is None:
-            self._total_closed_points_by_date = {}
-
-            # We need to keep the milestone user stories indexed by id in a dict
-            user_stories = {}
-            for us in self.cached_user_stories:
-                us._total_us_points = sum(self._get_user_stories_points([us]).values())
-                user_stories[us.id] = us
-
-            tasks = self.tasks.\
-                    select_related("user_story").\
-                    exclude(finished_date__isnull=True).\
-                    exclude(user_story__isnull=True)
-
-            # For each finished task we try to know the proporional part of points
-            # it represetnts from the user story and add it to the closed points
-            # for that date
-            # This calulation is the total user story points divided by its number of tasks
-            for task in tasks:
-                user_story = user_stories[task.user_story.id]
-                total_us_points = user_story._total_us_points
-                us_tasks_counter = user_story.num_tasks
-
-                # If the task was finished before starting the sprint it needs
-                # to be included
-                finished_date = task.finished_date.date()
-                if finished_date < self.estimated_start:
-                    finished_date = self.estimated_start
-
-                points_by_date = self._total_closed_points_by_date.get(finished_date, 0)
-                points_by_date += total_us_points / us_tasks_counter
-                self._total_closed_points_by_date[finished_date] = points_by_date
-
-            # At this point self._total_closed_points_by_date keeps a dict where the
-            # finished date of the task is the key and the value is the increment of points
-            # We are transforming this dict of increments in an acumulation one including
-            # all the dates from the sprint
-
-            acumulated_date_points = 0
-            current_date = self.estimated_start
-            while current_date <= self.estimated_finish:
-                acumulated_date_points += self._total_closed_points_by_date.get(current_date, 0)
-                self._total_closed_points_by_date[current_date] = acumulated_date_points
-                current_date = current_date + datetime.timedelta(days=1)
+            self._total_closed_points_by_date = self._get_total_closed_points_by_date()
 
         return self._total_closed_points_by_date.get(date, 0)
@@ -385,11 +385,10 @@ class Project(ProjectDefaults, TaggedMixin, TagsColorsdMixin, models.Model):
 
     def update_role_points(self, user_stories=None):
         RolePoints = apps.get_model("userstories", "RolePoints")
-        Role = apps.get_model("users", "Role")
 
         # Get all available roles on this project
-        roles = self.get_roles().filter(computable=True)
-        if roles.count() == 0:
+        roles = list(self.get_roles().filter(computable=True))
+        if len(roles) == 0:
             return
 
         # Iter over all project user stories and create
@@ -410,16 +409,18 @@ class Project(ProjectDefaults, TaggedMixin, TagsColorsdMixin, models.Model):
             name = slugify_uniquely_for_queryset("?", self.points.all(), slugfield="name")
             null_points_value = Points.objects.create(name=name, value=None, project=self)
 
-        for us in user_stories:
-            usroles = Role.objects.filter(role_points__in=us.role_points.all()).distinct()
-            new_roles = roles.exclude(id__in=usroles)
-            new_rolepoints = [RolePoints(role=role, user_story=us, points=null_points_value)
-                              for role in new_roles]
-            RolePoints.objects.bulk_create(new_rolepoints)
+        # The role points of all the user stories are checked and created at once
+        user_stories = list(user_stories)
+        usroles = set(RolePoints.objects.filter(user_story__in=user_stories)
+                                        .values_list("user_story_id", "role_id"))
+        new_rolepoints = [RolePoints(role=role, user_story=us, points=null_points_value)
+                          for us in user_stories
+                          for role in roles if (us.id, role.id) not in usroles]
+        RolePoints.objects.bulk_create(new_rolepoints)
 
         # Now remove rolepoints associated with not existing roles.
         rp_query = RolePoints.objects.filter(user_story__in=self.user_stories.all())
-        rp_query = rp_query.exclude(role__id__in=roles.values_list("id", flat=True))
+        rp_query = rp_query.exclude(role__id__in=[role.id for role in roles])
         rp_query.delete()
 
     @property
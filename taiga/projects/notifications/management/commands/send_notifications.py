@@ -16,16 +16,26 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-
 from django.core.management.base import BaseCommand
 
-from taiga.base.utils.iterators import iter_queryset
-from taiga.projects.notifications.models import HistoryChangeNotification
-from taiga.projects.notifications.services import send_sync_notifications
+from taiga.projects.notifications.services import NOTIFICATIONS_BATCH_SIZE, process_sync_notifications
+
 
 class Command(BaseCommand):
+    help = "Send the pending change notifications"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-b", "--batch-size",
+                            action="store",
+                            dest="batch_size",
+                            type=int,
+                            default=NOTIFICATIONS_BATCH_SIZE,
+                            help="Notifications processed per transaction. ({} by default)".format(
+                                NOTIFICATIONS_BATCH_SIZE))
 
     def handle(self, *args, **options):
-        qs = HistoryChangeNotification.objects.all()
-        for change_notification in iter_queryset(qs, itersize=100):
-            send_sync_notifications(change_notification.pk)
+        stats = process_sync_notifications(batch_size=options["batch_size"])
+
+        elapsed = stats["elapsed"] or 1e-9
+        self.stdout.write("{} notifications, {} emails sent in {:.2f}s ({:.1f} emails/s)".format(
+            stats["notifications"], stats["emails"], stats["elapsed"], stats["emails"] / elapsed))
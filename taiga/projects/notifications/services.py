@@ -17,26 +17,30 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
+import time
 
-from functools import partial
+from collections import defaultdict
+from contextlib import closing
 
 from django.apps import apps
-from django.db import IntegrityError, transaction
+from django.db import IntegrityError, connection, transaction
 from django.db.models import Q
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives, get_connection as get_mail_connection
 from django.utils import timezone
+from django.utils.html import escape
 from django.conf import settings
 from django.utils.translation import ugettext as _
 
 from taiga.base import exceptions as exc
 from taiga.base.mails import InlineCSSTemplateMail
+from taiga.base.utils.iterators import split_by_n
 from taiga.projects.notifications.choices import NotifyLevel
 from taiga.projects.history.choices import HistoryType
 from taiga.projects.history.services import (make_key_from_model_object,
                                              get_last_snapshot_for_key,
                                              get_model_from_key)
-from taiga.permissions.services import user_has_perm
 
 from .models import HistoryChangeNotification, Watched
 
@@ -108,25 +112,88 @@ def analize_object_for_watchers(obj:object, comment:str, user:object):
         obj.add_watcher(user)
 
 
-def _filter_by_permissions(obj, user):
+def _get_view_permission(obj):
     UserStory = apps.get_model("userstories", "UserStory")
     Issue = apps.get_model("issues", "Issue")
     Task = apps.get_model("tasks", "Task")
     WikiPage = apps.get_model("wiki", "WikiPage")
 
     if isinstance(obj, UserStory):
-        return user_has_perm(user, "view_us", obj, cache="project")
+        return "view_us"
     elif isinstance(obj, Issue):
-        return user_has_perm(user, "view_issues", obj, cache="project")
+        return "view_issues"
     elif isinstance(obj, Task):
-        return user_has_perm(user, "view_tasks", obj, cache="project")
+        return "view_tasks"
     elif isinstance(obj, WikiPage):
-        return user_has_perm(user, "view_wiki_pages", obj, cache="project")
-    return False
+        return "view_wiki_pages"
+    return None
 
 
-def _filter_notificable(user):
-    return user.is_active and not user.is_system
+def _get_users_to_notify_sql(obj, *, columns, discard_users=None):
+    """
+    Build the query that resolves the notifiable users of an object:
+
+    - members and project watchers with the "all" notify level
+    - object watchers and participants (owner and assigned user) with
+      the "all" or "involved" notify level (users without notify policy
+      are considered "involved")
+
+    Only active, non system users with permission to view the object
+    are returned.
+    """
+    project = obj.get_project()
+    content_type = ContentType.objects.get_for_model(obj)
+    participants = [user_id for user_id in (getattr(obj, "owner_id", None),
+                                            getattr(obj, "assigned_to_id", None))
+                    if user_id is not None]
+    discard_ids = [user.id for user in discard_users or []]
+
+    sql = """
+        WITH candidates AS (
+            SELECT "notifications_notifypolicy"."user_id"
+              FROM "notifications_notifypolicy"
+             WHERE "notifications_notifypolicy"."project_id" = %(project_id)s
+               AND "notifications_notifypolicy"."notify_level" = %(level_all)s
+             UNION
+            SELECT "notifications_watched"."user_id"
+              FROM "notifications_watched"
+             WHERE "notifications_watched"."content_type_id" = %(content_type_id)s
+               AND "notifications_watched"."object_id" = %(object_id)s
+             UNION
+            SELECT unnest(%(participants)s::integer[])
+        )
+            SELECT {columns}
+              FROM candidates
+        INNER JOIN "users_user" ON ("users_user"."id" = candidates."user_id")
+        INNER JOIN "projects_project" ON ("projects_project"."id" = %(project_id)s)
+         LEFT JOIN "notifications_notifypolicy" ON ("notifications_notifypolicy"."user_id" = "users_user"."id"
+                                                    AND "notifications_notifypolicy"."project_id" = %(project_id)s)
+         LEFT JOIN "projects_membership" ON ("projects_membership"."user_id" = "users_user"."id"
+                                             AND "projects_membership"."project_id" = %(project_id)s)
+         LEFT JOIN "users_role" ON ("users_role"."id" = "projects_membership"."role_id")
+             WHERE "users_user"."is_active"
+               AND NOT "users_user"."is_system"
+               AND NOT ("users_user"."id" = ANY(%(discard_ids)s::integer[]))
+               AND COALESCE("notifications_notifypolicy"."notify_level", %(level_involved)s)
+                   IN (%(level_all)s, %(level_involved)s)
+               AND ("users_user"."is_superuser"
+                    OR "projects_membership"."is_admin"
+                    OR %(perm)s = ANY("users_role"."permissions")
+                    OR %(perm)s = ANY("projects_project"."public_permissions")
+                    OR %(perm)s = ANY("projects_project"."anon_permissions"))
+    """.format(columns=columns)
+
+    params = {
+        "project_id": project.id,
+        "content_type_id": content_type.id,
+        "object_id": obj.id,
+        "participants": participants,
+        "discard_ids": discard_ids,
+        "level_all": NotifyLevel.all,
+        "level_involved": NotifyLevel.involved,
+        "perm": _get_view_permission(obj),
+    }
+    return sql, params
 
 
 def get_users_to_notify(obj, *, discard_users=None) -> list:
@@ -137,31 +204,26 @@ def get_users_to_notify(obj, *, discard_users=None) -> list:
     NOTE: changer at this momment is not used.
     NOTE: analogouts to obj.get_watchers_to_notify(changer)
     """
-    project = obj.get_project()
-
-    def _check_level(project:object, user:object, levels:tuple) -> bool:
-        policy = project.cached_notify_policy_for_user(user)
-        return policy.notify_level in levels
+    if _get_view_permission(obj) is None:
+        return frozenset()
 
-    _can_notify_hard = partial(_check_level, project,
-                               levels=[NotifyLevel.all])
-    _can_notify_light = partial(_check_level, project,
-                                levels=[NotifyLevel.all, NotifyLevel.involved])
+    sql, params = _get_users_to_notify_sql(obj, columns='"users_user".*', discard_users=discard_users)
+    return frozenset(get_user_model().objects.raw(sql, params))
 
-    candidates = set()
-    candidates.update(filter(_can_notify_hard, project.members.all()))
-    candidates.update(filter(_can_notify_hard, obj.project.get_watchers()))
-    candidates.update(filter(_can_notify_light, obj.get_watchers()))
-    candidates.update(filter(_can_notify_light, obj.get_participants()))
 
-    # Remove the changer from candidates
-    if discard_users:
-        candidates = candidates - set(discard_users)
+def get_user_ids_and_emails_to_notify(obj, *, discard_users=None) -> list:
+    """
+    Same as get_users_to_notify but only return (id, email) tuples,
+    without building any model instance.
+    """
+    if _get_view_permission(obj) is None:
+        return []
 
-    candidates = set(filter(partial(_filter_by_permissions, obj), candidates))
-    # Filter disabled and system users
-    candidates = set(filter(partial(_filter_notificable), candidates))
-    return frozenset(candidates)
+    sql, params = _get_users_to_notify_sql(obj, columns='"users_user"."id", "users_user"."email"',
+                                           discard_users=discard_users)
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
 
 
 def _resolve_template_name(model:object, *, change_type:int) -> str:
@@ -216,8 +278,8 @@ def send_notifications(obj, *, history):
 
     # Get a complete list of notifiable users for current
     # object and send the change notification to them.
-    notify_users = get_users_to_notify(obj, discard_users=[notification.owner])
-    notification.notify_users.add(*notify_users)
+    notify_users = get_user_ids_and_emails_to_notify(obj, discard_users=[notification.owner])
+    notification.notify_users.add(*[user_id for user_id, email in notify_users])
 
     # If we are the min interval is 0 it just work in a synchronous and spamming way
     if settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL == 0:
@@ -225,21 +287,91 @@ def send_notifications(obj, *, history):
 
 
 @transaction.atomic
-def send_sync_notifications(notification_id):
+def send_notifications_in_bulk(objs, *, histories):
     """
-    Given changed instance, calculate the history entry and
-    a complete list for users to notify, send
-    email to all users.
+    Like `send_notifications` for a list of new objects of the same
+    model (i.e. created in bulk). All of them must have the same
+    project and involved users, so the notifiable users are
+    computed only once.
     """
-
-    notification = HistoryChangeNotification.objects.select_for_update().get(pk=notification_id)
-    # If the last modification is too recent we ignore it
-    now = timezone.now()
-    time_diff = now - notification.updated_datetime
-    if time_diff.seconds < settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL:
+    objs_by_key = {make_key_from_model_object(obj): obj for obj in objs}
+    pairs = [(objs_by_key[history.key], history) for history in histories if not history.is_hidden]
+    if not pairs:
         return
 
-    history_entries = tuple(notification.history_entries.all().order_by("created_at"))
+    obj, history = pairs[0]
+    owner = get_user_model().objects.get(pk=history.user["pk"])
+    notify_users = get_user_ids_and_emails_to_notify(obj, discard_users=[owner])
+
+    # New objects have no pending notifications, so they are created without
+    # get_or_create and fetched again for their ids
+    keys = {make_key_from_model_object(obj): history for obj, history in pairs}
+    HistoryChangeNotification.objects.bulk_create([
+        HistoryChangeNotification(key=key, owner=owner, project=obj.project, history_type=history.type)
+        for key, history in keys.items()
+    ])
+    notifications = dict(HistoryChangeNotification.objects.filter(key__in=keys.keys(),
+                                                                  owner=owner,
+                                                                  project=obj.project,
+                                                                  history_type=history.type)
+                                                          .values_list("key", "id"))
+
+    entries_model = HistoryChangeNotification.history_entries.through
+    entries_model.objects.bulk_create([entries_model(historychangenotification_id=notifications[key],
+                                                     historyentry_id=history.id)
+                                       for key, history in keys.items()])
+
+    users_model = HistoryChangeNotification.notify_users.through
+    users_model.objects.bulk_create([users_model(historychangenotification_id=notification_id,
+                                                 user_id=user_id)
+                                     for notification_id in notifications.values()
+                                     for user_id, email in notify_users])
+
+    # If we are the min interval is 0 it just work in a synchronous and spamming way
+    if settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL == 0:
+        for notification_id in notifications.values():
+            send_sync_notifications(notification_id)
+
+
+# Notifications locked and rendered per transaction by process_sync_notifications
+NOTIFICATIONS_BATCH_SIZE = 100
+
+# Messages handed to the mail backend per send_messages call
+MAIL_CHUNK_SIZE = 100
+
+# The notification emails are rendered once per language with this token as
+# the recipient name, and the token is replaced with the real name later.
+_RECIPIENT_PLACEHOLDER = "TAIGANOTIFICATIONRECIPIENT"
+
+
+class _RecipientPlaceholder:
+    def get_full_name(self):
+        return _RECIPIENT_PLACEHOLDER
+
+    def __str__(self):
+        return _RECIPIENT_PLACEHOLDER
+
+
+def _personalize_email(email, user):
+    # The templates are autoescaped, so is the name that replaces the token
+    name = escape(user.get_full_name())
+    message = EmailMultiAlternatives(subject=email.subject.replace(_RECIPIENT_PLACEHOLDER, name),
+                                     body=email.body.replace(_RECIPIENT_PLACEHOLDER, name),
+                                     from_email=email.from_email,
+                                     to=[user.email],
+                                     headers=email.extra_headers)
+    message.content_subtype = email.content_subtype
+    for content, mimetype in email.alternatives:
+        message.attach_alternative(content.replace(_RECIPIENT_PLACEHOLDER, name), mimetype)
+    return message
+
+
+def _get_notification_messages(notification):
+    """
+    Build the email messages of a notification. The template is rendered
+    once per language of the recipients instead of once per recipient.
+    """
+    history_entries = tuple(sorted(notification.history_entries.all(), key=lambda e: e.created_at))
     obj, _ = get_last_snapshot_for_key(notification.key)
     obj_class = get_model_from_key(obj.key)
 
@@ -278,17 +410,88 @@ def send_sync_notifications(notification_id):
         "Thread-Index": make_ms_thread_index("<{project_slug}/{msg_id}@{domain}>".format(**format_args), now)
     }
 
-    for user in notification.notify_users.distinct():
-        context["user"] = user
-        context["lang"] = user.lang or settings.LANGUAGE_CODE
-        email.send(user.email, context, headers=headers)
+    users_by_lang = defaultdict(list)
+    for user in notification.notify_users.all():
+        users_by_lang[user.lang or settings.LANGUAGE_CODE].append(user)
+
+    messages = []
+    for lang, users in users_by_lang.items():
+        context["user"] = _RecipientPlaceholder()
+        context["lang"] = lang
+        rendered_email = email.make_email_object(_RECIPIENT_PLACEHOLDER, context, headers=headers)
+        messages += [_personalize_email(rendered_email, user) for user in users]
+
+    return messages
 
+
+def _send_messages(messages, chunk_size=MAIL_CHUNK_SIZE):
+    if not messages:
+        return 0
+
+    sent = 0
+    mail_connection = get_mail_connection()
+    for chunk in split_by_n(messages, chunk_size):
+        sent += mail_connection.send_messages(chunk) or 0
+    return sent
+
+
+@transaction.atomic
+def send_sync_notifications(notification_id):
+    """
+    Given changed instance, calculate the history entry and
+    a complete list for users to notify, send
+    email to all users.
+    """
+
+    notification = HistoryChangeNotification.objects.select_for_update().get(pk=notification_id)
+    # If the last modification is too recent we ignore it
+    now = timezone.now()
+    time_diff = now - notification.updated_datetime
+    if time_diff.seconds < settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL:
+        return
+
+    _send_messages(_get_notification_messages(notification))
     notification.delete()
 
 
-def process_sync_notifications():
-    for notification in HistoryChangeNotification.objects.all():
-        send_sync_notifications(notification.pk)
+def process_sync_notifications(batch_size=NOTIFICATIONS_BATCH_SIZE):
+    """
+    Send all the pending notifications older than the min interval.
+
+    The notifications are locked, rendered and deleted in batches of
+    `batch_size` per transaction and the messages of every batch are
+    handed to the mail backend in chunks.
+
+    Return a dict with the number of notifications processed, the number
+    of emails sent and the elapsed time in seconds.
+    """
+    start = time.perf_counter()
+    threshold = timezone.now() - datetime.timedelta(seconds=settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL)
+    notification_ids = list(HistoryChangeNotification.objects.filter(updated_datetime__lte=threshold)
+                                                             .order_by("id")
+                                                             .values_list("id", flat=True))
+
+    processed = 0
+    sent = 0
+    for batch in split_by_n(notification_ids, batch_size):
+        with transaction.atomic():
+            notifications = list(HistoryChangeNotification.objects.select_for_update()
+                                                                  .filter(id__in=batch,
+                                                                          updated_datetime__lte=threshold)
+                                                                  .select_related("owner", "project")
+                                                                  .prefetch_related("history_entries",
+                                                                                    "notify_users"))
+            messages = []
+            for notification in notifications:
+                messages += _get_notification_messages(notification)
+
+            sent += _send_messages(messages)
+            HistoryChangeNotification.objects.filter(id__in=[n.id for n in notifications]).delete()
+            processed += len(notifications)
+
+    return {"notifications": processed,
+            "emails": sent,
+            "elapsed": time.perf_counter() - start}
 
 
 def _get_q_watchers(obj):
@@ -57,6 +57,13 @@ def make_unique_reference_id(project, *, create=False):
     return seq.next_value(seqname)
 
 
+def make_unique_reference_ids(project, count, *, create=False):
+    seqname = make_sequence_name(project)
+    if create and not seq.exists(seqname):
+        seq.create(seqname)
+    return seq.reserve(seqname, count)
+
+
 def make_reference(instance, project, create=False):
     refval = make_unique_reference_id(project, create=create)
     ct = ContentType.objects.get_for_model(instance.__class__)
@@ -67,6 +74,19 @@ def make_reference(instance, project, create=False):
     return refval, refinstance
 
 
+def make_references_in_bulk(instances, project):
+    """
+    Create the Reference objects of a list of already inserted instances,
+    all of the same model, with the refs they have attached.
+    """
+    ct = ContentType.objects.get_for_model(instances[0].__class__)
+    return Reference.objects.bulk_create([Reference(content_type=ct,
+                                                    object_id=instance.pk,
+                                                    ref=instance.ref,
+                                                    project=project)
+                                          for instance in instances])
+
+
 def create_sequence(sender, instance, created, **kwargs):
     if not created:
         return
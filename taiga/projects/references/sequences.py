@@ -16,19 +16,69 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import threading
+
 from contextlib import closing
+from functools import partial
 from django.db import connection
 from django.db import ProgrammingError
 
 
+# Sequences known to exist, so `exists` doesn't query pg_class for them
+# again. The ones created (or found) inside a transaction are only added
+# when it is committed, by an on_commit callback per sequence, so Django
+# drops them with the savepoint or transaction that is rolled back.
+_known_sequences = set()
+_pending = threading.local()
+
+
+def _get_pending_sequences() -> set:
+    """
+    Return the sequences created (or found) in the current transaction.
+
+    Django replaces the list of on_commit callbacks of the connection on
+    every rollback (of a savepoint or of the whole transaction), dropping
+    the ones registered since then, so the pending sequences are only
+    trusted while it is the same list.
+    """
+    if getattr(_pending, "run_on_commit", None) is not connection.run_on_commit:
+        _pending.run_on_commit = connection.run_on_commit
+        _pending.sequences = set()
+    return _pending.sequences
+
+
+def _remember(seqname:str) -> None:
+    if not connection.in_atomic_block:
+        _known_sequences.add(seqname)
+        return
+
+    pending = _get_pending_sequences()
+    if seqname not in pending:
+        pending.add(seqname)
+        connection.on_commit(partial(_known_sequences.add, seqname))
+
+
+def _forget(seqname:str) -> None:
+    _known_sequences.discard(seqname)
+    if connection.in_atomic_block:
+        _get_pending_sequences().discard(seqname)
+        # Undo a pending _remember of the same transaction on commit
+        connection.on_commit(partial(_known_sequences.discard, seqname))
+
+
 def create(seqname:str, start=1) -> None:
     sql = "CREATE SEQUENCE {0} START %s".format(seqname)
 
     with closing(connection.cursor()) as cursor:
         cursor.execute(sql, [start])
 
+    _remember(seqname)
+
 
 def exists(seqname:str) -> bool:
+    if seqname in _known_sequences or seqname in _get_pending_sequences():
+        return True
+
     sql = """
     SELECT EXISTS(
       SELECT relname FROM pg_class
@@ -38,7 +88,10 @@ def exists(seqname:str) -> bool:
     with closing(connection.cursor()) as cursor:
         cursor.execute(sql, [seqname])
         result = cursor.fetchone()
-        return result[0]
+
+    if result[0]:
+        _remember(seqname)
+    return result[0]
 
 
 def alter(seqname:str, value:int) -> None:
@@ -48,6 +101,7 @@ def alter(seqname:str, value:int) -> None:
 
 
 def delete(seqname:str) -> None:
+    _forget(seqname)
     sql = "DROP SEQUENCE {0};".format(seqname)
     with closing(connection.cursor()) as cursor:
         cursor.execute(sql)
@@ -59,6 +113,21 @@ def next_value(seqname):
         result = cursor.fetchone()
         return result[0]
 
+def reserve(seqname, n):
+    """
+    Reserve `n` values of the sequence with one query. They are
+    returned in increasing order, as a range if they are contiguous
+    (they may not be with concurrent reservations) or as a list.
+    """
+    sql = "SELECT nextval(%s) FROM generate_series(1, %s);"
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, [seqname, n])
+        values = [row[0] for row in cursor.fetchall()]
+
+    if values and values[-1] - values[0] == len(values) - 1:
+        return range(values[0], values[-1] + 1)
+    return values
+
 def set_max(seqname, new_value):
     sql = "SELECT setval(%s, GREATEST(nextval(%s), %s));"
     with closing(connection.cursor()) as cursor:
@@ -27,3 +27,17 @@ def get_instance_by_ref(project_id, obj_ref):
         instance = None
 
     return instance
+
+
+def get_instances_by_refs(project_id, obj_refs):
+    """
+    Get the references of a project for several refs with a single query
+    (and another one per referenced content type to prefetch the objects).
+
+    Return a dict ref -> Reference instance; missing refs are not included.
+    """
+    model_cls = apps.get_model("references", "Reference")
+    qs = (model_cls.objects.filter(project_id=project_id, ref__in=obj_refs)
+                           .select_related("content_type")
+                           .prefetch_related("content_object"))
+    return {instance.ref: instance for instance in qs}
@@ -19,6 +19,9 @@
 # This makes all code that import services works and
 # is not the baddest practice ;)
 
+from .bulk_create import insert_items_in_bulk
+from .bulk_create import notify_items_created_in_bulk
+
 from .bulk_update_order import update_projects_order_in_bulk
 from .bulk_update_order import bulk_update_severity_order
 from .bulk_update_order import bulk_update_priority_order
@@ -28,6 +31,8 @@ from .bulk_update_order import bulk_update_task_status_order
 from .bulk_update_order import bulk_update_points_order
 from .bulk_update_order import bulk_update_userstory_status_order
 from .bulk_update_order import apply_order_updates
+from .bulk_update_order import rebalance_orders
+from .bulk_update_order import rebalance_orders_if_needed
 
 from .filters import get_all_tags
 
@@ -55,6 +60,9 @@ from .projects import delete_project
 from .stats import get_stats_for_project_issues
 from .stats import get_stats_for_project
 from .stats import get_member_stats_for_project
+from .stats import get_cached_project_stats
+from .stats import invalidate_project_stats
+from .stats import invalidate_project_stats_on_commit
 
 from .transfer import request_project_transfer, start_project_transfer
 from .transfer import accept_project_transfer, reject_project_transfer
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2016 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2016 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2016 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2016 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.db import connection, transaction
+
+from taiga.base.utils.db import get_typename_for_model_class
+from taiga.events import events
+from taiga.events import middleware as mw
+from taiga.projects.history.services import take_creation_snapshots_in_bulk
+from taiga.projects.notifications.services import send_notifications_in_bulk
+
+from .stats import invalidate_project_stats_on_commit
+
+
+@transaction.atomic
+def insert_items_in_bulk(instances, *, project, precall=None):
+    """Insert a list of new user stories, tasks or issues (all of the same
+    model) without saving them one by one.
+
+    The refs are reserved with one call to the project sequence and the
+    items, their references and their custom attributes values are
+    inserted with one query each. No model signal is sent.
+
+    :param instances: List of new model instances.
+    :param project: Project of the instances.
+    :param precall: Callback to execute for each instance before the insert.
+
+    :return: The list of instances, with their pk and ref.
+    """
+    from taiga.projects.references.models import make_unique_reference_ids
+    from taiga.projects.references.models import make_references_in_bulk
+
+    if not instances:
+        return instances
+
+    model = instances[0].__class__
+
+    for instance in instances:
+        if precall is not None:
+            precall(instance)
+        instance.set_default_values()
+
+    refs = make_unique_reference_ids(project, len(instances))
+    for instance, ref in zip(instances, refs):
+        instance.ref = ref
+
+    model.objects.bulk_create(instances)
+
+    # bulk_create doesn't set the pk of the instances on postgresql
+    ids = dict(model.objects.filter(project=project, ref__in=refs).values_list("ref", "id"))
+    for instance in instances:
+        instance.id = ids[instance.ref]
+        instance._state.adding = False
+        instance._state.db = model.objects.db
+
+    make_references_in_bulk(instances, project)
+
+    values_field = model._meta.get_field("custom_attributes_values")
+    values_model = values_field.related_model
+    values_model.objects.bulk_create([values_model(attributes_values={}, **{values_field.field.name: instance})
+                                      for instance in instances])
+
+    return instances
+
+
+@transaction.atomic
+def notify_items_created_in_bulk(instances, *, project, user=None, callback=None):
+    """Record and announce the creation of the items inserted with
+    `insert_items_in_bulk`.
+
+    The history entries (if `user` is given) and the change
+    notifications are created in bulk, and only one event is emitted
+    with the ids of all the items.
+
+    :param instances: List of inserted model instances.
+    :param project: Project of the instances.
+    :param user: Author of the creation.
+    :param callback: Callback to execute for each instance at the end.
+    """
+    if not instances:
+        return
+
+    if user is not None:
+        histories = take_creation_snapshots_in_bulk(instances, user=user)
+        send_notifications_in_bulk(instances, histories=histories)
+
+    ids = [instance.id for instance in instances]
+    content_type = get_typename_for_model_class(instances[0].__class__)
+    sessionid = mw.get_current_session_id()
+    connection.on_commit(lambda: events.emit_event_for_ids(ids=ids,
+                                                           content_type=content_type,
+                                                           projectid=project.pk,
+                                                           type="create",
+                                                           sessionid=sessionid))
+    invalidate_project_stats_on_commit(project.id)
+
+    if callback is not None:
+        for instance in instances:
+            callback(instance, created=True)
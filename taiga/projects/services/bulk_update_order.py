@@ -16,9 +16,15 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from django.db import transaction, connection
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
 
+from taiga.base.utils import db
+from taiga.celery import app
+from taiga.events import events
 from taiga.projects import models
 
 from contextlib import suppress
@@ -34,34 +40,89 @@ def apply_order_updates(base_orders: dict, new_orders: dict):
     and the extra calculated ones applied.
     Extra order updates can be needed when moving elements to intermediate positions.
     The elements where no order update is needed will be removed.
+
+    Only the elements colliding with a moved one are shifted: the elements in the
+    new position are moved one position forward, displacing the ones there, and
+    so on until a free position (a gap in the orders) is reached. The resulting
+    order is the same as shifting every following element but only the rows
+    that really change need to be written.
+
+    The orders of the user stories and tasks are spaced by ORDERS_STRIDE (see
+    `rebalance_orders`), so an element moved after another one usually takes a
+    free position and it is the only one written.
     """
-    updated_order_ids = set()
+    # Elements that are not moved indexed by its current order
+    positions = {}
+    for id, order in base_orders.items():
+        if id not in new_orders:
+            positions.setdefault(order, []).append(id)
+
+    updated_orders = {}
+
     # We will apply the multiple order changes by the new position order
-    sorted_new_orders = [(k, v) for k, v in new_orders.items()]
-    sorted_new_orders = sorted(sorted_new_orders, key=lambda e: e[1])
-
-    for new_order in sorted_new_orders:
-        old_order = base_orders[new_order[0]]
-        new_order = new_order[1]
-        for id, order in base_orders.items():
-            # When moving forward only the elements contained in the range new_order - old_order
-            # positions need to be updated
-            moving_backward = new_order <= old_order and order >= new_order and order < old_order
-            # When moving backward all the elements from the new_order position need to bee updated
-            moving_forward = new_order >= old_order and order >= new_order
-            if moving_backward or moving_forward:
-                base_orders[id] += 1
-                updated_order_ids.add(id)
+    for id, order in sorted(new_orders.items(), key=lambda e: e[1]):
+        shifting = positions.pop(order, [])
+        while shifting:
+            order += 1
+            displaced = positions.pop(order, [])
+            positions[order] = shifting
+            for shifted_id in shifting:
+                updated_orders[shifted_id] = order
+            shifting = displaced
 
     # Overwritting the orders specified
-    for id, order in new_orders.items():
-        if base_orders[id] != order:
-            base_orders[id] = order
-            updated_order_ids.add(id)
+    updated_orders.update(new_orders)
 
     # Remove not modified elements
-    removing_keys = [id for id in base_orders if id not in updated_order_ids]
-    [base_orders.pop(id, None) for id in removing_keys]
+    base_orders.clear()
+    base_orders.update(updated_orders)
+
+
+@app.task
+def rebalance_orders(model_label: str, field: str, filters: dict):
+    """
+    Space by ORDERS_STRIDE the orders of the list of elements of the model
+    `model_label` ("app_label.ModelName") matching `filters`, keeping their
+    relative order, so the next moves in it don't shift the rest of elements.
+
+    Return the orders written.
+    """
+    model = apps.get_model(model_label)
+    stride = settings.ORDERS_STRIDE
+
+    with transaction.atomic():
+        elements = (model.objects.select_for_update()
+                                 .filter(**filters)
+                                 .order_by(field, "id")
+                                 .values_list("id", field))
+
+        new_orders = {}
+        for position, (id, order) in enumerate(elements, 1):
+            if order != position * stride:
+                new_orders[id] = position * stride
+
+        db.update_attr_in_bulk_for_ids(new_orders, field, model)
+
+    if new_orders:
+        events.emit_event_for_ids(ids=list(new_orders.keys()),
+                                  content_type=db.get_typename_for_model_class(model),
+                                  projectid=filters["project_id"])
+    return new_orders
+
+
+def rebalance_orders_if_needed(model, field: str, filters: dict, shifted: int):
+    """
+    Rebalance a list (see `rebalance_orders`), once the transaction is committed,
+    if a move had to shift more than ORDERS_REBALANCE_THRESHOLD of its elements.
+    """
+    if shifted <= settings.ORDERS_REBALANCE_THRESHOLD:
+        return
+
+    model_label = model._meta.label
+    if settings.CELERY_ENABLED:
+        connection.on_commit(lambda: rebalance_orders.delay(model_label, field, filters))
+    else:
+        connection.on_commit(lambda: rebalance_orders(model_label, field, filters))
 
 
 def update_projects_order_in_bulk(bulk_data: list, field: str, user):
@@ -82,130 +143,46 @@ def update_projects_order_in_bulk(bulk_data: list, field: str, user):
 
     apply_order_updates(memberships_orders, new_memberships_orders)
 
-    from taiga.base.utils import db
     db.update_attr_in_bulk_for_ids(memberships_orders, field, model=models.Membership)
 
 
 @transaction.atomic
 def bulk_update_userstory_status_order(project, user, data):
-    cursor = connection.cursor()
-
-    sql = """
-    prepare bulk_update_order as update projects_userstorystatus set "order" = $1
-        where projects_userstorystatus.id = $2 and
-              projects_userstorystatus.project_id = $3;
-    """
-    cursor.execute(sql)
-    for id, order in data:
-        cursor.execute("EXECUTE bulk_update_order (%s, %s, %s);",
-                       (order, id, project.id))
-    cursor.execute("DEALLOCATE bulk_update_order")
-    cursor.close()
+    db.update_attr_in_bulk_for_ids(dict(data), "order", models.UserStoryStatus,
+                                   filters={"project_id": project.id})
 
 
 @transaction.atomic
 def bulk_update_points_order(project, user, data):
-    cursor = connection.cursor()
-
-    sql = """
-    prepare bulk_update_order as update projects_points set "order" = $1
-        where projects_points.id = $2 and
-              projects_points.project_id = $3;
-    """
-
-    cursor.execute(sql)
-    for id, order in data:
-        cursor.execute("EXECUTE bulk_update_order (%s, %s, %s);",
-                       (order, id, project.id))
-    cursor.execute("DEALLOCATE bulk_update_order")
-    cursor.close()
+    db.update_attr_in_bulk_for_ids(dict(data), "order", models.Points,
+                                   filters={"project_id": project.id})
 
 
 @transaction.atomic
 def bulk_update_task_status_order(project, user, data):
-    cursor = connection.cursor()
-
-    sql = """
-    prepare bulk_update_order as update projects_taskstatus set "order" = $1
-        where projects_taskstatus.id = $2 and
-              projects_taskstatus.project_id = $3;
-    """
-
-    cursor.execute(sql)
-    for id, order in data:
-        cursor.execute("EXECUTE bulk_update_order (%s, %s, %s);",
-                       (order, id, project.id))
-    cursor.execute("DEALLOCATE bulk_update_order")
-    cursor.close()
+    db.update_attr_in_bulk_for_ids(dict(data), "order", models.TaskStatus,
+                                   filters={"project_id": project.id})
 
 
 @transaction.atomic
 def bulk_update_issue_status_order(project, user, data):
-    cursor = connection.cursor()
-
-    sql = """
-    prepare bulk_update_order as update projects_issuestatus set "order" = $1
-        where projects_issuestatus.id = $2 and
-              projects_issuestatus.project_id = $3;
-    """
-
-    cursor.execute(sql)
-    for id, order in data:
-        cursor.execute("EXECUTE bulk_update_order (%s, %s, %s);",
-                       (order, id, project.id))
-    cursor.execute("DEALLOCATE bulk_update_order")
-    cursor.close()
+    db.update_attr_in_bulk_for_ids(dict(data), "order", models.IssueStatus,
+                                   filters={"project_id": project.id})
 
 
 @transaction.atomic
 def bulk_update_issue_type_order(project, user, data):
-    cursor = connection.cursor()
-
-    sql = """
-    prepare bulk_update_order as update projects_issuetype set "order" = $1
-        where projects_issuetype.id = $2 and
-              projects_issuetype.project_id = $3;
-    """
-
-    cursor.execute(sql)
-    for id, order in data:
-        cursor.execute("EXECUTE bulk_update_order (%s, %s, %s);",
-                       (order, id, project.id))
-    cursor.execute("DEALLOCATE bulk_update_order")
-    cursor.close()
+    db.update_attr_in_bulk_for_ids(dict(data), "order", models.IssueType,
+                                   filters={"project_id": project.id})
 
 
 @transaction.atomic
 def bulk_update_priority_order(project, user, data):
-    cursor = connection.cursor()
-
-    sql = """
-    prepare bulk_update_order as update projects_priority set "order" = $1
-        where projects_priority.id = $2 and
-              projects_priority.project_id = $3;
-    """
-
-    cursor.execute(sql)
-    for id, order in data:
-        cursor.execute("EXECUTE bulk_update_order (%s, %s, %s);",
-                       (order, id, project.id))
-    cursor.execute("DEALLOCATE bulk_update_order")
-    cursor.close()
+    db.update_attr_in_bulk_for_ids(dict(data), "order", models.Priority,
+                                   filters={"project_id": project.id})
 
 
 @transaction.atomic
 def bulk_update_severity_order(project, user, data):
-    cursor = connection.cursor()
-
-    sql = """
-    prepare bulk_update_order as update projects_severity set "order" = $1
-        where projects_severity.id = $2 and
-              projects_severity.project_id = $3;
-    """
-
-    cursor.execute(sql)
-    for id, order in data:
-        cursor.execute("EXECUTE bulk_update_order (%s, %s, %s);",
-                       (order, id, project.id))
-    cursor.execute("DEALLOCATE bulk_update_order")
-    cursor.close()
+    db.update_attr_in_bulk_for_ids(dict(data), "order", models.Severity,
+                                   filters={"project_id": project.id})
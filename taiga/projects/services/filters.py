@@ -16,8 +16,12 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import OrderedDict, namedtuple
 from contextlib import closing
+from operator import itemgetter
+
 from django.db import connection
+from django.utils.translation import ugettext as _
 
 
 def _get_project_tags(project):
@@ -65,3 +69,192 @@ def get_all_tags(project):
     result.update(_get_stories_tags(project))
     result.update(_get_tasks_tags(project))
     return sorted(result)
+
+
+# Filters data
+
+ATTRIBUTE_FACET = "attribute"
+ASSIGNED_TO_FACET = "assigned_to"
+OWNERS_FACET = "owners"
+TAGS_FACET = "tags"
+
+# A facet of the filters data: the kind of values it lists, the column of the
+# filtered table they are counted by and, for attribute facets, the table
+# with the project attributes (statuses, types...)
+Facet = namedtuple("Facet", ["name", "kind", "column", "table"])
+
+
+def _get_where(queryset):
+    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
+    where, where_params = queryset.query.where.as_sql(compiler, connection)
+    return where or "TRUE", list(where_params)
+
+
+def _get_attribute_facet_sql(facet, counters, project):
+    sql = """
+        SELECT %s, "{table}"."id", "{table}"."name", NULL, "{table}"."color", "{table}"."order",
+               COALESCE("{counters}"."count", 0)
+          FROM "{table}"
+     LEFT JOIN "{counters}" ON "{counters}"."value" = "{table}"."id"
+         WHERE "{table}"."project_id" = %s
+    """.format(table=facet.table, counters=counters)
+    return sql, [facet.name, project.id]
+
+
+def _get_assigned_to_facet_sql(facet, counters, project):
+    sql = """
+        SELECT %s, "projects_membership"."user_id", "users_user"."full_name",
+               "users_user"."username", NULL, NULL, COALESCE("{counters}"."count", 0)
+          FROM "projects_membership"
+    INNER JOIN "users_user" ON "users_user"."id" = "projects_membership"."user_id"
+     LEFT JOIN "{counters}" ON "{counters}"."value" = "projects_membership"."user_id"
+         WHERE "projects_membership"."project_id" = %s
+
+     UNION ALL
+
+        -- unassigned objects
+        SELECT %s, NULL, NULL, NULL, NULL, NULL,
+               COALESCE((SELECT "count" FROM "{counters}" WHERE "value" IS NULL), 0)
+    """.format(counters=counters)
+    return sql, [facet.name, project.id, facet.name]
+
+
+def _get_owners_facet_sql(facet, counters, project):
+    sql = """
+        SELECT %s, "users_user"."id", "users_user"."full_name",
+               "users_user"."username", NULL, NULL, "{counters}"."count"
+          FROM "users_user"
+    INNER JOIN "{counters}" ON "{counters}"."value" = "users_user"."id"
+         WHERE "users_user"."is_system" IS TRUE
+            OR "users_user"."id" IN (SELECT "user_id"
+                                       FROM "projects_membership"
+                                      WHERE "project_id" = %s)
+    """.format(counters=counters)
+    return sql, [facet.name, project.id]
+
+
+def _get_tags_facet_sql(facet, counters, project):
+    sql = """
+        SELECT %s, NULL, "project_tags"."tag_color"[1], NULL, NULL, NULL,
+               COALESCE("{counters}"."count", 0)
+          FROM (SELECT reduce_dim("tags_colors") "tag_color"
+                  FROM "projects_project"
+                 WHERE "id" = %s) AS "project_tags"
+     LEFT JOIN "{counters}" ON "{counters}"."value" = "project_tags"."tag_color"[1]
+    """.format(counters=counters)
+    return sql, [facet.name, project.id]
+
+
+_FACETS_SQL = {
+    ATTRIBUTE_FACET: _get_attribute_facet_sql,
+    ASSIGNED_TO_FACET: _get_assigned_to_facet_sql,
+    OWNERS_FACET: _get_owners_facet_sql,
+    TAGS_FACET: _get_tags_facet_sql,
+}
+
+
+def get_filters_data(project, querysets, facets):
+    """
+    Given a project, a dict of querysets by facet name and a list of facets,
+    return the values of every facet with the number of objects of its
+    queryset for each one.
+
+    Every facet is counted over its own queryset, the filtered one without the
+    filter of that facet, but the table is scanned only once: the rows matching
+    any of the querysets are selected in a shared CTE, flagged with the
+    querysets they belong to, and all the facets are counted from it in a
+    single query.
+    """
+    model = querysets[facets[0].name].model
+    table = model._meta.db_table
+
+    # Facets without an active filter of its own share the same where clause
+    wheres = []
+    flags = []
+    for facet in facets:
+        where = _get_where(querysets[facet.name])
+        if where not in wheres:
+            wheres.append(where)
+        flags.append("in_{}".format(wheres.index(where)))
+
+    columns = sorted(set(facet.column for facet in facets))
+    flags_sql = ",\n".join('COALESCE(({}), FALSE) "in_{}"'.format(where, index)
+                           for index, (where, params) in enumerate(wheres))
+    any_where_sql = " OR ".join("({})".format(where) for where, params in wheres)
+    where_params = [param for where, params in wheres for param in params]
+
+    # The rows are filtered by the project (so its index is used) and by the
+    # querysets here; the flags only split them between the facets
+    sql = """
+        WITH "filtered" AS (
+            SELECT {columns},
+                   {flags}
+              FROM "{table}"
+        INNER JOIN "projects_project" ON ("{table}"."project_id" = "projects_project"."id")
+             WHERE "{table}"."project_id" = %s
+               AND ({any_where})
+        )""".format(columns=", ".join('"{}"."{}"'.format(table, column) for column in columns),
+                    flags=flags_sql,
+                    table=table,
+                    any_where=any_where_sql)
+    params = where_params + [project.id] + where_params
+
+    for index, (facet, flag) in enumerate(zip(facets, flags)):
+        if facet.kind == TAGS_FACET:
+            value = 'UNNEST("{}")'.format(facet.column)
+        else:
+            value = '"{}"'.format(facet.column)
+
+        sql += """,
+        "counters_{index}" AS (
+            SELECT "value", COUNT(*) "count"
+              FROM (SELECT {value} "value" FROM "filtered" WHERE "{flag}") AS "values"
+          GROUP BY "value"
+        )""".format(index=index, value=value, flag=flag)
+
+    facets_sql = []
+    for index, facet in enumerate(facets):
+        facet_sql, facet_params = _FACETS_SQL[facet.kind](facet, "counters_{}".format(index), project)
+        facets_sql.append(facet_sql)
+        params += facet_params
+
+    sql += "\n UNION ALL \n".join(facets_sql)
+
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    data = OrderedDict((facet.name, []) for facet in facets)
+    kinds = {facet.name: facet.kind for facet in facets}
+    for name, id, value_name, username, color, order, count in rows:
+        kind = kinds[name]
+        if kind == ATTRIBUTE_FACET:
+            data[name].append({
+                "id": id,
+                "name": _(value_name),
+                "color": color,
+                "order": order,
+                "count": count,
+            })
+        elif kind == TAGS_FACET:
+            data[name].append({
+                "name": value_name,
+                "count": count,
+            })
+        elif kind == ASSIGNED_TO_FACET or (kind == OWNERS_FACET and count > 0):
+            data[name].append({
+                "id": id,
+                "full_name": value_name or username or "",
+                "count": count,
+            })
+
+    sort_keys = {
+        ATTRIBUTE_FACET: "order",
+        ASSIGNED_TO_FACET: "full_name",
+        OWNERS_FACET: "full_name",
+        TAGS_FACET: "name",
+    }
+    for name, values in data.items():
+        values.sort(key=itemgetter(sort_keys[kinds[name]]))
+
+    return data
@@ -16,46 +16,123 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from contextlib import closing
+
+from django.conf import settings
+from django.core.cache import cache
 from django.utils.translation import ugettext as _
+from django.db import connection
 from django.db.models import Q, Count
 from django.apps import apps
 import datetime
 import copy
 import collections
+import threading
+import time
 
 
-def _count_status_object(status_obj, counting_storage):
-    if status_obj.id in counting_storage:
-        counting_storage[status_obj.id]['count'] += 1
-    else:
-        counting_storage[status_obj.id] = {}
-        counting_storage[status_obj.id]['count'] = 1
-        counting_storage[status_obj.id]['name'] = status_obj.name
-        counting_storage[status_obj.id]['id'] = status_obj.id
-        counting_storage[status_obj.id]['color'] = status_obj.color
+def _count_issues_by_status_object(issues, field):
+    """
+    Count the issues per status-like object (status, type, priority or
+    severity).
+    """
+    rows = (issues.filter(**{"{}__isnull".format(field): False})
+                  .values("{}_id".format(field), "{}__name".format(field), "{}__color".format(field))
+                  .annotate(count=Count("id"))
+                  .order_by())
+
+    counting_storage = {}
+    for row in rows:
+        obj_id = row["{}_id".format(field)]
+        counting_storage[obj_id] = {
+            'count': row["count"],
+            'name': row["{}__name".format(field)],
+            'id': obj_id,
+            'color': row["{}__color".format(field)],
+        }
+    return counting_storage
 
 
-def _count_owned_object(user_obj, counting_storage):
-    if user_obj:
-        if user_obj.id in counting_storage:
-            counting_storage[user_obj.id]['count'] += 1
-        else:
-            counting_storage[user_obj.id] = {}
-            counting_storage[user_obj.id]['count'] = 1
-            counting_storage[user_obj.id]['username'] = user_obj.username
-            counting_storage[user_obj.id]['name'] = user_obj.get_full_name()
-            counting_storage[user_obj.id]['id'] = user_obj.id
-            counting_storage[user_obj.id]['color'] = user_obj.color
-    else:
-        if 0 in counting_storage:
-            counting_storage[0]['count'] += 1
+def _count_issues_by_user(issues, field):
+    """
+    Count the issues per owner or assigned user, the issues without user
+    are counted under the id 0.
+    """
+    rows = (issues.values("{}_id".format(field), "{}__username".format(field),
+                          "{}__full_name".format(field), "{}__email".format(field),
+                          "{}__color".format(field))
+                  .annotate(count=Count("id"))
+                  .order_by())
+
+    counting_storage = {}
+    for row in rows:
+        user_id = row["{}_id".format(field)]
+        if user_id is None:
+            counting_storage[0] = {
+                'count': row["count"],
+                'username': _('Unassigned'),
+                'name': _('Unassigned'),
+                'id': 0,
+                'color': 'black',
+            }
         else:
-            counting_storage[0] = {}
-            counting_storage[0]['count'] = 1
-            counting_storage[0]['username'] = _('Unassigned')
-            counting_storage[0]['name'] = _('Unassigned')
-            counting_storage[0]['id'] = 0
-            counting_storage[0]['color'] = 'black'
+            username = row["{}__username".format(field)]
+            counting_storage[user_id] = {
+                'count': row["count"],
+                'username': username,
+                'name': row["{}__full_name".format(field)] or username or row["{}__email".format(field)],
+                'id': user_id,
+                'color': row["{}__color".format(field)],
+            }
+    return counting_storage
+
+
+def _get_issues_last_four_weeks_days(project, first_day):
+    """
+    Return the issues created and finished per day and the issues open
+    at the end of every day by (severity, priority) for the 28 days
+    starting at `first_day`. Dates are compared as naive UTC datetimes.
+    """
+    days_sql = """
+        SELECT "day",
+               COALESCE("created"."count", 0),
+               COALESCE("finished"."count", 0)
+          FROM generate_series(%(first_day)s::timestamp,
+                               %(first_day)s::timestamp + interval '27 days',
+                               interval '1 day') AS "day"
+     LEFT JOIN (SELECT date_trunc('day', "created_date" AT TIME ZONE 'UTC') AS "day", count(*) AS "count"
+                  FROM "issues_issue"
+                 WHERE "project_id" = %(project_id)s
+                   AND "created_date" AT TIME ZONE 'UTC' >= %(first_day)s::timestamp
+              GROUP BY 1) AS "created" USING ("day")
+     LEFT JOIN (SELECT date_trunc('day', "finished_date" AT TIME ZONE 'UTC') AS "day", count(*) AS "count"
+                  FROM "issues_issue"
+                 WHERE "project_id" = %(project_id)s
+                   AND "finished_date" AT TIME ZONE 'UTC' >= %(first_day)s::timestamp
+              GROUP BY 1) AS "finished" USING ("day")
+      ORDER BY "day"
+    """
+
+    open_sql = """
+        SELECT "day", "issues_issue"."severity_id", "issues_issue"."priority_id", count(*)
+          FROM generate_series(%(first_day)s::timestamp,
+                               %(first_day)s::timestamp + interval '27 days',
+                               interval '1 day') AS "day"
+    INNER JOIN "issues_issue" ON ("issues_issue"."project_id" = %(project_id)s
+                                  AND "issues_issue"."created_date" AT TIME ZONE 'UTC' < "day" + interval '1 day'
+                                  AND ("issues_issue"."finished_date" IS NULL
+                                       OR "issues_issue"."finished_date" AT TIME ZONE 'UTC' > "day"))
+      GROUP BY "day", "issues_issue"."severity_id", "issues_issue"."priority_id"
+    """
+
+    params = {"project_id": project.id, "first_day": first_day}
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(days_sql, params)
+        days = cursor.fetchall()
+        cursor.execute(open_sql, params)
+        open_issues = cursor.fetchall()
+
+    return days, open_issues
 
 
 def get_stats_for_project_issues(project):
@@ -78,21 +155,20 @@ def get_stats_for_project_issues(project):
 
     }
 
-    issues = project.issues.all().select_related(
-        'status', 'priority', 'type', 'severity', 'owner', 'assigned_to'
-    )
-    for issue in issues:
-        project_issues_stats['total_issues'] += 1
-        if issue.status is not None and issue.status.is_closed:
-            project_issues_stats['closed_issues'] += 1
+    issues = project.issues.all()
+    for row in issues.values("status__is_closed").annotate(count=Count("id")).order_by():
+        project_issues_stats['total_issues'] += row["count"]
+        if row["status__is_closed"]:
+            project_issues_stats['closed_issues'] += row["count"]
         else:
-            project_issues_stats['opened_issues'] += 1
-        _count_status_object(issue.type, project_issues_stats['issues_per_type'])
-        _count_status_object(issue.status, project_issues_stats['issues_per_status'])
-        _count_status_object(issue.priority, project_issues_stats['issues_per_priority'])
-        _count_status_object(issue.severity, project_issues_stats['issues_per_severity'])
-        _count_owned_object(issue.owner, project_issues_stats['issues_per_owner'])
-        _count_owned_object(issue.assigned_to, project_issues_stats['issues_per_assigned_to'])
+            project_issues_stats['opened_issues'] += row["count"]
+
+    project_issues_stats['issues_per_type'] = _count_issues_by_status_object(issues, "type")
+    project_issues_stats['issues_per_status'] = _count_issues_by_status_object(issues, "status")
+    project_issues_stats['issues_per_priority'] = _count_issues_by_status_object(issues, "priority")
+    project_issues_stats['issues_per_severity'] = _count_issues_by_status_object(issues, "severity")
+    project_issues_stats['issues_per_owner'] = _count_issues_by_user(issues, "owner")
+    project_issues_stats['issues_per_assigned_to'] = _count_issues_by_user(issues, "assigned_to")
 
     for severity in project_issues_stats['issues_per_severity'].values():
         project_issues_stats['last_four_weeks_days']['by_severity'][severity['id']] = copy.copy(severity)
@@ -104,33 +180,24 @@ def get_stats_for_project_issues(project):
         del(project_issues_stats['last_four_weeks_days']['by_priority'][priority['id']]['count'])
         project_issues_stats['last_four_weeks_days']['by_priority'][priority['id']]['data'] = []
 
-    for x in range(27, -1, -1):
-        day = datetime.datetime.combine(datetime.date.today(), datetime.time(0, 0)) - datetime.timedelta(days=x)
-        next_day = day + datetime.timedelta(days=1)
-
-        open_this_day = filter(lambda x: x.created_date.replace(tzinfo=None) >= day, issues)
-        open_this_day = filter(lambda x: x.created_date.replace(tzinfo=None) < next_day, open_this_day)
-        open_this_day = len(list(open_this_day))
-        project_issues_stats['last_four_weeks_days']['by_open_closed']['open'].append(open_this_day)
+    first_day = datetime.datetime.combine(datetime.date.today(), datetime.time(0, 0)) - datetime.timedelta(days=27)
+    days, open_issues = _get_issues_last_four_weeks_days(project, first_day)
 
-        closed_this_day = filter(lambda x: x.finished_date, issues)
-        closed_this_day = filter(lambda x: x.finished_date.replace(tzinfo=None) >= day, closed_this_day)
-        closed_this_day = filter(lambda x: x.finished_date.replace(tzinfo=None) < next_day, closed_this_day)
-        closed_this_day = len(list(closed_this_day))
-        project_issues_stats['last_four_weeks_days']['by_open_closed']['closed'].append(closed_this_day)
+    open_by_severity = collections.Counter()
+    open_by_priority = collections.Counter()
+    for day, severity_id, priority_id, count in open_issues:
+        open_by_severity[(day, severity_id)] += count
+        open_by_priority[(day, priority_id)] += count
 
-        opened_this_day = filter(lambda x: x.created_date.replace(tzinfo=None) < next_day, issues)
-        opened_this_day = list(filter(lambda x: x.finished_date is None or x.finished_date.replace(tzinfo=None) > day, opened_this_day))
+    for day, created_count, finished_count in days:
+        project_issues_stats['last_four_weeks_days']['by_open_closed']['open'].append(created_count)
+        project_issues_stats['last_four_weeks_days']['by_open_closed']['closed'].append(finished_count)
 
-        for severity in project_issues_stats['last_four_weeks_days']['by_severity']:
-            by_severity = filter(lambda x: x.severity_id == severity, opened_this_day)
-            by_severity = len(list(by_severity))
-            project_issues_stats['last_four_weeks_days']['by_severity'][severity]['data'].append(by_severity)
+        for severity_id, severity in project_issues_stats['last_four_weeks_days']['by_severity'].items():
+            severity['data'].append(open_by_severity[(day, severity_id)])
 
-        for priority in project_issues_stats['last_four_weeks_days']['by_priority']:
-            by_priority = filter(lambda x: x.priority_id == priority, opened_this_day)
-            by_priority = len(list(by_priority))
-            project_issues_stats['last_four_weeks_days']['by_priority'][priority]['data'].append(by_priority)
+        for priority_id, priority in project_issues_stats['last_four_weeks_days']['by_priority'].items():
+            priority['data'].append(open_by_priority[(day, priority_id)])
 
     return project_issues_stats
 
@@ -175,7 +242,8 @@ def _get_milestones_stats_for_backlog(project, milestones):
     if total_story_points and total_milestones:
         optimal_points_per_sprint = total_story_points / total_milestones
 
-    milestones_count = len(milestones)
+    milestones_list = list(milestones.values())
+    milestones_count = len(milestones_list)
     milestones_stats = []
     for current_milestone_pos in range(0, max(milestones_count, total_milestones)):
         optimal_points = (total_story_points -
@@ -185,7 +253,7 @@ def _get_milestones_stats_for_backlog(project, milestones):
                         if current_evolution is not None else None)
 
         if current_milestone_pos < milestones_count:
-            current_milestone = list(milestones.values())[current_milestone_pos]
+            current_milestone = milestones_list[current_milestone_pos]
             milestone_name = current_milestone.name
             team_increment = current_team_increment
             client_increment = current_client_increment
@@ -224,20 +292,45 @@ def _get_milestones_stats_for_backlog(project, milestones):
     return milestones_stats
 
 
-def get_stats_for_project(project):
-    # Let's fetch all the estimations related to a project with all the necesary
-    # related data
-    RolePoints = apps.get_model('userstories', 'RolePoints')
-    role_points = RolePoints.objects.filter(
-        user_story__project = project,
-    ).prefetch_related(
-        "user_story",
-        "user_story__assigned_to",
-        "user_story__milestone",
-        "user_story__status",
-        "role",
-        "points")
+def _get_points_for_backlog(project):
+    """
+    Return the estimated points of the project user stories summed by
+    role, milestone, milestone closed flag, user story closed flag,
+    requirement flags and the milestone whose dates contain the user
+    story creation date (the first one by estimated start).
+    """
+    sql = """
+        SELECT "userstories_rolepoints"."role_id",
+               "userstories_userstory"."milestone_id",
+               COALESCE("milestones_milestone"."closed", FALSE),
+               "userstories_userstory"."is_closed",
+               "userstories_userstory"."team_requirement",
+               "userstories_userstory"."client_requirement",
+               "us_milestone"."id",
+               SUM("projects_points"."value")
+          FROM "userstories_rolepoints"
+    INNER JOIN "userstories_userstory" ON ("userstories_userstory"."id" = "userstories_rolepoints"."user_story_id")
+    INNER JOIN "projects_points" ON ("projects_points"."id" = "userstories_rolepoints"."points_id")
+     LEFT JOIN "milestones_milestone" ON ("milestones_milestone"."id" = "userstories_userstory"."milestone_id")
+     LEFT JOIN LATERAL (SELECT "milestones_milestone"."id"
+                          FROM "milestones_milestone"
+                         WHERE "milestones_milestone"."project_id" = %(project_id)s
+                           AND "milestones_milestone"."estimated_start" <=
+                               ("userstories_userstory"."created_date" AT TIME ZONE 'UTC')::date
+                           AND "milestones_milestone"."estimated_finish" >
+                               ("userstories_userstory"."created_date" AT TIME ZONE 'UTC')::date
+                      ORDER BY "milestones_milestone"."estimated_start", "milestones_milestone"."id"
+                         LIMIT 1) AS "us_milestone" ON TRUE
+         WHERE "userstories_userstory"."project_id" = %(project_id)s
+           AND "projects_points"."value" IS NOT NULL
+      GROUP BY 1, 2, 3, 4, 5, 6, 7
+    """
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, {"project_id": project.id})
+        return cursor.fetchall()
+
 
+def get_stats_for_project(project):
     # Data inicialization
     project._closed_points = 0
     project._closed_points_per_role = {}
@@ -251,84 +344,61 @@ def get_stats_for_project(project):
 
     # The key will be the milestone id and it will be ordered by estimated_start
     milestones = collections.OrderedDict()
-    for milestone in project.milestones.order_by("estimated_start"):
+    for milestone in project.milestones.order_by("estimated_start", "id"):
         milestone._closed_points = 0
         milestone._team_increment_points = 0
         milestone._client_increment_points = 0
         milestones[milestone.id] = milestone
 
-    def _find_milestone_for_userstory(user_story):
-        for m in milestones.values():
-            if m.estimated_finish > user_story.created_date.date() and\
-               m.estimated_start <= user_story.created_date.date():
-
-              return m
-
-        return None
-
-    def _update_team_increment(milestone, value):
-        if milestone:
-            milestones[milestone.id]._team_increment_points += value
+    def _update_team_increment(milestone_id, value):
+        if milestone_id:
+            milestones[milestone_id]._team_increment_points += value
         else:
             project._future_team_increment += value
 
-    def _update_client_increment(milestone, value):
-        if milestone:
-            milestones[milestone.id]._client_increment_points += value
+    def _update_client_increment(milestone_id, value):
+        if milestone_id:
+            milestones[milestone_id]._client_increment_points += value
         else:
             project._future_client_increment += value
 
-    # Iterate over all the project estimations and update our stats
-    for role_point in role_points:
-        role_id = role_point.role.id
-        points_value = role_point.points.value
-        milestone = role_point.user_story.milestone
-        is_team_requirement = role_point.user_story.team_requirement
-        is_client_requirement = role_point.user_story.client_requirement
-        us_milestone = _find_milestone_for_userstory(role_point.user_story)
-
-        # None estimations doesn't affect to project stats
-        if points_value is None:
-            continue
-
+    # Update our stats with the points aggregated by the database
+    for (role_id, milestone_id, is_milestone_closed, is_closed, is_team_requirement,
+         is_client_requirement, us_milestone_id, points_value) in _get_points_for_backlog(project):
         # Total defined points
         project._defined_points += points_value
 
         # Defined points per role
-        project._defined_points_for_role = project._defined_points_per_role.get(role_id, 0)
-        project._defined_points_for_role += points_value
-        project._defined_points_per_role[role_id] = project._defined_points_for_role
+        project._defined_points_per_role[role_id] = project._defined_points_per_role.get(role_id, 0) + points_value
 
         # Closed points
-        if role_point.user_story.is_closed:
+        if is_closed:
             project._closed_points += points_value
             closed_points_for_role = project._closed_points_per_role.get(role_id, 0)
-            closed_points_for_role += points_value
-            project._closed_points_per_role[role_id] = closed_points_for_role
+            project._closed_points_per_role[role_id] = closed_points_for_role + points_value
 
-            if milestone is not None:
-                milestones[milestone.id]._closed_points += points_value
+            if milestone_id is not None:
+                milestones[milestone_id]._closed_points += points_value
 
-        if milestone is not None and milestone.closed:
+        if milestone_id is not None and is_milestone_closed:
             project._closed_points_from_closed_milestones += points_value
 
         # Assigned to milestone points
-        if role_point.user_story.milestone is not None:
+        if milestone_id is not None:
             project._assigned_points += points_value
             assigned_points_for_role = project._assigned_points_per_role.get(role_id, 0)
-            assigned_points_for_role += points_value
-            project._assigned_points_per_role[role_id] = assigned_points_for_role
+            project._assigned_points_per_role[role_id] = assigned_points_for_role + points_value
 
         # Extra requirements
         if is_team_requirement and is_client_requirement:
-            _update_team_increment(us_milestone, points_value/2)
-            _update_client_increment(us_milestone, points_value/2)
+            _update_team_increment(us_milestone_id, points_value/2)
+            _update_client_increment(us_milestone_id, points_value/2)
 
         if is_team_requirement and not is_client_requirement:
-            _update_team_increment(us_milestone, points_value)
+            _update_team_increment(us_milestone_id, points_value)
 
         if not is_team_requirement and is_client_requirement:
-            _update_client_increment(us_milestone, points_value)
+            _update_client_increment(us_milestone_id, points_value)
 
     # Speed calculations
     speed = 0
@@ -428,3 +498,80 @@ def get_member_stats_for_project(project):
         "closed_tasks": closed_tasks,
     }
     return member_stats
+
+
+def _get_project_stats_version_cache_key(project_id):
+    return "projects:stats-version:{}".format(project_id)
+
+
+def get_project_stats_version(project_id):
+    """
+    Return the current version of the stats of a project, every cached
+    stat of the project is stored under it.
+    """
+    key = _get_project_stats_version_cache_key(project_id)
+    version = cache.get(key)
+    if version is None:
+        # An evicted version must never match the keys of older entries
+        version = int(time.time() * 1000)
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def invalidate_project_stats(project_id):
+    key = _get_project_stats_version_cache_key(project_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), timeout=None)
+
+
+# Projects whose stats are invalidated when the current transaction is committed
+_pending_invalidations = threading.local()
+
+
+def _invalidate_pending_project_stats(project_ids):
+    if getattr(_pending_invalidations, "project_ids", None) is project_ids:
+        _pending_invalidations.project_ids = None
+
+    for project_id in project_ids:
+        invalidate_project_stats(project_id)
+
+
+def invalidate_project_stats_on_commit(project_id):
+    """
+    Invalidate the stats of a project after the current transaction is
+    committed, so they can't be cached again with old data, only once per
+    project whatever the number of changes in it.
+    """
+    # Django replaces the list of on_commit callbacks on every rollback (of a
+    # savepoint or of the whole transaction), so the projects of a dropped
+    # callback are scheduled again with a new one
+    if getattr(_pending_invalidations, "run_on_commit", None) is not connection.run_on_commit:
+        _pending_invalidations.run_on_commit = connection.run_on_commit
+        _pending_invalidations.project_ids = None
+
+    project_ids = getattr(_pending_invalidations, "project_ids", None)
+    if project_ids is not None:
+        project_ids.add(project_id)
+        return
+
+    project_ids = _pending_invalidations.project_ids = {project_id}
+    # Out of a transaction it is run right now
+    connection.on_commit(lambda: _invalidate_pending_project_stats(project_ids))
+
+
+def get_cached_project_stats(project, name, stats_function):
+    """
+    Return the `name` stats of a project, calculated with `stats_function`
+    only if the project data changed since the last call or the day changed
+    (some stats, like the issues ones, depend on the current date).
+    """
+    key = "projects:stats:{}:{}:{}:{}".format(name, project.id, get_project_stats_version(project.id),
+                                              datetime.date.today().isoformat())
+    stats = cache.get(key)
+    if stats is None:
+        stats = stats_function(project)
+        cache.set(key, stats, timeout=getattr(settings, "PROJECT_STATS_CACHE_TIMEOUT", 24*60*60))
+    return stats
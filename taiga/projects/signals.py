@@ -35,6 +35,27 @@ def membership_post_delete(sender, instance, using, **kwargs):
     instance.project.update_role_points()
 
 
+## Project stats
+
+def _get_stats_project_id(instance):
+    Project = apps.get_model("projects", "Project")
+    RolePoints = apps.get_model("userstories", "RolePoints")
+
+    if isinstance(instance, Project):
+        return instance.id
+    if isinstance(instance, RolePoints):
+        return instance.user_story.project_id
+    return getattr(instance, "project_id", None)
+
+
+def invalidate_project_stats(sender, instance, **kwargs):
+    from taiga.projects.services import invalidate_project_stats_on_commit
+
+    project_id = _get_stats_project_id(instance)
+    if project_id is not None:
+        invalidate_project_stats_on_commit(project_id)
+
+
 ## Notify policy
 
 def create_notify_policy(sender, instance, using, **kwargs):
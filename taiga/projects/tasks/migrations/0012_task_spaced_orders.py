@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import taiga.base.utils.time
+
+
+# The orders are spaced (by settings.ORDERS_STRIDE at the time of writing) so
+# moving a task between two others doesn't need to shift the rest
+SPACE_ORDERS = """
+    UPDATE tasks_task
+       SET us_order = us_order * 1000,
+           taskboard_order = taskboard_order * 1000;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0011_task_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='taskboard_order',
+            field=models.BigIntegerField(default=taiga.base.utils.time.timestamp_ms, verbose_name='taskboard order'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='us_order',
+            field=models.BigIntegerField(default=taiga.base.utils.time.timestamp_ms, verbose_name='us order'),
+        ),
+        migrations.RunSQL([SPACE_ORDERS],
+                          migrations.RunSQL.noop),
+    ]
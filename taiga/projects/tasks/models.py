@@ -23,6 +23,7 @@ from django.conf import settings
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+from taiga.base.utils.time import timestamp_ms
 from taiga.projects.occ import OCCModelMixin
 from taiga.projects.notifications.mixins import WatchedModelMixin
 from taiga.projects.mixins.blocked import BlockedMixin
@@ -53,10 +54,10 @@ class Task(OCCModelMixin, WatchedModelMixin, BlockedMixin, TaggedMixin, models.M
     subject = models.TextField(null=False, blank=False,
                                verbose_name=_("subject"))
 
-    us_order = models.IntegerField(null=False, blank=False, default=1,
-                                        verbose_name=_("us order"))
-    taskboard_order = models.IntegerField(null=False, blank=False, default=1,
-                                          verbose_name=_("taskboard order"))
+    us_order = models.BigIntegerField(null=False, blank=False, default=timestamp_ms,
+                                      verbose_name=_("us order"))
+    taskboard_order = models.BigIntegerField(null=False, blank=False, default=timestamp_ms,
+                                             verbose_name=_("taskboard order"))
 
     description = models.TextField(null=False, blank=True, verbose_name=_("description"))
     assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, blank=True, null=True,
@@ -78,13 +79,15 @@ class Task(OCCModelMixin, WatchedModelMixin, BlockedMixin, TaggedMixin, models.M
             ("view_task", "Can view task"),
         )
 
-    def save(self, *args, **kwargs):
+    def set_default_values(self):
         if not self._importing or not self.modified_date:
             self.modified_date = timezone.now()
 
         if not self.status:
             self.status = self.project.default_task_status
 
+    def save(self, *args, **kwargs):
+        self.set_default_values()
         return super().save(*args, **kwargs)
 
     def __str__(self):
@@ -18,23 +18,23 @@
 
 import csv
 import io
-from collections import OrderedDict
-from operator import itemgetter
-from contextlib import closing
 
-from django.db import connection
-from django.utils.translation import ugettext as _
+from django.db import transaction
 
 from taiga.base.utils import db, text
+from taiga.mdrender.service import batch_render
 from taiga.projects.history.services import take_snapshot
 from taiga.projects.services import apply_order_updates
-from taiga.projects.tasks.apps import connect_tasks_signals
-from taiga.projects.tasks.apps import disconnect_tasks_signals
+from taiga.projects.services import rebalance_orders_if_needed
+from taiga.projects.services import filters
+from taiga.projects.services import insert_items_in_bulk
+from taiga.projects.services import notify_items_created_in_bulk
 from taiga.events import events
 from taiga.projects.votes.utils import attach_total_voters_to_queryset
 from taiga.projects.notifications.utils import attach_watchers_to_queryset
 
 from . import models
+from . import signals
 
 
 #####################################################
@@ -53,23 +53,31 @@ def get_tasks_from_bulk(bulk_data, **additional_fields):
             for line in text.split_in_lines(bulk_data)]
 
 
-def create_tasks_in_bulk(bulk_data, callback=None, precall=None, **additional_fields):
+@transaction.atomic
+def create_tasks_in_bulk(bulk_data, callback=None, precall=None, user=None, **additional_fields):
     """Create tasks from `bulk_data`.
 
     :param bulk_data: List of tasks in bulk format.
-    :param callback: Callback to execute after each task save.
+    :param callback: Callback to execute after each task creation.
+    :param precall: Callback to execute before each task creation.
+    :param user: Author of the tasks history, if any.
     :param additional_fields: Additional fields when instantiating each task.
 
     :return: List of created `Task` instances.
     """
     tasks = get_tasks_from_bulk(bulk_data, **additional_fields)
+    if not tasks:
+        return tasks
 
-    disconnect_tasks_signals()
+    project = tasks[0].project
+    insert_items_in_bulk(tasks, project=project, precall=precall)
 
-    try:
-        db.save_in_bulk(tasks, callback, precall)
-    finally:
-        connect_tasks_signals()
+    # The user story and the milestone are opened or closed once, not per task
+    for task in {(t.user_story_id, t.milestone_id): t for t in tasks}.values():
+        task.prev = None
+        signals.try_to_close_or_open_us_and_milestone_when_create_or_edit_task(models.Task, task, True)
+
+    notify_items_created_in_bulk(tasks, project=project, user=user, callback=callback)
 
     return tasks
 
@@ -82,15 +90,15 @@ def update_tasks_order_in_bulk(bulk_data: list, field: str, project: object,
 
     [{'task_id': <value>, 'order': <value>}, ...]
     """
-    tasks = project.tasks.all()
+    filters = {"project_id": project.id}
     if user_story is not None:
-        tasks = tasks.filter(user_story=user_story)
+        filters["user_story_id"] = user_story.id
     if status is not None:
-        tasks = tasks.filter(status=status)
+        filters["status_id"] = status.id
     if milestone is not None:
-        tasks = tasks.filter(milestone=milestone)
+        filters["milestone_id"] = milestone.id
 
-    task_orders = {task.id: getattr(task, field) for task in tasks}
+    task_orders = dict(models.Task.objects.filter(**filters).values_list("id", field))
     new_task_orders = {e["task_id"]: e["order"] for e in bulk_data}
     apply_order_updates(task_orders, new_task_orders)
 
@@ -100,16 +108,19 @@ def update_tasks_order_in_bulk(bulk_data: list, field: str, project: object,
                               projectid=project.pk)
 
     db.update_attr_in_bulk_for_ids(task_orders, field, models.Task)
+    rebalance_orders_if_needed(models.Task, field, filters,
+                               shifted=len(task_orders) - len(new_task_orders))
     return task_orders
 
 
 def snapshot_tasks_in_bulk(bulk_data, user):
-    for task_data in bulk_data:
-        try:
-            task = models.Task.objects.get(pk=task_data['task_id'])
-            take_snapshot(task, user=user)
-        except models.Task.DoesNotExist:
-            pass
+    with batch_render():
+        for task_data in bulk_data:
+            try:
+                task = models.Task.objects.get(pk=task_data['task_id'])
+                take_snapshot(task, user=user)
+            except models.Task.DoesNotExist:
+                pass
 
 
 #####################################################
@@ -181,194 +192,12 @@ def tasks_to_csv(project, queryset):
 # Api filter data
 #####################################################
 
-def _get_tasks_statuses(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-      SELECT "projects_taskstatus"."id",
-             "projects_taskstatus"."name",
-             "projects_taskstatus"."color",
-             "projects_taskstatus"."order",
-             (SELECT count(*)
-                FROM "tasks_task"
-                     INNER JOIN "projects_project" ON
-                                ("tasks_task"."project_id" = "projects_project"."id")
-               WHERE {where} AND "tasks_task"."status_id" = "projects_taskstatus"."id")
-        FROM "projects_taskstatus"
-       WHERE "projects_taskstatus"."project_id" = %s
-    ORDER BY "projects_taskstatus"."order";
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for id, name, color, order, count in rows:
-        result.append({
-            "id": id,
-            "name": _(name),
-            "color": color,
-            "order": order,
-            "count": count,
-        })
-    return sorted(result, key=itemgetter("order"))
-
-
-def _get_tasks_assigned_to(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-        WITH counters AS (
-                SELECT assigned_to_id,  count(assigned_to_id) count
-                  FROM "tasks_task"
-            INNER JOIN "projects_project" ON ("tasks_task"."project_id" = "projects_project"."id")
-                 WHERE {where} AND "tasks_task"."assigned_to_id" IS NOT NULL
-              GROUP BY assigned_to_id
-        )
-
-                 SELECT "projects_membership"."user_id" user_id,
-                        "users_user"."full_name",
-                        "users_user"."username",
-                        COALESCE("counters".count, 0) count
-                   FROM projects_membership
-        LEFT OUTER JOIN counters ON ("projects_membership"."user_id" = "counters"."assigned_to_id")
-             INNER JOIN "users_user" ON ("projects_membership"."user_id" = "users_user"."id")
-                  WHERE "projects_membership"."project_id" = %s AND "projects_membership"."user_id" IS NOT NULL
-
-        -- unassigned tasks
-        UNION
-
-                 SELECT NULL user_id, NULL, NULL, count(coalesce(assigned_to_id, -1)) count
-                   FROM "tasks_task"
-             INNER JOIN "projects_project" ON ("tasks_task"."project_id" = "projects_project"."id")
-                  WHERE {where} AND "tasks_task"."assigned_to_id" IS NULL
-               GROUP BY assigned_to_id
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id] + where_params)
-        rows = cursor.fetchall()
-
-    result = []
-    none_valued_added = False
-    for id, full_name, username, count in rows:
-        result.append({
-            "id": id,
-            "full_name": full_name or username or "",
-            "count": count,
-        })
-
-        if id is None:
-            none_valued_added = True
-
-    # If there was no task with null assigned_to we manually add it
-    if not none_valued_added:
-        result.append({
-            "id": None,
-            "full_name": "",
-            "count": 0,
-        })
-
-    return sorted(result, key=itemgetter("full_name"))
-
-
-def _get_tasks_owners(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-        WITH counters AS (
-                SELECT "tasks_task"."owner_id" owner_id,
-                       count(coalesce("tasks_task"."owner_id", -1)) count
-                  FROM "tasks_task"
-            INNER JOIN "projects_project" ON ("tasks_task"."project_id" = "projects_project"."id")
-                 WHERE {where}
-              GROUP BY "tasks_task"."owner_id"
-        )
-
-                 SELECT "projects_membership"."user_id" id,
-                        "users_user"."full_name",
-                        "users_user"."username",
-                        COALESCE("counters".count, 0) count
-                   FROM projects_membership
-        LEFT OUTER JOIN counters ON ("projects_membership"."user_id" = "counters"."owner_id")
-             INNER JOIN "users_user" ON ("projects_membership"."user_id" = "users_user"."id")
-                  WHERE "projects_membership"."project_id" = %s AND "projects_membership"."user_id" IS NOT NULL
-
-        -- System users
-        UNION
-
-                 SELECT "users_user"."id" user_id,
-                        "users_user"."full_name" full_name,
-                        "users_user"."username" username,
-                        COALESCE("counters".count, 0) count
-                   FROM users_user
-        LEFT OUTER JOIN counters ON ("users_user"."id" = "counters"."owner_id")
-                  WHERE ("users_user"."is_system" IS TRUE)
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for id, full_name, username, count in rows:
-        if count > 0:
-            result.append({
-                "id": id,
-                "full_name": full_name or username or "",
-                "count": count,
-            })
-    return sorted(result, key=itemgetter("full_name"))
-
-
-def _get_tasks_tags(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-        WITH tasks_tags AS (
-                    SELECT tag,
-                           COUNT(tag) counter FROM (
-                                SELECT UNNEST(tasks_task.tags) tag
-                                  FROM tasks_task
-                            INNER JOIN projects_project
-                                        ON (tasks_task.project_id = projects_project.id)
-                                 WHERE {where}) tags
-                  GROUP BY tag),
-             project_tags AS (
-                    SELECT reduce_dim(tags_colors) tag_color
-                      FROM projects_project
-                     WHERE id=%s)
-
-      SELECT tag_color[1] tag, COALESCE(tasks_tags.counter, 0) counter
-        FROM project_tags
-   LEFT JOIN tasks_tags ON project_tags.tag_color[1] = tasks_tags.tag
-    ORDER BY tag
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for name, count in rows:
-        result.append({
-            "name": name,
-            "count": count,
-        })
-    return sorted(result, key=itemgetter("name"))
+TASKS_FILTERS_FACETS = [
+    filters.Facet("statuses", filters.ATTRIBUTE_FACET, "status_id", "projects_taskstatus"),
+    filters.Facet("assigned_to", filters.ASSIGNED_TO_FACET, "assigned_to_id", None),
+    filters.Facet("owners", filters.OWNERS_FACET, "owner_id", None),
+    filters.Facet("tags", filters.TAGS_FACET, "tags", None),
+]
 
 
 def get_tasks_filters_data(project, querysets):
@@ -376,11 +205,4 @@ def get_tasks_filters_data(project, querysets):
     Given a project and an tasks queryset, return a simple data structure
     of all possible filters for the tasks in the queryset.
     """
-    data = OrderedDict([
-        ("statuses", _get_tasks_statuses(project, querysets["statuses"])),
-        ("assigned_to", _get_tasks_assigned_to(project, querysets["assigned_to"])),
-        ("owners", _get_tasks_owners(project, querysets["owners"])),
-        ("tags", _get_tasks_tags(project, querysets["tags"])),
-    ])
-
-    return data
+    return filters.get_filters_data(project, querysets, TASKS_FILTERS_FACETS)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import taiga.base.utils.time
+
+
+# The orders are spaced (by settings.ORDERS_STRIDE at the time of writing) so
+# moving a user story between two others doesn't need to shift the rest
+SPACE_ORDERS = """
+    UPDATE userstories_userstory
+       SET backlog_order = backlog_order * 1000,
+           sprint_order = sprint_order * 1000,
+           kanban_order = kanban_order * 1000;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userstories', '0013_userstory_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userstory',
+            name='backlog_order',
+            field=models.BigIntegerField(default=taiga.base.utils.time.timestamp_ms, verbose_name='backlog order'),
+        ),
+        migrations.AlterField(
+            model_name='userstory',
+            name='kanban_order',
+            field=models.BigIntegerField(default=taiga.base.utils.time.timestamp_ms, verbose_name='sprint order'),
+        ),
+        migrations.AlterField(
+            model_name='userstory',
+            name='sprint_order',
+            field=models.BigIntegerField(default=taiga.base.utils.time.timestamp_ms, verbose_name='sprint order'),
+        ),
+        migrations.RunSQL([SPACE_ORDERS],
+                          migrations.RunSQL.noop),
+    ]
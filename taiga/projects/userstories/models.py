@@ -25,6 +25,7 @@ from django.utils import timezone
 
 from picklefield.fields import PickledObjectField
 
+from taiga.base.utils.time import timestamp_ms
 from taiga.projects.tagging.models import TaggedMixin
 from taiga.projects.occ import OCCModelMixin
 from taiga.projects.notifications.mixins import WatchedModelMixin
@@ -75,12 +76,12 @@ class UserStory(OCCModelMixin, WatchedModelMixin, BlockedMixin, TaggedMixin, mod
                                     related_name="userstories", through="RolePoints",
                                     verbose_name=_("points"))
 
-    backlog_order = models.IntegerField(null=False, blank=False, default=10000,
-                                        verbose_name=_("backlog order"))
-    sprint_order = models.IntegerField(null=False, blank=False, default=10000,
-                                       verbose_name=_("sprint order"))
-    kanban_order = models.IntegerField(null=False, blank=False, default=10000,
-                                       verbose_name=_("sprint order"))
+    backlog_order = models.BigIntegerField(null=False, blank=False, default=timestamp_ms,
+                                           verbose_name=_("backlog order"))
+    sprint_order = models.BigIntegerField(null=False, blank=False, default=timestamp_ms,
+                                          verbose_name=_("sprint order"))
+    kanban_order = models.BigIntegerField(null=False, blank=False, default=timestamp_ms,
+                                          verbose_name=_("sprint order"))
 
     created_date = models.DateTimeField(null=False, blank=False,
                                         verbose_name=_("created date"),
@@ -117,13 +118,15 @@ class UserStory(OCCModelMixin, WatchedModelMixin, BlockedMixin, TaggedMixin, mod
         verbose_name_plural = "user stories"
         ordering = ["project", "backlog_order", "ref"]
 
-    def save(self, *args, **kwargs):
+    def set_default_values(self):
         if not self._importing or not self.modified_date:
             self.modified_date = timezone.now()
 
         if not self.status:
             self.status = self.project.default_us_status
 
+    def save(self, *args, **kwargs):
+        self.set_default_values()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -18,19 +18,19 @@
 
 import csv
 import io
-from collections import OrderedDict
-from operator import itemgetter
-from contextlib import closing
 
-from django.db import connection
+from django.db import connection, transaction
 from django.utils import timezone
-from django.utils.translation import ugettext as _
 
 from taiga.base.utils import db, text
+from taiga.mdrender.service import batch_render
 from taiga.projects.history.services import take_snapshot
 from taiga.projects.services import apply_order_updates
-from taiga.projects.userstories.apps import connect_userstories_signals
-from taiga.projects.userstories.apps import disconnect_userstories_signals
+from taiga.projects.services import rebalance_orders_if_needed
+from taiga.projects.services import filters
+from taiga.projects.services import insert_items_in_bulk
+from taiga.projects.services import invalidate_project_stats_on_commit
+from taiga.projects.services import notify_items_created_in_bulk
 from taiga.events import events
 from taiga.projects.votes.utils import attach_total_voters_to_queryset
 from taiga.projects.notifications.utils import attach_watchers_to_queryset
@@ -54,23 +54,26 @@ def get_userstories_from_bulk(bulk_data, **additional_fields):
             for line in text.split_in_lines(bulk_data)]
 
 
-def create_userstories_in_bulk(bulk_data, callback=None, precall=None, **additional_fields):
+@transaction.atomic
+def create_userstories_in_bulk(bulk_data, callback=None, precall=None, user=None, **additional_fields):
     """Create user stories from `bulk_data`.
 
     :param bulk_data: List of user stories in bulk format.
-    :param callback: Callback to execute after each user story save.
+    :param callback: Callback to execute after each user story creation.
+    :param precall: Callback to execute before each user story creation.
+    :param user: Author of the user stories history, if any.
     :param additional_fields: Additional fields when instantiating each user story.
 
-    :return: List of created `Task` instances.
+    :return: List of created `UserStory` instances.
     """
     userstories = get_userstories_from_bulk(bulk_data, **additional_fields)
+    if not userstories:
+        return userstories
 
-    disconnect_userstories_signals()
-
-    try:
-        db.save_in_bulk(userstories, callback, precall)
-    finally:
-        connect_userstories_signals()
+    project = userstories[0].project
+    insert_items_in_bulk(userstories, project=project, precall=precall)
+    project.update_role_points(user_stories=userstories)
+    notify_items_created_in_bulk(userstories, project=project, user=user, callback=callback)
 
     return userstories
 
@@ -85,13 +88,13 @@ def update_userstories_order_in_bulk(bulk_data: list, field: str, project: objec
 
     [{'us_id': <value>, 'order': <value>}, ...]
     """
-    user_stories = project.user_stories.all()
+    filters = {"project_id": project.id}
     if status is not None:
-        user_stories = user_stories.filter(status=status)
+        filters["status_id"] = status.id
     if milestone is not None:
-        user_stories = user_stories.filter(milestone=milestone)
+        filters["milestone_id"] = milestone.id
 
-    us_orders = {us.id: getattr(us, field) for us in user_stories}
+    us_orders = dict(models.UserStory.objects.filter(**filters).values_list("id", field))
     new_us_orders = {e["us_id"]: e["order"] for e in bulk_data}
     apply_order_updates(us_orders, new_us_orders)
 
@@ -100,6 +103,8 @@ def update_userstories_order_in_bulk(bulk_data: list, field: str, project: objec
                               content_type="userstories.userstory",
                               projectid=project.pk)
     db.update_attr_in_bulk_for_ids(us_orders, field, models.UserStory)
+    rebalance_orders_if_needed(models.UserStory, field, filters,
+                               shifted=len(us_orders) - len(new_us_orders))
     return us_orders
 
 
@@ -116,15 +121,17 @@ def update_userstories_milestone_in_bulk(bulk_data: list, milestone: object):
                               projectid=milestone.project.pk)
 
     db.update_attr_in_bulk_for_ids(us_milestones, "milestone_id", model=models.UserStory)
+    invalidate_project_stats_on_commit(milestone.project_id)
 
 
 def snapshot_userstories_in_bulk(bulk_data, user):
-    for us_data in bulk_data:
-        try:
-            us = models.UserStory.objects.get(pk=us_data['us_id'])
-            take_snapshot(us, user=user)
-        except models.UserStory.DoesNotExist:
-            pass
+    with batch_render():
+        for us_data in bulk_data:
+            try:
+                us = models.UserStory.objects.get(pk=us_data['us_id'])
+                take_snapshot(us, user=user)
+            except models.UserStory.DoesNotExist:
+                pass
 
 
 #####################################################
@@ -252,194 +259,12 @@ def userstories_to_csv(project, queryset):
 # Api filter data
 #####################################################
 
-def _get_userstories_statuses(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-      SELECT "projects_userstorystatus"."id",
-             "projects_userstorystatus"."name",
-             "projects_userstorystatus"."color",
-             "projects_userstorystatus"."order",
-             (SELECT count(*)
-                FROM "userstories_userstory"
-                     INNER JOIN "projects_project" ON
-                                ("userstories_userstory"."project_id" = "projects_project"."id")
-               WHERE {where} AND "userstories_userstory"."status_id" = "projects_userstorystatus"."id")
-        FROM "projects_userstorystatus"
-       WHERE "projects_userstorystatus"."project_id" = %s
-    ORDER BY "projects_userstorystatus"."order";
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for id, name, color, order, count in rows:
-        result.append({
-            "id": id,
-            "name": _(name),
-            "color": color,
-            "order": order,
-            "count": count,
-        })
-    return sorted(result, key=itemgetter("order"))
-
-
-def _get_userstories_assigned_to(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-        WITH counters AS (
-                SELECT assigned_to_id,  count(assigned_to_id) count
-                  FROM "userstories_userstory"
-            INNER JOIN "projects_project" ON ("userstories_userstory"."project_id" = "projects_project"."id")
-                 WHERE {where} AND "userstories_userstory"."assigned_to_id" IS NOT NULL
-              GROUP BY assigned_to_id
-        )
-
-                 SELECT "projects_membership"."user_id" user_id,
-                        "users_user"."full_name",
-                        "users_user"."username",
-                        COALESCE("counters".count, 0) count
-                   FROM projects_membership
-        LEFT OUTER JOIN counters ON ("projects_membership"."user_id" = "counters"."assigned_to_id")
-             INNER JOIN "users_user" ON ("projects_membership"."user_id" = "users_user"."id")
-                  WHERE "projects_membership"."project_id" = %s AND "projects_membership"."user_id" IS NOT NULL
-
-        -- unassigned userstories
-        UNION
-
-                 SELECT NULL user_id, NULL, NULL, count(coalesce(assigned_to_id, -1)) count
-                   FROM "userstories_userstory"
-             INNER JOIN "projects_project" ON ("userstories_userstory"."project_id" = "projects_project"."id")
-                  WHERE {where} AND "userstories_userstory"."assigned_to_id" IS NULL
-               GROUP BY assigned_to_id
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id] + where_params)
-        rows = cursor.fetchall()
-
-    result = []
-    none_valued_added = False
-    for id, full_name, username, count in rows:
-        result.append({
-            "id": id,
-            "full_name": full_name or username or "",
-            "count": count,
-        })
-
-        if id is None:
-            none_valued_added = True
-
-    # If there was no userstory with null assigned_to we manually add it
-    if not none_valued_added:
-        result.append({
-            "id": None,
-            "full_name": "",
-            "count": 0,
-        })
-
-    return sorted(result, key=itemgetter("full_name"))
-
-
-def _get_userstories_owners(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-        WITH counters AS (
-                SELECT "userstories_userstory"."owner_id" owner_id,
-                       count(coalesce("userstories_userstory"."owner_id", -1)) count
-                  FROM "userstories_userstory"
-            INNER JOIN "projects_project" ON ("userstories_userstory"."project_id" = "projects_project"."id")
-                 WHERE {where}
-              GROUP BY "userstories_userstory"."owner_id"
-        )
-
-                 SELECT "projects_membership"."user_id" id,
-                        "users_user"."full_name",
-                        "users_user"."username",
-                        COALESCE("counters".count, 0) count
-                   FROM projects_membership
-        LEFT OUTER JOIN counters ON ("projects_membership"."user_id" = "counters"."owner_id")
-             INNER JOIN "users_user" ON ("projects_membership"."user_id" = "users_user"."id")
-                  WHERE "projects_membership"."project_id" = %s AND "projects_membership"."user_id" IS NOT NULL
-
-        -- System users
-        UNION
-
-                 SELECT "users_user"."id" user_id,
-                        "users_user"."full_name" full_name,
-                        "users_user"."username" username,
-                        COALESCE("counters".count, 0) count
-                   FROM users_user
-        LEFT OUTER JOIN counters ON ("users_user"."id" = "counters"."owner_id")
-                  WHERE ("users_user"."is_system" IS TRUE)
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for id, full_name, username, count in rows:
-        if count > 0:
-            result.append({
-                "id": id,
-                "full_name": full_name or username or "",
-                "count": count,
-            })
-    return sorted(result, key=itemgetter("full_name"))
-
-
-def _get_userstories_tags(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-        WITH userstories_tags AS (
-                    SELECT tag,
-                           COUNT(tag) counter FROM (
-                                SELECT UNNEST(userstories_userstory.tags) tag
-                                  FROM userstories_userstory
-                            INNER JOIN projects_project
-                                        ON (userstories_userstory.project_id = projects_project.id)
-                                 WHERE {where}) tags
-                  GROUP BY tag),
-             project_tags AS (
-                    SELECT reduce_dim(tags_colors) tag_color
-                      FROM projects_project
-                     WHERE id=%s)
-
-      SELECT tag_color[1] tag, COALESCE(userstories_tags.counter, 0) counter
-        FROM project_tags
-   LEFT JOIN userstories_tags ON project_tags.tag_color[1] = userstories_tags.tag
-    ORDER BY tag
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for name, count in rows:
-        result.append({
-            "name": name,
-            "count": count,
-        })
-    return sorted(result, key=itemgetter("name"))
+USERSTORIES_FILTERS_FACETS = [
+    filters.Facet("statuses", filters.ATTRIBUTE_FACET, "status_id", "projects_userstorystatus"),
+    filters.Facet("assigned_to", filters.ASSIGNED_TO_FACET, "assigned_to_id", None),
+    filters.Facet("owners", filters.OWNERS_FACET, "owner_id", None),
+    filters.Facet("tags", filters.TAGS_FACET, "tags", None),
+]
 
 
 def get_userstories_filters_data(project, querysets):
@@ -447,11 +272,4 @@ def get_userstories_filters_data(project, querysets):
     Given a project and an userstories queryset, return a simple data structure
     of all possible filters for the userstories in the queryset.
     """
-    data = OrderedDict([
-        ("statuses", _get_userstories_statuses(project, querysets["statuses"])),
-        ("assigned_to", _get_userstories_assigned_to(project, querysets["assigned_to"])),
-        ("owners", _get_userstories_owners(project, querysets["owners"])),
-        ("tags", _get_userstories_tags(project, querysets["tags"])),
-    ])
-
-    return data
+    return filters.get_filters_data(project, querysets, USERSTORIES_FILTERS_FACETS)
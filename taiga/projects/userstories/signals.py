@@ -18,6 +18,7 @@
 
 from contextlib import suppress
 from django.core.exceptions import ObjectDoesNotExist
+from taiga.mdrender.service import batch_render
 from taiga.projects.history.services import take_snapshot
 from taiga.projects.tasks.apps import connect_all_tasks_signals, disconnect_all_tasks_signals
 
@@ -60,8 +61,9 @@ def update_role_points_when_create_or_edit_us(sender, instance, **kwargs):
 def update_milestone_of_tasks_when_edit_us(sender, instance, created, **kwargs):
     if not created:
         instance.tasks.exclude(milestone=instance.milestone).update(milestone=instance.milestone)
-        for task in instance.tasks.all():
-            take_snapshot(task)
+        with batch_render():
+            for task in instance.tasks.all():
+                take_snapshot(task)
 
 
 ####################################
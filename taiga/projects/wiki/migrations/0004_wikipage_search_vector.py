@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# NOTE: This column is needed by taiga.searches.services
+ADD_SEARCH_VECTOR_COLUMN = """
+    ALTER TABLE wiki_wikipage
+     ADD COLUMN search_vector tsvector;
+"""
+
+DROP_SEARCH_VECTOR_COLUMN = """
+    ALTER TABLE wiki_wikipage
+    DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+CREATE_SEARCH_VECTOR_FUNCTION = """
+    CREATE OR REPLACE FUNCTION wiki_wikipage_search_vector_update()
+                       RETURNS trigger
+                            AS $wiki_wikipage_search_vector_update$
+                         BEGIN
+                               NEW.search_vector :=
+                           setweight(to_tsvector('english_nostop',
+                                     coalesce(NEW.slug, '')), 'A') ||
+                           setweight(to_tsvector('english_nostop',
+                                     coalesce(NEW.content, '')), 'B');
+                               RETURN NEW;
+                           END; $wiki_wikipage_search_vector_update$
+                      LANGUAGE plpgsql;
+"""
+
+DROP_SEARCH_VECTOR_FUNCTION = """
+    DROP FUNCTION IF EXISTS wiki_wikipage_search_vector_update() CASCADE;
+"""
+
+
+CREATE_SEARCH_VECTOR_TRIGGER = """
+    CREATE TRIGGER wiki_wikipage_search_vector_update
+     BEFORE INSERT OR UPDATE OF slug, content
+                ON wiki_wikipage
+          FOR EACH ROW
+   EXECUTE PROCEDURE wiki_wikipage_search_vector_update();
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+    DROP TRIGGER IF EXISTS wiki_wikipage_search_vector_update
+                        ON wiki_wikipage;
+"""
+
+
+FILL_SEARCH_VECTOR_COLUMN = """
+    UPDATE wiki_wikipage
+       SET search_vector =
+                           setweight(to_tsvector('english_nostop',
+                                     coalesce(wiki_wikipage.slug, '')), 'A') ||
+                           setweight(to_tsvector('english_nostop',
+                                     coalesce(wiki_wikipage.content, '')), 'B');
+"""
+
+
+CREATE_SEARCH_VECTOR_INDEX = """
+    CREATE INDEX wiki_wikipage_search_vector_idx
+              ON wiki_wikipage
+           USING gin(search_vector);
+"""
+
+DROP_SEARCH_VECTOR_INDEX = """
+    DROP INDEX IF EXISTS wiki_wikipage_search_vector_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0003_auto_20160615_0721'),
+        ('projects', '0033_text_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL([ADD_SEARCH_VECTOR_COLUMN],
+                          [DROP_SEARCH_VECTOR_COLUMN]),
+        migrations.RunSQL([DROP_SEARCH_VECTOR_FUNCTION, CREATE_SEARCH_VECTOR_FUNCTION],
+                          [DROP_SEARCH_VECTOR_FUNCTION]),
+        migrations.RunSQL([DROP_SEARCH_VECTOR_TRIGGER, CREATE_SEARCH_VECTOR_TRIGGER],
+                          [DROP_SEARCH_VECTOR_TRIGGER]),
+        migrations.RunSQL([FILL_SEARCH_VECTOR_COLUMN],
+                          migrations.RunSQL.noop),
+        migrations.RunSQL([DROP_SEARCH_VECTOR_INDEX, CREATE_SEARCH_VECTOR_INDEX],
+                          [DROP_SEARCH_VECTOR_INDEX]),
+    ]
@@ -17,6 +17,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.apps import apps
+from django.db import connection
 
 from taiga.base.api import viewsets
 
@@ -41,19 +42,19 @@ class SearchViewSet(viewsets.ViewSet):
         with futures.ThreadPoolExecutor(max_workers=4) as executor:
             futures_list = []
             if user_has_perm(request.user, "view_us", project):
-                uss_future = executor.submit(self._search_user_stories, project, text)
+                uss_future = executor.submit(self._search_in_thread, self._search_user_stories, project, text)
                 uss_future.result_key = "userstories"
                 futures_list.append(uss_future)
             if user_has_perm(request.user, "view_tasks", project):
-                tasks_future = executor.submit(self._search_tasks, project, text)
+                tasks_future = executor.submit(self._search_in_thread, self._search_tasks, project, text)
                 tasks_future.result_key = "tasks"
                 futures_list.append(tasks_future)
             if user_has_perm(request.user, "view_issues", project):
-                issues_future = executor.submit(self._search_issues, project, text)
+                issues_future = executor.submit(self._search_in_thread, self._search_issues, project, text)
                 issues_future.result_key = "issues"
                 futures_list.append(issues_future)
             if user_has_perm(request.user, "view_wiki_pages", project):
-                wiki_pages_future = executor.submit(self._search_wiki_pages, project, text)
+                wiki_pages_future = executor.submit(self._search_in_thread, self._search_wiki_pages, project, text)
                 wiki_pages_future.result_key = "wikipages"
                 futures_list.append(wiki_pages_future)
 
@@ -69,6 +70,14 @@ class SearchViewSet(viewsets.ViewSet):
         result["count"] = sum(map(lambda x: len(x), result.values()))
         return response.Ok(result)
 
+    def _search_in_thread(self, search_fn, project, text):
+        # Every worker thread opens its own database connection, so it must
+        # be closed when the search is done or it would be leaked.
+        try:
+            return search_fn(project, text)
+        finally:
+            connection.close()
+
     def _get_project(self, project_id):
         project_model = apps.get_model("projects", "Project")
         return get_object_or_404(project_model, pk=project_id)
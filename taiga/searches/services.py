@@ -28,44 +28,36 @@ def search_user_stories(project, text):
     model = apps.get_model("userstories", "UserStory")
     queryset = model.objects.filter(project_id=project.pk)
     table = "userstories_userstory"
-    return _search_items(queryset, table, text)
+    queryset = _search_by_vector(queryset, table, text)
+    return attach_total_points(queryset)[:MAX_RESULTS]
 
 
 def search_tasks(project, text):
-    model = apps.get_model("userstories", "UserStory")
+    model = apps.get_model("tasks", "Task")
     queryset = model.objects.filter(project_id=project.pk)
-    table = "userstories_userstory"
-    return _search_items(queryset, table, text)
+    table = "tasks_task"
+    return _search_by_vector(queryset, table, text)[:MAX_RESULTS]
 
 
 def search_issues(project, text):
-    model = apps.get_model("userstories", "UserStory")
+    model = apps.get_model("issues", "Issue")
     queryset = model.objects.filter(project_id=project.pk)
-    table = "userstories_userstory"
-    return _search_items(queryset, table, text)
+    table = "issues_issue"
+    return _search_by_vector(queryset, table, text)[:MAX_RESULTS]
 
 
 def search_wiki_pages(project, text):
     model = apps.get_model("wiki", "WikiPage")
     queryset = model.objects.filter(project_id=project.pk)
-    tsquery = "to_tsquery('english_nostop', %s)"
-    tsvector = """
-        setweight(to_tsvector('english_nostop', coalesce(wiki_wikipage.slug)), 'A') ||
-        setweight(to_tsvector('english_nostop', coalesce(wiki_wikipage.content)), 'B')
-    """
-
-    return _search_by_query(queryset, tsquery, tsvector, text)
+    table = "wiki_wikipage"
+    return _search_by_vector(queryset, table, text)[:MAX_RESULTS]
 
 
-def _search_items(queryset, table, text):
+def _search_by_vector(queryset, table, text):
+    # NOTE: search_vector is a tsvector column (with a GIN index) maintained
+    #       by a database trigger, see the *_search_vector migrations.
     tsquery = "to_tsquery('english_nostop', %s)"
-    tsvector = """
-        setweight(to_tsvector('english_nostop',
-                              coalesce({table}.subject) || ' ' ||
-                              coalesce({table}.ref)), 'A') ||
-        setweight(to_tsvector('english_nostop', coalesce(inmutable_array_to_string({table}.tags))), 'B') ||
-        setweight(to_tsvector('english_nostop', coalesce({table}.description)), 'C')
-    """.format(table=table)
+    tsvector = "{table}.search_vector".format(table=table)
     return _search_by_query(queryset, tsquery, tsvector, text)
 
 
@@ -85,5 +77,4 @@ def _search_by_query(queryset, tsquery, tsvector, text):
                                   params=[to_tsquery(text)],
                                   order_by=order_by)
 
-    queryset = attach_total_points(queryset)
-    return queryset[:MAX_RESULTS]
+    return queryset
@@ -28,13 +28,30 @@ class TimelineAppConfig(AppConfig):
 
     def ready(self):
         from . import signals as handlers
+        from taiga.projects.history.signals import history_entries_created_in_bulk
 
         signals.post_save.connect(handlers.on_new_history_entry,
                                   sender=apps.get_model("history", "HistoryEntry"),
                                   dispatch_uid="timeline")
+        history_entries_created_in_bulk.connect(handlers.on_new_history_entries_in_bulk,
+                                                dispatch_uid="timeline_bulk")
         signals.post_save.connect(handlers.create_membership_push_to_timeline,
                                                  sender=apps.get_model("projects", "Membership"))
         signals.pre_delete.connect(handlers.delete_membership_push_to_timeline,
                                                 sender=apps.get_model("projects", "Membership"))
         signals.post_save.connect(handlers.create_user_push_to_timeline,
                                                  sender=get_user_model())
+
+        # Timeline visibility index
+        signals.post_save.connect(handlers.invalidate_timeline_visibility_on_membership_change,
+                                  sender=apps.get_model("projects", "Membership"),
+                                  dispatch_uid="timeline_visibility_membership_save")
+        signals.post_delete.connect(handlers.invalidate_timeline_visibility_on_membership_change,
+                                    sender=apps.get_model("projects", "Membership"),
+                                    dispatch_uid="timeline_visibility_membership_delete")
+        signals.post_save.connect(handlers.invalidate_timeline_visibility_on_role_change,
+                                  sender=apps.get_model("users", "Role"),
+                                  dispatch_uid="timeline_visibility_role_save")
+        signals.pre_delete.connect(handlers.invalidate_timeline_visibility_on_role_change,
+                                   sender=apps.get_model("users", "Role"),
+                                   dispatch_uid="timeline_visibility_role_delete")
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2016 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2016 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2016 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2016 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Examples:
+# python manage.py benchmark_timeline_fanout my-project-slug
+# python manage.py benchmark_timeline_fanout my-project-slug --watchers 1,10,100,500 --repeat 10
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from taiga.projects.models import Project
+from taiga.timeline.service import (_add_to_object_timeline,
+                                    _push_to_timelines_in_bulk,
+                                    build_project_namespace,
+                                    build_user_namespace,
+                                    extract_user_info)
+
+import time
+
+
+class Command(BaseCommand):
+    help = "Benchmark the timeline fan-out writer against the one-insert-per-row writer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_slug",
+                            help="Project used to generate the timeline entries.")
+
+        parser.add_argument("-w", "--watchers",
+                            action="store",
+                            dest="watchers",
+                            default="1,10,50,100,250",
+                            metavar="N,N,...",
+                            help="Comma separated list of watcher counts. ('1,10,50,100,250' by default)")
+
+        parser.add_argument("-r", "--repeat",
+                            action="store",
+                            dest="repeat",
+                            type=int,
+                            default=5,
+                            help="Number of events pushed per watcher count. (5 by default)")
+
+    @override_settings(DEBUG=False)
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(slug=options["project_slug"])
+        except Project.DoesNotExist:
+            raise CommandError("Project '{}' does not exist".format(options["project_slug"]))
+
+        try:
+            watchers = [int(n) for n in options["watchers"].split(",")]
+        except ValueError:
+            raise CommandError("Invalid watchers list '{}'".format(options["watchers"]))
+
+        repeat = options["repeat"]
+        users = list(get_user_model().objects.order_by("id")[:max(watchers)])
+        if not users:
+            raise CommandError("There are no users in the database")
+
+        instance = project.user_stories.first() or project
+        extra_data = {"values_diff": {}, "user": extract_user_info(project.owner)}
+
+        self.stdout.write("{:>10} {:>10} {:>16} {:>16} {:>8}".format(
+            "watchers", "rows", "per-row (rows/s)", "fan-out (rows/s)", "speedup"))
+
+        for n in watchers:
+            user_namespace = build_user_namespace(project.owner)
+            targets = [(project, build_project_namespace(project))]
+            targets += [(users[i % len(users)], user_namespace) for i in range(n)]
+            rows = len(targets) * repeat
+
+            # Everything is rolled back, the benchmark never leaves data behind
+            with transaction.atomic():
+                start = time.perf_counter()
+                for i in range(repeat):
+                    for obj, namespace in targets:
+                        _add_to_object_timeline(obj, instance, "change", timezone.now(), namespace, extra_data)
+                per_row_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for i in range(repeat):
+                    _push_to_timelines_in_bulk(targets, instance, "change", timezone.now(), extra_data=extra_data)
+                fanout_time = time.perf_counter() - start
+
+                transaction.set_rollback(True)
+
+            self.stdout.write("{:>10} {:>10} {:>16.0f} {:>16.0f} {:>7.1f}x".format(
+                n, rows, rows / per_row_time, rows / fanout_time, per_row_time / fanout_time))
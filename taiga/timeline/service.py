@@ -17,6 +17,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.db.models import Model
@@ -30,6 +32,9 @@ from taiga.celery import app
 
 _timeline_impl_map = {}
 
+# Max number of Timeline entries inserted per query by the fan-out writer
+FANOUT_BATCH_SIZE = 1000
+
 
 def _get_impl_key_from_model(model: Model, event_type: str):
     if issubclass(model, Model):
@@ -88,6 +93,52 @@ def _push_to_timeline(objects, instance: object, event_type: str, created_dateti
         raise Exception("Invalid objects parameter")
 
 
+def _build_timeline_entries(targets, instance: object, event_type: str, created_datetime: object, extra_data: dict={}):
+    """
+    Build (without saving) the Timeline entries for an event fanned out to
+    several timelines. `targets` is an iterable of (obj, namespace) pairs.
+
+    The event payload and the content type are calculated only once and
+    shared by every entry.
+    """
+    assert isinstance(instance, Model), "instance must be a instance of Model"
+    from .models import Timeline
+    event_type_key = _get_impl_key_from_model(instance.__class__, event_type)
+    impl = _timeline_impl_map.get(event_type_key, None)
+
+    project = None
+    if hasattr(instance, "project"):
+        project = instance.project
+
+    data = impl(instance, extra_data=extra_data)
+    data_content_type = ContentType.objects.get_for_model(instance.__class__)
+
+    entries = []
+    for obj, namespace in targets:
+        assert isinstance(obj, Model), "obj must be a instance of Model"
+        entries.append(Timeline(
+            content_object=obj,
+            namespace=namespace,
+            event_type=event_type_key,
+            project=project,
+            data=data,
+            data_content_type=data_content_type,
+            created=created_datetime,
+        ))
+
+    return entries
+
+
+def _push_to_timelines_in_bulk(targets, instance: object, event_type: str, created_datetime: object, extra_data: dict={}):
+    """
+    Fan-out writer: serialize the event once and insert all the Timeline
+    entries for `targets` ((obj, namespace) pairs) with a single bulk insert.
+    """
+    from .models import Timeline
+    entries = _build_timeline_entries(targets, instance, event_type, created_datetime, extra_data=extra_data)
+    return Timeline.objects.bulk_create(entries, batch_size=FANOUT_BATCH_SIZE)
+
+
 @app.task
 def push_to_timelines(project_id, user_id, obj_app_label, obj_model_name, obj_id, event_type, created_datetime, extra_data={}):
     ObjModel = apps.get_model(obj_app_label, obj_model_name)
@@ -111,18 +162,16 @@ def push_to_timelines(project_id, user_id, obj_app_label, obj_model_name, obj_id
             return
 
         # Project timeline
-        _push_to_timeline(project, obj, event_type, created_datetime,
-                          namespace=build_project_namespace(project),
-                          extra_data=extra_data)
-
-        project.refresh_totals()
+        targets = [(project, build_project_namespace(project))]
 
+        # Related people timelines
         if hasattr(obj, "get_related_people"):
-            related_people = obj.get_related_people()
+            user_namespace = build_user_namespace(user)
+            targets += [(person, user_namespace) for person in obj.get_related_people()]
+
+        _push_to_timelines_in_bulk(targets, obj, event_type, created_datetime, extra_data=extra_data)
 
-            _push_to_timeline(related_people, obj, event_type, created_datetime,
-                              namespace=build_user_namespace(user),
-                              extra_data=extra_data)
+        project.refresh_totals()
     else:
         # Actions not related with a project
         # - Me
@@ -131,6 +180,48 @@ def push_to_timelines(project_id, user_id, obj_app_label, obj_model_name, obj_id
                           extra_data=extra_data)
 
 
+@app.task
+def push_to_timelines_in_bulk(project_id, user_id, obj_app_label, obj_model_name, obj_ids, event_type, created_datetime, extra_data={}):
+    """
+    Like `push_to_timelines` for several objects of the same model and
+    project with the same event (i.e. created in bulk), so they must have
+    the same related people. All the timeline entries are inserted at once.
+    """
+    ObjModel = apps.get_model(obj_app_label, obj_model_name)
+    # The related objects read by the timeline implementations are fetched at once
+    related = [field.name for field in ObjModel._meta.fields if field.name in ("milestone", "user_story")]
+    objs = list(ObjModel.objects.filter(id__in=obj_ids).order_by("id").prefetch_related(*related))
+    if not objs:
+        return
+
+    try:
+        user = get_user_model().objects.get(id=user_id)
+    except get_user_model().DoesNotExist:
+        return
+
+    projectModel = apps.get_model("projects", "Project")
+    try:
+        project = projectModel.objects.get(id=project_id)
+    except projectModel.DoesNotExist:
+        return
+
+    # Project timeline and related people timelines
+    targets = [(project, build_project_namespace(project))]
+    if hasattr(objs[0], "get_related_people"):
+        user_namespace = build_user_namespace(user)
+        targets += [(person, user_namespace) for person in objs[0].get_related_people()]
+
+    from .models import Timeline
+    entries = []
+    for obj in objs:
+        obj.project = project
+        entries += _build_timeline_entries(targets, obj, event_type, created_datetime, extra_data=extra_data)
+
+    Timeline.objects.bulk_create(entries, batch_size=FANOUT_BATCH_SIZE)
+
+    project.refresh_totals()
+
+
 def get_timeline(obj, namespace=None):
     assert isinstance(obj, Model), "obj must be a instance of Model"
     from .models import Timeline
@@ -144,6 +235,70 @@ def get_timeline(obj, namespace=None):
     return timeline
 
 
+def _get_timeline_content_types():
+    return {
+        "view_project": ContentType.objects.get_by_natural_key("projects", "project"),
+        "view_milestones": ContentType.objects.get_by_natural_key("milestones", "milestone"),
+        "view_us": ContentType.objects.get_by_natural_key("userstories", "userstory"),
+        "view_tasks": ContentType.objects.get_by_natural_key("tasks", "task"),
+        "view_issues": ContentType.objects.get_by_natural_key("issues", "issue"),
+        "view_wiki_pages": ContentType.objects.get_by_natural_key("wiki", "wikipage"),
+        "view_wiki_links": ContentType.objects.get_by_natural_key("wiki", "wikilink"),
+    }
+
+
+def _get_timeline_visibility_cache_key(user_id):
+    return "timeline-visibility:{}".format(user_id)
+
+
+def _build_timeline_visibility_for_user(user):
+    content_types = _get_timeline_content_types()
+    # There is no specific permission for seeing new memberships
+    membership_content_type = ContentType.objects.get_by_natural_key(app_label="projects", model="membership")
+
+    groups = {}
+    Membership = apps.get_model("projects", "Membership")
+    memberships = Membership.objects.filter(user_id=user.id).values_list("project_id", "is_admin", "role__permissions")
+    for project_id, is_admin, permissions in memberships:
+        # Admin roles can see everything in a project
+        if is_admin:
+            data_content_types = None
+        else:
+            data_content_types = {content_types[p].id for p in permissions or [] if p in content_types}
+            data_content_types.add(membership_content_type.id)
+            data_content_types = tuple(sorted(data_content_types))
+
+        groups.setdefault(data_content_types, []).append(project_id)
+
+    return list(groups.items())
+
+
+def get_timeline_visibility_for_user(user):
+    """
+    Get the precomputed visibility index of the projects where the user is
+    a member, as a list of (data_content_type_ids, project_ids) pairs. A None
+    data_content_type_ids means that every timeline entry of those projects
+    is visible.
+
+    Projects sharing the same permissions are grouped together so the
+    timeline filter has one clause per distinct permission set instead of
+    one per membership. The index is cached until the memberships or the
+    roles of the user change.
+    """
+    key = _get_timeline_visibility_cache_key(user.id)
+    visibility = cache.get(key)
+    if visibility is None:
+        visibility = _build_timeline_visibility_for_user(user)
+        cache.set(key, visibility, timeout=settings.TIMELINE_VISIBILITY_CACHE_TIMEOUT)
+    return visibility
+
+
+def invalidate_timeline_visibility_for_users(user_ids):
+    keys = [_get_timeline_visibility_cache_key(user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        cache.delete_many(keys)
+
+
 def filter_timeline_for_user(timeline, user):
     # Superusers can see everything
     if user.is_superuser:
@@ -153,15 +308,7 @@ def filter_timeline_for_user(timeline, user):
     tl_filter = Q(project__is_private=False) | Q(project=None)
 
     # Filtering private project with some public parts
-    content_types = {
-        "view_project": ContentType.objects.get_by_natural_key("projects", "project"),
-        "view_milestones": ContentType.objects.get_by_natural_key("milestones", "milestone"),
-        "view_us": ContentType.objects.get_by_natural_key("userstories", "userstory"),
-        "view_tasks": ContentType.objects.get_by_natural_key("tasks", "task"),
-        "view_issues": ContentType.objects.get_by_natural_key("issues", "issue"),
-        "view_wiki_pages": ContentType.objects.get_by_natural_key("wiki", "wikipage"),
-        "view_wiki_links": ContentType.objects.get_by_natural_key("wiki", "wikilink"),
-    }
+    content_types = _get_timeline_content_types()
 
     for content_type_key, content_type in content_types.items():
         tl_filter |= Q(project__is_private=True,
@@ -176,14 +323,11 @@ def filter_timeline_for_user(timeline, user):
 
     # Filtering private projects where user is member
     if not user.is_anonymous():
-        for membership in user.cached_memberships:
-            # Admin roles can see everything in a project
-            if membership.is_admin:
-                tl_filter |= Q(project=membership.project)
+        for data_content_types, project_ids in get_timeline_visibility_for_user(user):
+            if data_content_types is None:
+                tl_filter |= Q(project_id__in=project_ids)
             else:
-                data_content_types = list(filter(None, [content_types.get(a, None) for a in membership.role.permissions]))
-                data_content_types.append(membership_content_type)
-                tl_filter |= Q(project=membership.project, data_content_type__in=data_content_types)
+                tl_filter |= Q(project_id__in=project_ids, data_content_type_id__in=data_content_types)
 
     timeline = timeline.filter(tl_filter)
     return timeline
@@ -26,9 +26,11 @@ from django.db import connection
 from taiga.projects.history import services as history_services
 from taiga.projects.history.choices import HistoryType
 from taiga.timeline.service import (push_to_timelines,
+                                    push_to_timelines_in_bulk,
                                     build_user_namespace,
                                     build_project_namespace,
-                                    extract_user_info)
+                                    extract_user_info,
+                                    invalidate_timeline_visibility_for_users)
 
 
 def _push_to_timelines(project, user, obj, event_type, created_datetime, extra_data={}):
@@ -94,6 +96,41 @@ def on_new_history_entry(sender, instance, created, **kwargs):
     _push_to_timelines(project, user, obj, event_type, created_datetime, extra_data=extra_data)
 
 
+def on_new_history_entries_in_bulk(sender, entries, instances, **kwargs):
+    """
+    Push to the timelines, with only one task, the history entries created
+    in bulk. They are "create" entries of the same user without comments.
+    """
+    visible = [(entry, obj) for entry, obj in zip(entries, instances)
+               if not entry._importing and not entry.is_hidden and entry.user["pk"] is not None]
+    if not visible:
+        return None
+
+    entry, obj = visible[0]
+    user = get_user_model().objects.get(id=entry.user["pk"])
+    values_diff = entry.values_diff
+    _clean_description_fields(values_diff)
+
+    extra_data = {
+        "values_diff": values_diff,
+        "user": extract_user_info(user),
+        "comment": entry.comment,
+        "comment_html": entry.comment_html,
+    }
+
+    project_id = obj.project_id
+    user_id = user.id
+    ct = ContentType.objects.get_for_model(obj)
+    obj_ids = [obj.id for entry, obj in visible]
+    created_datetime = entry.created_at
+    args = (project_id, user_id, ct.app_label, ct.model, obj_ids, "create", created_datetime)
+
+    if settings.CELERY_ENABLED:
+        connection.on_commit(lambda: push_to_timelines_in_bulk.delay(*args, extra_data=extra_data))
+    else:
+        push_to_timelines_in_bulk(*args, extra_data=extra_data)
+
+
 def create_membership_push_to_timeline(sender, instance, created, **kwargs):
     """
     Creating new membership with associated user. If the user is the project owner we don't
@@ -120,3 +157,24 @@ def create_user_push_to_timeline(sender, instance, created, **kwargs):
         project = None
         user = instance
         _push_to_timelines(project, user, user, "create", created_datetime=user.date_joined)
+
+
+def _invalidate_timeline_visibility(user_ids):
+    # Invalidated now, for the rest of the transaction, and again when it is
+    # committed, as other requests may cache the old memberships in between
+    invalidate_timeline_visibility_for_users(user_ids)
+    connection.on_commit(lambda: invalidate_timeline_visibility_for_users(user_ids))
+
+
+def invalidate_timeline_visibility_on_membership_change(sender, instance, **kwargs):
+    _invalidate_timeline_visibility([instance.user_id])
+
+
+def invalidate_timeline_visibility_on_role_change(sender, instance, **kwargs):
+    # Memberships can be moved between roles of the same project before
+    # deleting one, so all the project members are invalidated.
+    if instance.project_id is None:
+        return
+
+    user_ids = instance.project.memberships.values_list("user_id", flat=True)
+    _invalidate_timeline_visibility(list(user_ids))
@@ -22,14 +22,19 @@ from django.db.models import signals
 
 
 def connect_webhooks_signals():
+    from taiga.projects.history.signals import history_entries_created_in_bulk
     from . import signal_handlers as handlers
     signals.post_save.connect(handlers.on_new_history_entry,
                               sender=apps.get_model("history", "HistoryEntry"),
                               dispatch_uid="webhooks")
+    history_entries_created_in_bulk.connect(handlers.on_new_history_entries_in_bulk,
+                                            dispatch_uid="webhooks_bulk")
 
 
 def disconnect_webhooks_signals():
+    from taiga.projects.history.signals import history_entries_created_in_bulk
     signals.post_save.disconnect(sender=apps.get_model("history", "HistoryEntry"), dispatch_uid="webhooks")
+    history_entries_created_in_bulk.disconnect(dispatch_uid="webhooks_bulk")
 
 
 class WebhooksAppConfig(AppConfig):
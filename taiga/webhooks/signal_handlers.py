@@ -16,6 +16,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from django.contrib.contenttypes.models import ContentType
 from django.db import connection
 from django.conf import settings
 from django.utils import timezone
@@ -53,32 +54,60 @@ def on_new_history_entry(sender, instance, created, **kwargs):
         return None
 
     webhooks = _get_project_webhooks(obj.project)
+    if not webhooks:
+        return None
 
     if instance.type == HistoryType.create:
-        task = tasks.create_webhook
-        extra_args = []
+        action = "create"
+        change = None
     elif instance.type == HistoryType.change:
-        task = tasks.change_webhook
-        extra_args = [instance]
+        action = "change"
+        change = instance
     elif instance.type == HistoryType.delete:
-        task = tasks.delete_webhook
-        extra_args = []
+        action = "delete"
+        change = None
 
     by = instance.owner
     date = timezone.now()
 
-    webhooks_args = []
-    for webhook in webhooks:
-        args = [webhook["id"], webhook["url"], webhook["key"], by, date, obj] + extra_args
-        webhooks_args.append(args)
+    connection.on_commit(lambda: _execute_task(action, obj, by, date, change, webhooks))
+
+
+def on_new_history_entries_in_bulk(sender, entries, instances, **kwargs):
+    """
+    Send, with only one task, the "create" webhooks of the history entries
+    created in bulk (all of them of the same project and user).
+    """
+    if not settings.WEBHOOKS_ENABLED:
+        return None
+
+    objs = [obj for entry, obj in zip(entries, instances) if not entry.is_hidden]
+    if not objs:
+        return None
+
+    webhooks = _get_project_webhooks(objs[0].project)
+    if not webhooks:
+        return None
+
+    ct = ContentType.objects.get_for_model(objs[0])
+    obj_ids = [obj.id for obj in objs]
+    by_id = entries[0].user["pk"]
+    date = timezone.now()
 
-    connection.on_commit(lambda: _execute_task(task, webhooks_args))
+    if settings.CELERY_ENABLED:
+        connection.on_commit(lambda: tasks.send_create_webhooks_in_bulk.delay(ct.app_label, ct.model, obj_ids,
+                                                                             by_id, date, webhooks))
+    else:
+        connection.on_commit(lambda: tasks.send_create_webhooks_in_bulk(ct.app_label, ct.model, obj_ids,
+                                                                       by_id, date, webhooks))
 
 
-def _execute_task(task, webhooks_args):
-    for webhook_args in webhooks_args:
+def _execute_task(action, obj, by, date, change, webhooks):
+    # The payload is serialized once for all the webhooks and only the
+    # rendered json is sent to the workers
+    payload = tasks.make_payload(action, obj, by, date, change)
 
-        if settings.CELERY_ENABLED:
-            task.delay(*webhook_args)
-        else:
-            task(*webhook_args)
+    if settings.CELERY_ENABLED:
+        tasks.send_webhooks.delay(payload, webhooks)
+    else:
+        tasks.send_webhooks(payload, webhooks)
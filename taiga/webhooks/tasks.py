@@ -18,10 +18,20 @@
 
 import hmac
 import hashlib
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from requests.exceptions import RequestException
 
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+
 from taiga.base.api.renderers import UnicodeJSONRenderer
+from taiga.base.utils import json
 from taiga.base.utils.db import get_typename_for_model_instance
 from taiga.celery import app
 
@@ -58,8 +68,35 @@ def _generate_signature(data, key):
     return mac.hexdigest()
 
 
-def _send_request(webhook_id, url, key, data):
-    serialized_data = UnicodeJSONRenderer().render(data)
+# Only the last logs of every webhook are kept
+WEBHOOK_LOGS_KEPT = 10
+
+# Requests to the same host reuse the connections of this session
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = getattr(settings, "WEBHOOKS_MAX_CONCURRENCY", 10)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def _deliver(webhook_id, url, key, data, serialized_data=None):
+    """
+    Send a webhook request, retrying with exponential backoff on network
+    errors and server errors. Return an unsaved WebhookLog.
+
+    It runs in the delivery threads, so it must not use the database.
+    """
+    if serialized_data is None:
+        serialized_data = UnicodeJSONRenderer().render(data)
     signature = _generate_signature(serialized_data, key)
     headers = {
         "X-TAIGA-WEBHOOK-SIGNATURE": signature,
@@ -68,72 +105,139 @@ def _send_request(webhook_id, url, key, data):
     request = requests.Request('POST', url, data=serialized_data, headers=headers)
     prepared_request = request.prepare()
 
-    with requests.Session() as session:
+    timeout = getattr(settings, "WEBHOOKS_REQUEST_TIMEOUT", 10)
+    max_retries = getattr(settings, "WEBHOOKS_MAX_RETRIES", 2)
+    backoff = getattr(settings, "WEBHOOKS_RETRY_BACKOFF", 0.5)
+
+    for attempt in range(max_retries + 1):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+
         try:
-            response = session.send(prepared_request)
+            response = _get_session().send(prepared_request, timeout=timeout)
         except RequestException as e:
             # Error sending the webhook
-            webhook_log = WebhookLog.objects.create(webhook_id=webhook_id, url=url, status=0,
-                                                    request_data=data,
-                                                    request_headers=dict(prepared_request.headers),
-                                                    response_data="error-in-request: {}".format(str(e)),
-                                                    response_headers={},
-                                                    duration=0)
+            webhook_log = WebhookLog(webhook_id=webhook_id, url=url, status=0,
+                                     request_data=data,
+                                     request_headers=dict(prepared_request.headers),
+                                     response_data="error-in-request: {}".format(str(e)),
+                                     response_headers={},
+                                     duration=0)
         else:
             # Webhook was sent successfully
-            webhook_log = WebhookLog.objects.create(webhook_id=webhook_id, url=url,
-                                                    status=response.status_code,
-                                                    request_data=data,
-                                                    request_headers=dict(prepared_request.headers),
-                                                    response_data=response.content,
-                                                    response_headers=dict(response.headers),
-                                                    duration=response.elapsed.total_seconds())
-        finally:
-            # Only the last ten webhook logs traces are required
-            # so remove the leftover
-            ids = (WebhookLog.objects.filter(webhook_id=webhook_id)
-                                     .order_by("-id")
-                                     .values_list('id', flat=True)[10:])
-            WebhookLog.objects.filter(id__in=ids).delete()
+            webhook_log = WebhookLog(webhook_id=webhook_id, url=url,
+                                     status=response.status_code,
+                                     request_data=data,
+                                     request_headers=dict(prepared_request.headers),
+                                     response_data=response.content,
+                                     response_headers=dict(response.headers),
+                                     duration=response.elapsed.total_seconds())
+            if response.status_code < 500:
+                break
 
     return webhook_log
 
 
-@app.task
-def create_webhook(webhook_id, url, key, by, date, obj):
-    data = {}
-    data['action'] = "create"
-    data['type'] = _get_type(obj)
-    data['by'] = UserSerializer(by).data
-    data['date'] = date
-    data['data'] = _serialize(obj)
+def _prune_webhook_logs(webhook_ids):
+    sql = """
+        DELETE FROM "webhooks_webhooklog"
+              WHERE "id" IN (SELECT "id"
+                               FROM (SELECT "id", row_number() OVER (PARTITION BY "webhook_id"
+                                                                         ORDER BY "id" DESC) AS "position"
+                                       FROM "webhooks_webhooklog"
+                                      WHERE "webhook_id" = ANY(%s)) AS "logs"
+                              WHERE "position" > %s)
+    """
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, [list(webhook_ids), WEBHOOK_LOGS_KEPT])
 
-    return _send_request(webhook_id, url, key, data)
 
+def _send_requests(deliveries, *, serialized_data=None):
+    """
+    Send many webhook requests concurrently, with at most
+    WEBHOOKS_MAX_CONCURRENCY requests in flight, so a slow endpoint does
+    not delay the rest. `deliveries` is a list of
+    (webhook_id, url, key, data) tuples, or of
+    (webhook_id, url, key, data, serialized_data) tuples if the body of
+    each one is already rendered. `serialized_data` is the already
+    rendered body of all of them, if any.
 
-@app.task
-def delete_webhook(webhook_id, url, key, by, date, obj):
+    The logs are written and pruned once for the whole batch. A single
+    log (the one of `resend_webhook` and `test_webhook`, shown by the API)
+    is saved on its own to get its id; the logs of a batch of many are
+    inserted with bulk_create and returned without pk.
+    """
+    if not deliveries:
+        return []
+
+    deliveries = [delivery if len(delivery) == 5 else tuple(delivery) + (serialized_data,)
+                  for delivery in deliveries]
+
+    max_workers = min(getattr(settings, "WEBHOOKS_MAX_CONCURRENCY", 10), len(deliveries))
+    if max_workers == 1:
+        webhook_logs = [_deliver(*delivery) for delivery in deliveries]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            webhook_logs = list(executor.map(lambda delivery: _deliver(*delivery), deliveries))
+
+    if len(webhook_logs) == 1:
+        webhook_logs[0].save()
+    else:
+        WebhookLog.objects.bulk_create(webhook_logs)
+
+    _prune_webhook_logs(set(webhook_log.webhook_id for webhook_log in webhook_logs))
+    return webhook_logs
+
+
+def _send_request(webhook_id, url, key, data):
+    return _send_requests([(webhook_id, url, key, data)])[0]
+
+
+def make_payload(action, obj, by, date, change=None):
+    """
+    Build and render the payload of a webhook event for an object.
+    """
     data = {}
-    data['action'] = "delete"
+    data['action'] = action
     data['type'] = _get_type(obj)
     data['by'] = UserSerializer(by).data
     data['date'] = date
     data['data'] = _serialize(obj)
+    if change is not None:
+        data['change'] = _serialize(change)
 
-    return _send_request(webhook_id, url, key, data)
+    return UnicodeJSONRenderer().render(data).decode("utf-8")
 
 
 @app.task
-def change_webhook(webhook_id, url, key, by, date, obj, change):
-    data = {}
-    data['action'] = "change"
-    data['type'] = _get_type(obj)
-    data['by'] = UserSerializer(by).data
-    data['date'] = date
-    data['data'] = _serialize(obj)
-    data['change'] = _serialize(change)
+def send_webhooks(payload, webhooks):
+    """
+    Send an already rendered payload to many webhooks, given as a list
+    of {"id", "url", "key"} dicts. It is signed for every webhook.
+    """
+    data = json.loads(payload)
+    deliveries = [(webhook["id"], webhook["url"], webhook["key"], data) for webhook in webhooks]
+    return _send_requests(deliveries, serialized_data=payload.encode("utf-8"))
 
-    return _send_request(webhook_id, url, key, data)
+
+@app.task
+def send_create_webhooks_in_bulk(obj_app_label, obj_model_name, obj_ids, by_id, date, webhooks):
+    """
+    Send the "create" event of several objects of the same model (i.e.
+    created in bulk) to many webhooks. The payloads are built here, in
+    the worker, and the logs of all the deliveries are saved at once.
+    """
+    model = apps.get_model(obj_app_label, obj_model_name)
+    by = get_user_model().objects.filter(id=by_id).first()
+
+    deliveries = []
+    for obj in model.objects.filter(id__in=obj_ids).order_by("id"):
+        payload = make_payload("create", obj, by, date)
+        data = json.loads(payload)
+        deliveries += [(webhook["id"], webhook["url"], webhook["key"], data, payload.encode("utf-8"))
+                       for webhook in webhooks]
+
+    return _send_requests(deliveries)
 
 
 @app.task
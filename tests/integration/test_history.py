@@ -22,6 +22,7 @@ import datetime
 
 from unittest.mock import patch
 
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from .. import factories as f
 
@@ -143,6 +144,57 @@ def test_real_snapshot_frequency(settings):
     assert qs_partials.count() == 2
 
 
+def test_last_snapshot_is_materialized(settings):
+    settings.MAX_PARTIAL_DIFFS = 2
+
+    issue = f.IssueFactory.create()
+    key = make_key_from_model_object(issue)
+
+    for i in range(5):
+        issue.subject = "subject{}".format(i)
+        issue.save()
+        services.take_snapshot(issue, user=issue.owner)
+
+    fobj, need_real_snapshot = services.get_last_snapshot_for_key(key)
+    assert fobj.snapshot["subject"] == "subject4"
+
+    # Rebuilt from the history entries gives the same result
+    cache.clear()
+    assert services.get_last_snapshot_for_key(key) == (fobj, need_real_snapshot)
+
+
+def test_last_snapshot_ignores_stale_materialized_snapshot():
+    issue = f.IssueFactory.create()
+    key = make_key_from_model_object(issue)
+    services.take_snapshot(issue, user=issue.owner)
+
+    # An entry not created by take_snapshot, i.e. by the importer
+    HistoryEntry.objects.create(project=issue.project, key=key, type=HistoryType.change, is_snapshot=False,
+                                diff={"subject": [issue.subject, "imported subject"]},
+                                user={"pk": None, "name": ""})
+
+    fobj, need_real_snapshot = services.get_last_snapshot_for_key(key)
+    assert fobj.snapshot["subject"] == "imported subject"
+
+
+def test_take_snapshot_reuses_unchanged_rendered_markdown():
+    issue = f.IssueFactory.create(description="**description**", blocked_note="note")
+    services.take_snapshot(issue, user=issue.owner)
+
+    issue.subject = "new subject"
+    issue.save()
+
+    with patch("taiga.projects.history.freeze_impl.mdrender") as mdrender_mock:
+        services.take_snapshot(issue, user=issue.owner)
+        assert mdrender_mock.call_count == 0
+
+        issue.description = "**new description**"
+        issue.save()
+        mdrender_mock.return_value = "<p><strong>new description</strong></p>"
+        services.take_snapshot(issue, user=issue.owner)
+        assert mdrender_mock.call_count == 1
+
+
 def test_issue_resource_history_test(client):
     user = f.UserFactory.create()
     project = f.ProjectFactory.create(owner=user)
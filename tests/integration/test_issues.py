@@ -20,8 +20,6 @@
 import uuid
 import csv
 
-from unittest import mock
-
 from django.core.urlresolvers import reverse
 
 from taiga.projects.issues import services, models
@@ -51,9 +49,17 @@ Issue #1
 Issue #2
 """
 
-    with mock.patch("taiga.projects.issues.services.db") as db:
-        issues = services.create_issues_in_bulk(data)
-        db.save_in_bulk.assert_called_once_with(issues, None, None)
+    project = f.ProjectFactory.create()
+
+    issues = services.create_issues_in_bulk(data, project=project, owner=project.owner)
+
+    assert [issue.subject for issue in issues] == ["Issue #1", "Issue #2"]
+    assert len({issue.ref for issue in issues}) == 2
+    for issue in issues:
+        issue_db = models.Issue.objects.get(id=issue.id)
+        assert issue_db.ref == issue.ref
+        assert project.references.filter(object_id=issue.id, ref=issue.ref).exists()
+        assert issue_db.custom_attributes_values.attributes_values == {}
 
 
 def test_create_issue_without_status(client):
@@ -17,11 +17,16 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import datetime
 import pytest
 
 from django.core.urlresolvers import reverse
+from django.utils import timezone
 
 from taiga.base.utils import json
+from taiga.projects.milestones.models import Milestone
+from taiga.projects.tasks.models import Task
+from taiga.projects.userstories.models import RolePoints, UserStory
 from taiga.projects.userstories.serializers import UserStorySerializer
 
 from .. import factories as f
@@ -82,3 +87,56 @@ def test_list_milestones_taiga_info_headers(client):
     assert response2.has_header("Taiga-Info-Total-Opened-Milestones") == True
     assert response2["taiga-info-total-closed-milestones"] == "3"
     assert response2["taiga-info-total-opened-milestones"] == "1"
+
+
+def test_milestone_stats_counters_and_closed_points_by_date():
+    project = f.ProjectFactory.create()
+    role1 = f.RoleFactory.create(project=project)
+    role2 = f.RoleFactory.create(project=project)
+    milestone = f.MilestoneFactory.create(project=project,
+                                          estimated_start=datetime.date(2016, 1, 1),
+                                          estimated_finish=datetime.date(2016, 1, 5))
+    open_status = f.TaskStatusFactory.create(project=project, is_closed=False)
+    closed_status = f.TaskStatusFactory.create(project=project, is_closed=True)
+
+    user_story1 = f.UserStoryFactory.create(project=project, milestone=milestone)
+    user_story2 = f.UserStoryFactory.create(project=project, milestone=milestone)
+    RolePoints.objects.filter(user_story__in=[user_story1, user_story2]).delete()
+    f.RolePointsFactory.create(user_story=user_story1, role=role1,
+                               points=f.PointsFactory.create(project=project, value=2))
+    f.RolePointsFactory.create(user_story=user_story1, role=role2,
+                               points=f.PointsFactory.create(project=project, value=4))
+    f.RolePointsFactory.create(user_story=user_story2, role=role1,
+                               points=f.PointsFactory.create(project=project, value=1))
+
+    task1 = f.TaskFactory.create(project=project, milestone=milestone, user_story=user_story1,
+                                 status=closed_status)
+    task2 = f.TaskFactory.create(project=project, milestone=milestone, user_story=user_story1,
+                                 status=closed_status)
+    f.TaskFactory.create(project=project, milestone=milestone, user_story=user_story2,
+                         status=open_status, is_iocaine=True)
+
+    # Finished before the sprint start, it counts on the first day
+    Task.objects.filter(id=task1.id).update(
+        finished_date=datetime.datetime(2015, 12, 30, 12, tzinfo=timezone.utc))
+    Task.objects.filter(id=task2.id).update(
+        finished_date=datetime.datetime(2016, 1, 3, 12, tzinfo=timezone.utc))
+    UserStory.objects.filter(id=user_story1.id).update(is_closed=True)
+    UserStory.objects.filter(id=user_story2.id).update(is_closed=False)
+
+    milestone = Milestone.objects.get(id=milestone.id)
+
+    assert milestone.total_points == {role1.id: 3, role2.id: 4}
+    assert milestone.closed_points == {role1.id: 2, role2.id: 4}
+    assert milestone.get_counters() == {
+        "total_userstories": 2,
+        "completed_userstories": 1,
+        "total_tasks": 3,
+        "completed_tasks": 2,
+        "iocaine_doses": 1,
+    }
+
+    closed_points = [milestone.total_closed_points_by_date(datetime.date(2016, 1, day))
+                     for day in range(1, 6)]
+    assert closed_points == [3, 3, 6, 6, 6]
+    assert milestone.total_closed_points_by_date(datetime.date(2016, 1, 6)) == 0
@@ -30,6 +30,9 @@ from unittest.mock import MagicMock, patch
 
 from django.core.urlresolvers import reverse
 from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from .. import factories as f
 
 from taiga.base.utils import json
@@ -344,6 +347,26 @@ def test_watching_users_to_notify_on_issue_modification_6():
     assert users == {issue.owner}
 
 
+def test_users_to_notify_ids_and_emails_are_resolved_in_one_query():
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=["view_issues"])
+    member = f.MembershipFactory.create(project=project, role=role)
+    issue = f.IssueFactory.create(project=project, owner=member.user)
+    watcher = f.MembershipFactory.create(project=project, role=role).user
+    issue.add_watcher(watcher)
+    inactive = f.MembershipFactory.create(project=project, role=role, user__is_active=False).user
+    issue.add_watcher(inactive)
+    stranger = f.UserFactory.create()
+    issue.add_watcher(stranger)
+
+    ContentType.objects.get_for_model(issue)
+    with CaptureQueriesContext(connection) as captured:
+        users = services.get_user_ids_and_emails_to_notify(issue, discard_users=[member.user])
+
+    assert len(captured) == 1
+    assert set(users) == {(watcher.id, watcher.email)}
+
+
 def test_send_notifications_using_services_method_for_user_stories(settings, mail):
     settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
 
@@ -723,6 +746,50 @@ def test_send_notifications_using_services_method_for_wiki_pages(settings, mail)
         assert services.make_ms_thread_index(in_reply_to, msg_ts) == headers.get('Thread-Index')
 
 
+def test_process_sync_notifications_renders_once_per_language(settings, mail):
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
+
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=['view_issues', 'view_us', 'view_tasks', 'view_wiki_pages'])
+    changer = f.MembershipFactory.create(project=project, role=role).user
+    users = [f.MembershipFactory.create(project=project, role=role, user__lang=lang,
+                                        user__full_name="User <{}>".format(i)).user
+             for i, lang in enumerate(["en", "en", "es"])]
+
+    wiki = f.WikiPageFactory.create(project=project, owner=changer)
+    history_change = f.HistoryEntryFactory.create(
+        project=project,
+        user={"pk": changer.id},
+        comment="",
+        type=HistoryType.change,
+        key="wiki.wikipage:{}".format(wiki.id),
+        is_hidden=False,
+        diff=[]
+    )
+    take_snapshot(wiki, user=wiki.owner)
+    for user in users:
+        wiki.add_watcher(user)
+    services.send_notifications(wiki, history=history_change)
+
+    time.sleep(1)
+    with patch("taiga.base.mails.InlineCSSTemplateMail.make_email_object",
+               autospec=True, side_effect=services.InlineCSSTemplateMail.make_email_object) as render_mock:
+        stats = services.process_sync_notifications()
+
+    assert render_mock.call_count == 2
+    assert stats["notifications"] == 1
+    assert stats["emails"] == 3
+    assert models.HistoryChangeNotification.objects.count() == 0
+
+    messages = {msg.to[0]: msg for msg in mail.outbox}
+    for i, user in enumerate(users):
+        msg = messages[user.email]
+        assert "User &lt;{}&gt;".format(i) in msg.body
+        assert services._RECIPIENT_PLACEHOLDER not in msg.body
+        for content, mimetype in msg.alternatives:
+            assert "User &lt;{}&gt;".format(i) in content
+
+
 def test_resource_notification_test(client, settings, mail):
     settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
 
@@ -22,6 +22,7 @@ from django.conf import settings
 from django.core.files import File
 from django.core import mail
 from django.core import signing
+from django.db import transaction
 
 from taiga.base.utils import json
 from taiga.projects.services import stats as stats_services
@@ -39,6 +40,7 @@ from ..utils import DUMMY_BMP_DATA
 from tempfile import NamedTemporaryFile
 from easy_thumbnails.files import generate_all_aliases, get_thumbnailer
 
+import datetime
 import os.path
 import pytest
 
@@ -414,6 +416,61 @@ def test_get_closed_bugs_per_member_stats():
     assert stats["closed_tasks"][membership_2.user.id] == 0
 
 
+@pytest.mark.django_db(transaction=True)
+def test_project_stats_are_cached_until_the_project_changes():
+    project = f.ProjectFactory()
+    f.MembershipFactory(project=project, is_admin=True, user=project.owner)
+    issues_stats_mock = mock.Mock(wraps=stats_services.get_stats_for_project_issues)
+
+    stats = stats_services.get_cached_project_stats(project, "issues_stats", issues_stats_mock)
+    assert stats["total_issues"] == 0
+    stats = stats_services.get_cached_project_stats(project, "issues_stats", issues_stats_mock)
+    assert issues_stats_mock.call_count == 1
+
+    f.IssueFactory(project=project)
+    stats = stats_services.get_cached_project_stats(project, "issues_stats", issues_stats_mock)
+    assert issues_stats_mock.call_count == 2
+    assert stats["total_issues"] == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_project_stats_are_cached_until_the_day_changes():
+    project = f.ProjectFactory()
+    f.MembershipFactory(project=project, is_admin=True, user=project.owner)
+    issues_stats_mock = mock.Mock(wraps=stats_services.get_stats_for_project_issues)
+
+    real_date = datetime.date
+
+    class TomorrowDate(real_date):
+        @classmethod
+        def today(cls):
+            return real_date.today() + datetime.timedelta(days=1)
+
+    stats_services.get_cached_project_stats(project, "issues_stats", issues_stats_mock)
+    stats_services.get_cached_project_stats(project, "issues_stats", issues_stats_mock)
+    assert issues_stats_mock.call_count == 1
+
+    with mock.patch("datetime.date", TomorrowDate):
+        stats_services.get_cached_project_stats(project, "issues_stats", issues_stats_mock)
+    assert issues_stats_mock.call_count == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_project_stats_are_invalidated_once_per_transaction():
+    project = f.ProjectFactory()
+    other_project = f.ProjectFactory()
+
+    with mock.patch("taiga.projects.services.stats.invalidate_project_stats") as invalidate_mock:
+        with transaction.atomic():
+            for i in range(3):
+                f.IssueFactory(project=project)
+            f.IssueFactory(project=other_project)
+            assert invalidate_mock.call_count == 0
+
+    invalidated = [call[0][0] for call in invalidate_mock.call_args_list]
+    assert invalidated.count(project.id) == 1
+    assert invalidated.count(other_project.id) == 1
+
 def test_leave_project_valid_membership(client):
     user = f.UserFactory.create()
     project = f.ProjectFactory.create()
@@ -20,6 +20,9 @@
 import pytest
 
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.db import transaction
+from django.test.utils import CaptureQueriesContext
 
 from .. import factories
 
@@ -65,6 +68,67 @@ def test_sequences(seq):
     assert not seq.exists(seqname)
 
 
+@pytest.mark.django_db
+def test_reserve_sequence_values(seq):
+    seqname = "foo"
+    seq.create(seqname)
+
+    assert list(seq.reserve(seqname, 3)) == [1, 2, 3]
+    assert seq.next_value(seqname) == 4
+    assert list(seq.reserve(seqname, 2)) == [5, 6]
+    assert list(seq.reserve(seqname, 0)) == []
+
+    seq.delete(seqname)
+
+
+@pytest.mark.django_db
+def test_known_sequences_are_not_queried_again(seq):
+    seqname = "foo"
+    seq.create(seqname)
+
+    with CaptureQueriesContext(connection) as captured:
+        assert seq.exists(seqname)
+    assert len(captured) == 0
+
+    seq.delete(seqname)
+
+    with CaptureQueriesContext(connection) as captured:
+        assert not seq.exists(seqname)
+    assert len(captured) == 1
+
+
+@pytest.mark.django_db
+def test_sequences_of_rolled_back_savepoints_are_not_known(seq):
+    seqname = "foo"
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            seq.create(seqname)
+            assert seq.exists(seqname)
+            raise RuntimeError()
+
+    with CaptureQueriesContext(connection) as captured:
+        assert not seq.exists(seqname)
+    assert len(captured) == 1
+
+    with transaction.atomic():
+        seq.create(seqname)
+
+    with CaptureQueriesContext(connection) as captured:
+        assert seq.exists(seqname)
+    assert len(captured) == 0
+
+    seq.delete(seqname)
+
+
+@pytest.mark.django_db
+def test_unique_reference_ids_per_project(refmodels):
+    project = factories.ProjectFactory.create()
+
+    assert list(refmodels.make_unique_reference_ids(project, 3, create=True)) == [1, 2, 3]
+    assert refmodels.make_unique_reference_id(project, create=True) == 4
+
+
 @pytest.mark.django_db
 def test_unique_reference_per_project(seq, refmodels):
     project = factories.ProjectFactory.create()
@@ -134,3 +134,32 @@ def test_search_text_query_with_an_invalid_project_id(client, searches_initial_d
 
     response = client.get(reverse("search-list"), {"project": "new", "text": "future"})
     assert response.status_code == 404
+
+
+def test_search_text_query_returns_objects_of_each_type(client, searches_initial_data):
+    data = searches_initial_data
+
+    client.login(data.member1.user)
+
+    response = client.get(reverse("search-list"), {"project": data.project1.id, "text": "future"})
+    assert response.status_code == 200
+    assert {us["id"] for us in response.data["userstories"]} == {data.us11.id, data.us12.id, data.us13.id}
+    assert {task["id"] for task in response.data["tasks"]} == {data.task11.id, data.task12.id, data.task14.id}
+    assert {issue["id"] for issue in response.data["issues"]} == {data.issue11.id, data.issue12.id,
+                                                                  data.issue14.id}
+
+
+def test_search_text_query_after_update_the_object(client, searches_initial_data):
+    data = searches_initial_data
+
+    client.login(data.member1.user)
+
+    data.task13.subject = "Marty McFly"
+    data.task13.save()
+    data.wikipage11.content = "Marty McFly and Doc Brown"
+    data.wikipage11.save()
+
+    response = client.get(reverse("search-list"), {"project": data.project1.id, "text": "marty"})
+    assert response.status_code == 200
+    assert [task["id"] for task in response.data["tasks"]] == [data.task13.id]
+    assert [wikipage["id"] for wikipage in response.data["wikipages"]] == [data.wikipage11.id]
@@ -19,10 +19,16 @@
 
 import pytest
 
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
 from .. import factories as f
 from tests.utils import disconnect_signals, reconnect_signals
 
 from taiga.projects.services.stats import get_stats_for_project
+from taiga.projects.services.stats import get_stats_for_project_issues
 
 
 pytestmark = pytest.mark.django_db
@@ -174,3 +180,52 @@ def test_project_assigned_points(client, data):
     data.user_story4.save()
     project_stats = get_stats_for_project(data.project)
     assert project_stats["assigned_points_per_role"] == {data.role1.pk: 62, data.role2.pk: 1}
+
+
+def test_project_requirements_increments(client, data):
+    data.user_story1.team_requirement = True
+    data.user_story1.save()
+    data.user_story2.team_requirement = True
+    data.user_story2.client_requirement = True
+    data.user_story2.save()
+
+    # The user stories are assigned to the first milestone whose dates
+    # contain their creation date
+    project_stats = get_stats_for_project(data.project)
+    assert project_stats["milestones"][0]["team-increment"] == 0
+    assert project_stats["milestones"][1]["team-increment"] == 2
+    assert project_stats["milestones"][1]["client-increment"] == 1
+
+    data.project.milestones.update(estimated_start=F("estimated_start") + timedelta(days=1))
+    data.project.total_milestones = 4
+    project_stats = get_stats_for_project(data.project)
+    assert project_stats["milestones"][3]["team-increment"] == 2
+    assert all(milestone["team-increment"] == 0 for milestone in project_stats["milestones"][:3])
+
+
+def test_project_issues_stats(client, data):
+    severity = f.SeverityFactory(project=data.project)
+    closed_status = f.IssueStatusFactory(project=data.project, is_closed=True)
+    issue1 = f.IssueFactory(project=data.project, severity=severity, assigned_to=None)
+    f.IssueFactory(project=data.project, severity=severity, assigned_to=data.user)
+    f.IssueFactory(project=data.project, severity=severity, status=closed_status,
+                   finished_date=timezone.now())
+
+    stats = get_stats_for_project_issues(data.project)
+
+    assert stats["total_issues"] == 3
+    assert stats["closed_issues"] == 1
+    assert stats["opened_issues"] == 2
+    assert stats["issues_per_severity"][severity.id]["count"] == 3
+    assert stats["issues_per_status"][closed_status.id]["count"] == 1
+    assert stats["issues_per_assigned_to"][0]["count"] == 1
+    assert stats["issues_per_assigned_to"][data.user.id]["count"] == 1
+    assert stats["issues_per_owner"][issue1.owner.id]["name"] == issue1.owner.get_full_name()
+
+    last_four_weeks = stats["last_four_weeks_days"]
+    assert len(last_four_weeks["by_open_closed"]["open"]) == 28
+    assert last_four_weeks["by_open_closed"]["open"][-1] == 3
+    assert last_four_weeks["by_open_closed"]["closed"][-1] == 1
+    assert sum(last_four_weeks["by_open_closed"]["open"][:-1]) == 0
+    assert last_four_weeks["by_severity"][severity.id]["data"][-1] == 3
+    assert last_four_weeks["by_severity"][severity.id]["data"][-2] == 0
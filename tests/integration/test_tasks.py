@@ -20,12 +20,10 @@
 import uuid
 import csv
 
-from unittest import mock
-
 from django.core.urlresolvers import reverse
 
 from taiga.base.utils import json
-from taiga.projects.tasks import services
+from taiga.projects.tasks import services, models
 
 from .. import factories as f
 
@@ -50,9 +48,17 @@ def test_create_tasks_in_bulk(db):
 Task #1
 Task #2
 """
-    with mock.patch("taiga.projects.tasks.services.db") as db:
-        tasks = services.create_tasks_in_bulk(data)
-        db.save_in_bulk.assert_called_once_with(tasks, None, None)
+    project = f.ProjectFactory.create()
+
+    tasks = services.create_tasks_in_bulk(data, project=project, owner=project.owner)
+
+    assert [task.subject for task in tasks] == ["Task #1", "Task #2"]
+    assert len({task.ref for task in tasks}) == 2
+    for task in tasks:
+        task_db = models.Task.objects.get(id=task.id)
+        assert task_db.ref == task.ref
+        assert project.references.filter(object_id=task.id, ref=task.ref).exists()
+        assert task_db.custom_attributes_values.attributes_values == {}
 
 
 def test_create_task_without_status(client):
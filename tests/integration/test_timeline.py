@@ -19,6 +19,8 @@
 
 import pytest
 
+from django.core.urlresolvers import reverse
+
 from .. import factories
 
 from taiga.projects.history import services as history_services
@@ -67,6 +69,45 @@ def test_get_timeline():
     assert Timeline.objects.filter(object_id=user3.id).count() == 1
 
 
+def test_push_to_timelines_in_bulk():
+    Timeline.objects.all().delete()
+    user1 = factories.UserFactory()
+    user2 = factories.UserFactory()
+    task = factories.TaskFactory()
+
+    service.register_timeline_implementation("tasks.task", "test", lambda x, extra_data=None: str(id(x)))
+
+    targets = [(task.project, service.build_project_namespace(task.project)),
+               (user1, service.build_user_namespace(user1)),
+               (user2, service.build_user_namespace(user1))]
+    service._push_to_timelines_in_bulk(targets, task, "test", task.created_date)
+
+    timeline = Timeline.objects.filter(event_type="tasks.task.test")
+    assert timeline.count() == 3
+    assert timeline.filter(namespace=service.build_project_namespace(task.project)).count() == 1
+    assert timeline.filter(namespace=service.build_user_namespace(user1)).count() == 2
+    assert all(entry.data == id(task) for entry in timeline)
+
+
+def test_push_to_timelines_serialize_once_for_all_related_people():
+    calls = []
+
+    def impl(instance, extra_data=None):
+        calls.append(instance)
+        return {}
+
+    user_story = factories.UserStoryFactory.create()
+    for i in range(5):
+        user_story.add_watcher(factories.UserFactory.create())
+
+    service.register_timeline_implementation("userstories.userstory", "test", impl)
+    service.push_to_timelines(user_story.project.id, user_story.owner.id, "userstories", "userstory",
+                              user_story.id, "test", user_story.created_date)
+
+    assert len(calls) == 1
+    assert Timeline.objects.filter(event_type="userstories.userstory.test").count() == 1 + len(user_story.get_related_people())
+
+
 def test_filter_timeline_no_privileges():
     Timeline.objects.all().delete()
     user1 = factories.UserFactory()
@@ -131,6 +172,35 @@ def test_filter_timeline_private_project_member_permissions():
     assert timeline.count() == 3
 
 
+def test_filter_timeline_private_project_member_permissions_changed():
+    Timeline.objects.all().delete()
+    user1 = factories.UserFactory()
+    user2 = factories.UserFactory()
+    project = factories.ProjectFactory.create(is_private=True)
+    membership = factories.MembershipFactory.create(user=user2, project=project)
+    membership.role.permissions = []
+    membership.role.save()
+    task1= factories.TaskFactory.create(project=project)
+
+    service.register_timeline_implementation("tasks.task", "test", lambda x, extra_data=None: str(id(x)))
+    service._add_to_object_timeline(user1, task1, "test", task1.created_date)
+    timeline = Timeline.objects.filter(event_type="tasks.task.test")
+    assert service.filter_timeline_for_user(timeline, user2).count() == 0
+
+    membership.role.permissions = ["view_tasks"]
+    membership.role.save()
+    assert service.filter_timeline_for_user(timeline, user2).count() == 1
+
+    membership.is_admin = True
+    membership.role.permissions = []
+    membership.role.save()
+    membership.save()
+    assert service.filter_timeline_for_user(timeline, user2).count() == 1
+
+    membership.delete()
+    assert service.filter_timeline_for_user(timeline, user2).count() == 0
+
+
 def test_filter_timeline_private_project_member_admin():
     Timeline.objects.all().delete()
     user1 = factories.UserFactory()
@@ -520,3 +590,33 @@ def test_timeline_error_use_member_ids_instead_of_memberships_ids():
     external_user_timeline = service.get_profile_timeline(external_user)
     assert len(external_user_timeline) == 1
     assert external_user_timeline[0].event_type == "users.user.create"
+
+
+def test_project_timeline_cursor_pagination(client):
+    Timeline.objects.all().delete()
+    project = factories.ProjectFactory.create(is_private=False)
+    task = factories.TaskFactory.create(project=project)
+
+    service.register_timeline_implementation("tasks.task", "test", lambda x, extra_data=None: {})
+    for i in range(7):
+        service._add_to_object_timeline(project, task, "test", task.created_date,
+                                        namespace=service.build_project_namespace(project))
+
+    expected_ids = list(service.get_project_timeline(project).values_list("id", flat=True))
+
+    url = reverse("project-timeline-detail", kwargs={"pk": project.pk})
+    client.login(project.owner)
+
+    ids = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get(url, {"cursor": cursor, "page_size": 3})
+        assert response.status_code == 200
+        assert len(response.data) <= 3
+        ids += [entry["id"] for entry in response.data]
+        cursor = response.get("x-pagination-cursor-next", None)
+
+    assert ids == expected_ids
+
+    response = client.get(url, {"cursor": "not-a-valid-cursor"})
+    assert response.status_code == 404
@@ -22,9 +22,16 @@ import csv
 
 from unittest import mock
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from taiga.base.utils import json
+from taiga.projects.history.choices import HistoryType
+from taiga.projects.history.models import HistoryEntry
+from taiga.projects.services import rebalance_orders
 from taiga.projects.userstories import services, models
+from taiga.timeline.models import Timeline
+from taiga.timeline.service import build_project_namespace
 
 from .. import factories as f
 
@@ -43,10 +50,22 @@ def test_get_userstories_from_bulk():
 
 def test_create_userstories_in_bulk():
     data = "User Story #1\nUser Story #2\n"
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, computable=True)
 
-    with mock.patch("taiga.projects.userstories.services.db") as db:
-        userstories = services.create_userstories_in_bulk(data)
-        db.save_in_bulk.assert_called_once_with(userstories, None, None)
+    userstories = services.create_userstories_in_bulk(data, project=project, owner=project.owner,
+                                                      user=project.owner)
+
+    assert [us.subject for us in userstories] == ["User Story #1", "User Story #2"]
+    assert len({us.ref for us in userstories}) == 2
+    for us in userstories:
+        us_db = models.UserStory.objects.get(id=us.id)
+        assert us_db.ref == us.ref
+        assert project.references.filter(object_id=us.id, ref=us.ref).exists()
+        assert us_db.custom_attributes_values.attributes_values == {}
+        assert list(us_db.role_points.values_list("role_id", flat=True)) == [role.id]
+        assert HistoryEntry.objects.filter(key="userstories.userstory:{}".format(us.id),
+                                           type=HistoryType.create).count() == 1
 
 
 def test_update_userstories_order_in_bulk():
@@ -62,6 +81,37 @@ def test_update_userstories_order_in_bulk():
                                                                 models.UserStory)
 
 
+def test_rebalance_userstories_orders(settings):
+    settings.ORDERS_STRIDE = 10
+    project = f.ProjectFactory.create()
+    us1 = f.UserStoryFactory.create(project=project, backlog_order=1)
+    us2 = f.UserStoryFactory.create(project=project, backlog_order=1)
+    us3 = f.UserStoryFactory.create(project=project, backlog_order=2)
+    other_us = f.UserStoryFactory.create(backlog_order=1)
+
+    rebalance_orders("userstories.UserStory", "backlog_order", {"project_id": project.id})
+
+    orders = dict(models.UserStory.objects.values_list("id", "backlog_order"))
+    assert [orders[us1.id], orders[us2.id], orders[us3.id]] == [10, 20, 30]
+    assert orders[other_us.id] == 1
+
+
+def test_update_userstories_order_in_bulk_rebalances_long_shifts(settings):
+    settings.ORDERS_REBALANCE_THRESHOLD = 1
+    project = f.ProjectFactory.create()
+    us1 = f.UserStoryFactory.create(project=project, backlog_order=1)
+    f.UserStoryFactory.create(project=project, backlog_order=2)
+    f.UserStoryFactory.create(project=project, backlog_order=3)
+
+    with mock.patch("taiga.projects.services.bulk_update_order.connection") as connection_mock:
+        # Moved to a free position
+        services.update_userstories_order_in_bulk([{"us_id": us1.id, "order": 10}], "backlog_order", project)
+        assert not connection_mock.on_commit.called
+
+        # Moved before the others, shifting both of them
+        services.update_userstories_order_in_bulk([{"us_id": us1.id, "order": 2}], "backlog_order", project)
+        assert connection_mock.on_commit.call_count == 1
+
 def test_create_userstory_with_watchers(client):
     user = f.UserFactory.create()
     user_watcher = f.UserFactory.create()
@@ -775,3 +825,97 @@ def test_get_user_stories_including_attachments(client):
     response = client.get(url)
     assert response.status_code == 200
     assert len(response.data[0].get("attachments")) == 1
+
+
+def test_filters_data_are_counted_in_a_single_query():
+    project = f.ProjectFactory.create()
+    user1 = f.UserFactory.create()
+    f.MembershipFactory.create(user=user1, project=project)
+    user2 = f.UserFactory.create()
+    f.MembershipFactory.create(user=user2, project=project)
+    status1 = f.UserStoryStatusFactory.create(project=project)
+    status2 = f.UserStoryStatusFactory.create(project=project)
+
+    f.UserStoryFactory.create(project=project, owner=user1, assigned_to=user1, status=status1)
+    f.UserStoryFactory.create(project=project, owner=user1, assigned_to=None, status=status2)
+    f.UserStoryFactory.create(project=project, owner=user2, assigned_to=user2, status=status2)
+
+    queryset = models.UserStory.objects.filter(project=project)
+    querysets = {
+        "statuses": queryset.filter(assigned_to=user1),
+        "assigned_to": queryset.filter(status=status2),
+        "owners": queryset,
+        "tags": queryset.filter(assigned_to=user1, status=status2),
+    }
+
+    with CaptureQueriesContext(connection) as captured:
+        data = services.get_userstories_filters_data(project, querysets)
+
+    assert len(captured) == 1
+    assert list(data.keys()) == ["statuses", "assigned_to", "owners", "tags"]
+
+    statuses = {status["id"]: status["count"] for status in data["statuses"]}
+    assert statuses[status1.id] == 1
+    assert statuses[status2.id] == 0
+
+    assigned_to = {user["id"]: user["count"] for user in data["assigned_to"]}
+    assert assigned_to[None] == 1
+    assert assigned_to[user1.id] == 0
+    assert assigned_to[user2.id] == 1
+
+    owners = {user["id"]: user["count"] for user in data["owners"]}
+    assert owners == {user1.id: 2, user2.id: 1}
+
+
+def test_filters_data_do_not_count_other_projects():
+    project = f.ProjectFactory.create()
+    user = f.UserFactory.create()
+    f.MembershipFactory.create(user=user, project=project)
+    status = f.UserStoryStatusFactory.create(project=project)
+    f.UserStoryFactory.create(project=project, owner=user, assigned_to=user, status=status)
+
+    other_project = f.ProjectFactory.create()
+    f.MembershipFactory.create(user=user, project=other_project)
+    other_status = f.UserStoryStatusFactory.create(project=other_project)
+    f.UserStoryFactory.create(project=other_project, owner=user, assigned_to=user, status=other_status)
+    f.UserStoryFactory.create(project=other_project, owner=user, assigned_to=user, status=other_status)
+
+    # Even with querysets not filtered by project
+    queryset = models.UserStory.objects.all()
+    querysets = {
+        "statuses": queryset,
+        "assigned_to": queryset,
+        "owners": queryset,
+        "tags": queryset,
+    }
+
+    data = services.get_userstories_filters_data(project, querysets)
+
+    statuses = {value["id"]: value["count"] for value in data["statuses"]}
+    assert statuses[status.id] == 1
+    assert other_status.id not in statuses
+
+    assigned_to = {value["id"]: value["count"] for value in data["assigned_to"]}
+    assert assigned_to[user.id] == 1
+
+    owners = {value["id"]: value["count"] for value in data["owners"]}
+    assert owners == {user.id: 1}
+
+def test_create_userstories_in_bulk_queries_do_not_grow_with_the_number_of_stories():
+    project = f.ProjectFactory.create()
+    f.MembershipFactory.create(project=project, user=project.owner, is_admin=True)
+    f.RoleFactory.create(project=project, computable=True)
+
+    def create_userstories(count):
+        data = "\n".join("User Story #{}".format(i) for i in range(count))
+        with CaptureQueriesContext(connection) as captured:
+            services.create_userstories_in_bulk(data, project=project, owner=project.owner,
+                                                user=project.owner)
+        return len(captured)
+
+    # The first creation fills the caches (content types, sequences...)
+    create_userstories(2)
+
+    assert create_userstories(5) == create_userstories(20)
+    assert Timeline.objects.filter(namespace=build_project_namespace(project),
+                                   event_type="userstories.userstory.create").count() == 27
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2016 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2016 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2016 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2016 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# Copyright (C) 2014-2016 Anler Hernández <hello@anler.me>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from .. import factories as f
+
+from taiga.webhooks import tasks
+from taiga.webhooks.models import WebhookLog
+
+pytestmark = pytest.mark.django_db
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append((self.path, self.headers["X-TAIGA-WEBHOOK-SIGNATURE"], body))
+
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.yield_fixture
+def stub_server():
+    server = HTTPServer(("127.0.0.1", 0), StubHandler)
+    server.received = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_send_requests_delivers_all_the_webhooks(settings, stub_server):
+    settings.WEBHOOKS_MAX_CONCURRENCY = 4
+    url = "http://127.0.0.1:{}/hook".format(stub_server.server_port)
+    webhooks = f.WebhookFactory.create_batch(6, url=url)
+
+    deliveries = [(webhook.id, webhook.url, webhook.key, {"n": i}) for i, webhook in enumerate(webhooks)]
+    webhook_logs = tasks._send_requests(deliveries)
+
+    assert len(stub_server.received) == 6
+    assert [webhook_log.status for webhook_log in webhook_logs] == [200] * 6
+    assert WebhookLog.objects.filter(webhook__in=webhooks).count() == 6
+
+    body = tasks.UnicodeJSONRenderer().render({"n": 0})
+    assert ("/hook", tasks._generate_signature(body, webhooks[0].key), body) in stub_server.received
+
+
+def test_send_request_retries_on_server_errors(settings, stub_server):
+    settings.WEBHOOKS_RETRY_BACKOFF = 0
+    settings.WEBHOOKS_MAX_RETRIES = 2
+    stub_server.statuses = [500, 502]
+    webhook = f.WebhookFactory.create(url="http://127.0.0.1:{}/hook".format(stub_server.server_port))
+
+    webhook_log = tasks._send_request(webhook.id, webhook.url, webhook.key, {"test": "test"})
+
+    assert len(stub_server.received) == 3
+    assert webhook_log.status == 200
+    assert webhook_log.id is not None
+
+
+def test_send_requests_only_keeps_the_last_logs(stub_server):
+    webhook = f.WebhookFactory.create(url="http://127.0.0.1:{}/hook".format(stub_server.server_port))
+    f.WebhookLogFactory.create_batch(tasks.WEBHOOK_LOGS_KEPT, webhook=webhook)
+
+    tasks._send_requests([(webhook.id, webhook.url, webhook.key, {"n": i}) for i in range(3)])
+
+    assert WebhookLog.objects.filter(webhook=webhook).count() == tasks.WEBHOOK_LOGS_KEPT
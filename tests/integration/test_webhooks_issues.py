@@ -36,11 +36,11 @@ def test_webhooks_when_create_issue(settings):
 
     obj = f.IssueFactory.create(project=project)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "create"
         assert data["type"] == "issue"
         assert data["by"]["id"] == obj.owner.id
@@ -56,18 +56,18 @@ def test_webhooks_when_update_issue(settings):
 
     obj = f.IssueFactory.create(project=project)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
     obj.subject = "test webhook update"
     obj.save()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "issue"
         assert data["by"]["id"] == obj.owner.id
@@ -87,11 +87,11 @@ def test_webhooks_when_delete_issue(settings):
 
     obj = f.IssueFactory.create(project=project)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, delete=True)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "delete"
         assert data["type"] == "issue"
         assert data["by"]["id"] == obj.owner.id
@@ -107,19 +107,19 @@ def test_webhooks_when_update_issue_attachments(settings):
 
     obj = f.IssueFactory.create(project=project)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
     # Create attachments
     attachment1 = f.IssueAttachmentFactory(project=obj.project, content_object=obj, owner=obj.owner)
     attachment2 = f.IssueAttachmentFactory(project=obj.project, content_object=obj, owner=obj.owner)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "issue"
         assert data["by"]["id"] == obj.owner.id
@@ -134,11 +134,11 @@ def test_webhooks_when_update_issue_attachments(settings):
     attachment1.description = "new attachment description"
     attachment1.save()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "issue"
         assert data["by"]["id"] == obj.owner.id
@@ -152,11 +152,11 @@ def test_webhooks_when_update_issue_attachments(settings):
     # Delete attachment
     attachment2.delete()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "issue"
         assert data["by"]["id"] == obj.owner.id
@@ -181,9 +181,9 @@ def test_webhooks_when_update_issue_custom_attributes(settings):
     custom_attr_2 = f.IssueCustomAttributeFactory(project=obj.project)
     ct2_id = "{}".format(custom_attr_2.id)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
     # Create custom attributes
     obj.custom_attributes_values.attributes_values = {
@@ -192,11 +192,11 @@ def test_webhooks_when_update_issue_custom_attributes(settings):
     }
     obj.custom_attributes_values.save()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "issue"
         assert data["by"]["id"] == obj.owner.id
@@ -211,11 +211,11 @@ def test_webhooks_when_update_issue_custom_attributes(settings):
     obj.custom_attributes_values.attributes_values[ct1_id] = "test_2_updated"
     obj.custom_attributes_values.save()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "issue"
         assert data["by"]["id"] == obj.owner.id
@@ -230,11 +230,11 @@ def test_webhooks_when_update_issue_custom_attributes(settings):
     del obj.custom_attributes_values.attributes_values[ct1_id]
     obj.custom_attributes_values.save()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "issue"
         assert data["by"]["id"] == obj.owner.id
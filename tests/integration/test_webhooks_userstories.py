@@ -24,13 +24,12 @@ from unittest.mock import Mock
 from .. import factories as f
 
 from taiga.projects.history import services
+from taiga.webhooks import tasks
 
 
 pytestmark = pytest.mark.django_db(transaction=True)
 
 
-from taiga.base.utils import json
-
 def test_webhooks_when_create_user_story(settings):
     settings.WEBHOOKS_ENABLED = True
     project = f.ProjectFactory()
@@ -39,11 +38,11 @@ def test_webhooks_when_create_user_story(settings):
 
     obj = f.UserStoryFactory.create(project=project)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "create"
         assert data["type"] == "userstory"
         assert data["by"]["id"] == obj.owner.id
@@ -59,18 +58,18 @@ def test_webhooks_when_update_user_story(settings):
 
     obj = f.UserStoryFactory.create(project=project)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
     obj.subject = "test webhook update"
     obj.save()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "userstory"
         assert data["by"]["id"] == obj.owner.id
@@ -90,11 +89,11 @@ def test_webhooks_when_delete_user_story(settings):
 
     obj = f.UserStoryFactory.create(project=project)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, delete=True)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "delete"
         assert data["type"] == "userstory"
         assert data["by"]["id"] == obj.owner.id
@@ -110,19 +109,19 @@ def test_webhooks_when_update_user_story_attachments(settings):
 
     obj = f.UserStoryFactory.create(project=project)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
     # Create attachments
     attachment1 = f.UserStoryAttachmentFactory(project=obj.project, content_object=obj, owner=obj.owner)
     attachment2 = f.UserStoryAttachmentFactory(project=obj.project, content_object=obj, owner=obj.owner)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "userstory"
         assert data["by"]["id"] == obj.owner.id
@@ -137,11 +136,11 @@ def test_webhooks_when_update_user_story_attachments(settings):
     attachment1.description = "new attachment description"
     attachment1.save()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "userstory"
         assert data["by"]["id"] == obj.owner.id
@@ -155,11 +154,11 @@ def test_webhooks_when_update_user_story_attachments(settings):
     # Delete attachment
     attachment2.delete()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "userstory"
         assert data["by"]["id"] == obj.owner.id
@@ -184,9 +183,9 @@ def test_webhooks_when_update_user_story_custom_attributes(settings):
     custom_attr_2 = f.UserStoryCustomAttributeFactory(project=obj.project)
     ct2_id = "{}".format(custom_attr_2.id)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
     # Create custom attributes
     obj.custom_attributes_values.attributes_values = {
@@ -195,11 +194,11 @@ def test_webhooks_when_update_user_story_custom_attributes(settings):
     }
     obj.custom_attributes_values.save()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "userstory"
         assert data["by"]["id"] == obj.owner.id
@@ -214,11 +213,11 @@ def test_webhooks_when_update_user_story_custom_attributes(settings):
     obj.custom_attributes_values.attributes_values[ct1_id] = "test_2_updated"
     obj.custom_attributes_values.save()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "userstory"
         assert data["by"]["id"] == obj.owner.id
@@ -233,11 +232,11 @@ def test_webhooks_when_update_user_story_custom_attributes(settings):
     del obj.custom_attributes_values.attributes_values[ct1_id]
     obj.custom_attributes_values.save()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner, comment="test_comment")
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "userstory"
         assert data["by"]["id"] == obj.owner.id
@@ -265,19 +264,19 @@ def test_webhooks_when_update_user_story_points(settings):
     obj = f.UserStoryFactory.create(project=project)
     obj.role_points.all().delete()
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
     # Set points
     f.RolePointsFactory.create(user_story=obj, role=role1, points=points1)
     f.RolePointsFactory.create(user_story=obj, role=role2, points=points2)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "userstory"
         assert data["by"]["id"] == obj.owner.id
@@ -292,11 +291,11 @@ def test_webhooks_when_update_user_story_points(settings):
     # Change points
     obj.role_points.all().update(points=points3)
 
-    with patch('taiga.webhooks.tasks._send_request') as send_request_mock:
+    with patch('taiga.webhooks.tasks._send_requests') as send_request_mock:
         services.take_snapshot(obj, user=obj.owner)
-        assert send_request_mock.call_count == 2
+        assert len(send_request_mock.call_args[0][0]) == 2
 
-        (webhook_id, url, key, data) = send_request_mock.call_args[0]
+        (webhook_id, url, key, data) = send_request_mock.call_args[0][0][-1]
         assert data["action"] == "change"
         assert data["type"] == "userstory"
         assert data["by"]["id"] == obj.owner.id
@@ -307,3 +306,26 @@ def test_webhooks_when_update_user_story_points(settings):
         assert data["change"]["diff"]["points"][role1.name]["to"] == points3.name
         assert data["change"]["diff"]["points"][role2.name]["from"] == points2.name
         assert data["change"]["diff"]["points"][role2.name]["to"] == points3.name
+
+
+def test_webhooks_payload_is_serialized_once(settings):
+    settings.WEBHOOKS_ENABLED = True
+    project = f.ProjectFactory()
+    f.WebhookFactory.create(project=project, key="key1")
+    f.WebhookFactory.create(project=project, key="key2")
+
+    obj = f.UserStoryFactory.create(project=project)
+
+    with patch('taiga.webhooks.tasks._serialize', wraps=tasks._serialize) as serialize_mock, \
+         patch('taiga.webhooks.tasks.requests.Session.send') as session_send_mock:
+        session_send_mock.return_value = Mock(status_code=200, headers={}, content="ok")
+        session_send_mock.return_value.elapsed.total_seconds.return_value = 1
+        services.take_snapshot(obj, user=obj.owner)
+
+        assert serialize_mock.call_count == 1
+        assert session_send_mock.call_count == 2
+
+        signatures = {call[0][0].headers["X-TAIGA-WEBHOOK-SIGNATURE"] for call in session_send_mock.call_args_list}
+        bodies = {call[0][0].body for call in session_send_mock.call_args_list}
+        assert len(bodies) == 1
+        assert signatures == {tasks._generate_signature(bodies.pop(), key) for key in ("key1", "key2")}
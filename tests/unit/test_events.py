@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014-2016 Andrey Antukh <niwi@niwi.nz>
+# Copyright (C) 2014-2016 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014-2016 David Barragán <bameda@dbarragan.com>
+# Copyright (C) 2014-2016 Alejandro Alonso <alejandro.alonso@kaleidos.net>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest.mock import patch, MagicMock
+
+from taiga.base.utils import json
+
+from taiga.events.backends import get_events_backend
+from taiga.events.backends import rabbitmq
+
+
+def test_get_events_backend_is_reused():
+    backend1 = get_events_backend("taiga.events.backends.rabbitmq.EventsPushBackend", {"url": "//guest:guest@host/"})
+    backend2 = get_events_backend("taiga.events.backends.rabbitmq.EventsPushBackend", {"url": "//guest:guest@host/"})
+    backend3 = get_events_backend("taiga.events.backends.rabbitmq.EventsPushBackend", {"url": "//guest:guest@other/"})
+    assert backend1 is backend2
+    assert backend1 is not backend3
+
+
+def test_rabbitmq_backend_reuses_the_connection_and_the_exchanges():
+    with patch("taiga.events.backends.rabbitmq._make_rabbitmq_connection") as make_connection_mock:
+        backend = rabbitmq.EventsPushBackend(url="//guest:guest@host/")
+        backend.emit_event("message1", routing_key="changes.project.1.userstories")
+        backend.emit_events([("message2", "changes.project.1.tasks", "events"),
+                             ("message3", "changes.project.1.tasks", "events")])
+
+        assert make_connection_mock.call_count == 1
+        channel = make_connection_mock.return_value.channel.return_value
+        assert channel.exchange_declare.call_count == 1
+        assert channel.basic_publish.call_count == 3
+
+
+def test_rabbitmq_backend_reconnects_after_a_failure():
+    with patch("taiga.events.backends.rabbitmq._make_rabbitmq_connection") as make_connection_mock:
+        broken_connection = MagicMock()
+        broken_connection.channel.return_value.basic_publish.side_effect = IOError
+        make_connection_mock.side_effect = [broken_connection, MagicMock()]
+
+        backend = rabbitmq.EventsPushBackend(url="//guest:guest@host/")
+        backend.emit_event("message", routing_key="changes.project.1.userstories")
+
+        assert make_connection_mock.call_count == 2
+        assert broken_connection.close.called
+
+
+def test_rabbitmq_backend_retries_only_the_events_not_sent():
+    with patch("taiga.events.backends.rabbitmq._make_rabbitmq_connection") as make_connection_mock:
+        broken_connection = MagicMock()
+        broken_connection.channel.return_value.basic_publish.side_effect = [None, IOError]
+        new_connection = MagicMock()
+        make_connection_mock.side_effect = [broken_connection, new_connection]
+
+        backend = rabbitmq.EventsPushBackend(url="//guest:guest@host/")
+        backend.emit_events([("message1", "changes.project.1.tasks", "events"),
+                             ("message2", "changes.project.1.tasks", "events"),
+                             ("message3", "changes.project.1.tasks", "events")])
+
+        channel = new_connection.channel.return_value
+        messages = [call[0][0] for call in channel.basic_publish.call_args_list]
+        assert [message.body for message in messages] == ["message2", "message3"]
+
+
+def test_change_events_are_coalesced_per_transaction():
+    from taiga.events import signal_handlers
+
+    connection_mock = MagicMock(run_on_commit=[])
+    connection_mock.on_commit.side_effect = lambda func: connection_mock.run_on_commit.append(([], func))
+
+    instances = [MagicMock(_importing=False, project_id=1, pk=pk) for pk in (1, 2, 1, 3)]
+
+    with patch.object(signal_handlers, "connection", connection_mock), \
+         patch.object(signal_handlers, "get_typename_for_model_instance", return_value="userstories.userstory"), \
+         patch.object(signal_handlers.events, "emit_events_for_ids") as emit_mock:
+        for instance in instances:
+            signal_handlers._queue_event(instance, type="change", sessionid="session")
+        signal_handlers._queue_event(instances[0], type="delete", sessionid="session")
+
+        assert connection_mock.on_commit.call_count == 1
+        assert not emit_mock.called
+
+        # Commit
+        for sids, func in connection_mock.run_on_commit:
+            func()
+
+    emit_mock.assert_called_once_with([([1, 2, 3], "userstories.userstory", 1, "change", "session"),
+                                       (1, "userstories.userstory", 1, "delete", "session")])
+
+
+def test_big_change_events_are_split_to_fit_the_payload_limit():
+    from taiga.events import events
+
+    ids = list(range(1000, 3000))
+    messages = events._make_messages_for_ids(ids, "userstories.userstory", 1, "change", "session",
+                                             max_size=7999)
+
+    assert len(messages) > 1
+    assert all(len(message.encode("utf-8")) <= 7999 for message, routing_key in messages)
+    assert all(routing_key == "changes.project.1.userstories" for message, routing_key in messages)
+    assert sum(len(json.loads(message)["data"]["pk"]) for message, routing_key in messages) == len(ids)
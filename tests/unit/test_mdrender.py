@@ -20,7 +20,8 @@
 from unittest.mock import patch, MagicMock
 
 from taiga.mdrender.extensions import emojify
-from taiga.mdrender.service import render, cache_by_sha, get_diff_of_htmls, render_and_extract
+from taiga.mdrender.service import (render, cache_by_sha, get_diff_of_htmls, render_and_extract, batch_render,
+                                    _get_markdown, RenderCache)
 
 from datetime import datetime
 
@@ -42,12 +43,13 @@ def test_proccessor_invalid_emoji():
 def test_mentions_valid_username():
     with patch("taiga.mdrender.extensions.mentions.get_user_model") as get_user_model_mock:
         dummy_uuser = MagicMock()
+        dummy_uuser.username = "hermione"
         dummy_uuser.get_full_name.return_value = "Hermione Granger"
-        get_user_model_mock.return_value.objects.get = MagicMock(return_value=dummy_uuser)
+        get_user_model_mock.return_value.objects.filter = MagicMock(return_value=[dummy_uuser])
 
         result = render(dummy_project, "text @hermione text")
 
-        get_user_model_mock.return_value.objects.get.assert_called_with(username="hermione")
+        get_user_model_mock.return_value.objects.filter.assert_called_with(username__in={"hermione"})
         assert result == ('<p>text <a class="mention" href="http://localhost:9001/profile/hermione" '
                           'title="Hermione Granger">@hermione</a> text</p>')
 
@@ -55,12 +57,13 @@ def test_mentions_valid_username():
 def test_mentions_valid_username_with_points():
     with patch("taiga.mdrender.extensions.mentions.get_user_model") as get_user_model_mock:
         dummy_uuser = MagicMock()
+        dummy_uuser.username = "luna.lovegood"
         dummy_uuser.get_full_name.return_value = "Luna Lovegood"
-        get_user_model_mock.return_value.objects.get = MagicMock(return_value=dummy_uuser)
+        get_user_model_mock.return_value.objects.filter = MagicMock(return_value=[dummy_uuser])
 
         result = render(dummy_project, "text @luna.lovegood text")
 
-        get_user_model_mock.return_value.objects.get.assert_called_with(username="luna.lovegood")
+        get_user_model_mock.return_value.objects.filter.assert_called_with(username__in={"luna.lovegood"})
         assert result == ('<p>text <a class="mention" href="http://localhost:9001/profile/luna.lovegood" '
                           'title="Luna Lovegood">@luna.lovegood</a> text</p>')
 
@@ -68,19 +71,38 @@ def test_mentions_valid_username_with_points():
 def test_mentions_valid_username_with_dash():
     with patch("taiga.mdrender.extensions.mentions.get_user_model") as get_user_model_mock:
         dummy_uuser = MagicMock()
+        dummy_uuser.username = "super-ginny"
         dummy_uuser.get_full_name.return_value = "Ginny Weasley"
-        get_user_model_mock.return_value.objects.get = MagicMock(return_value=dummy_uuser)
+        get_user_model_mock.return_value.objects.filter = MagicMock(return_value=[dummy_uuser])
 
         result = render(dummy_project, "text @super-ginny text")
 
-        get_user_model_mock.return_value.objects.get.assert_called_with(username="super-ginny")
+        get_user_model_mock.return_value.objects.filter.assert_called_with(username__in={"super-ginny"})
         assert result == ('<p>text <a class="mention" href="http://localhost:9001/profile/super-ginny" '
                           'title="Ginny Weasley">@super-ginny</a> text</p>')
 
 
+def test_mentions_are_resolved_with_a_single_query():
+    with patch("taiga.mdrender.extensions.mentions.get_user_model") as get_user_model_mock:
+        harry = MagicMock(username="harry")
+        harry.get_full_name.return_value = "Harry Potter"
+        ron = MagicMock(username="ron")
+        ron.get_full_name.return_value = "Ron Weasley"
+        get_user_model_mock.return_value.objects.filter = MagicMock(return_value=[harry, ron])
+
+        (result, extracted) = render_and_extract(dummy_project, "@harry @ron @harry and @voldemort")
+
+        get_user_model_mock.return_value.objects.filter.assert_called_once_with(
+            username__in={"harry", "ron", "voldemort"})
+        assert not get_user_model_mock.return_value.objects.get.called
+        assert extracted["mentions"] == [harry, ron, harry]
+        assert "@voldemort" in result
+
+
 def test_proccessor_valid_us_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
+    with patch("taiga.mdrender.extensions.references.get_instances_by_refs") as mock:
+        instance = MagicMock()
+        mock.return_value = {1: instance}
         instance.content_type.model = "userstory"
         instance.content_object.subject = "test"
         result = render(dummy_project, "**#1**")
@@ -89,8 +111,9 @@ def test_proccessor_valid_us_reference():
 
 
 def test_proccessor_valid_issue_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
+    with patch("taiga.mdrender.extensions.references.get_instances_by_refs") as mock:
+        instance = MagicMock()
+        mock.return_value = {2: instance}
         instance.content_type.model = "issue"
         instance.content_object.subject = "test"
         result = render(dummy_project, "**#2**")
@@ -99,8 +122,9 @@ def test_proccessor_valid_issue_reference():
 
 
 def test_proccessor_valid_task_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
+    with patch("taiga.mdrender.extensions.references.get_instances_by_refs") as mock:
+        instance = MagicMock()
+        mock.return_value = {3: instance}
         instance.content_type.model = "task"
         instance.content_object.subject = "test"
         result = render(dummy_project, "**#3**")
@@ -109,8 +133,9 @@ def test_proccessor_valid_task_reference():
 
 
 def test_proccessor_invalid_type_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
+    with patch("taiga.mdrender.extensions.references.get_instances_by_refs") as mock:
+        instance = MagicMock()
+        mock.return_value = {4: instance}
         instance.content_type.model = "other"
         instance.content_object.subject = "test"
         result = render(dummy_project, "**#4**")
@@ -118,8 +143,8 @@ def test_proccessor_invalid_type_reference():
 
 
 def test_proccessor_invalid_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        mock.return_value = None
+    with patch("taiga.mdrender.extensions.references.get_instances_by_refs") as mock:
+        mock.return_value = {}
         result = render(dummy_project, "**#5**")
         assert result == "<p><strong>#5</strong></p>"
 
@@ -227,6 +252,82 @@ def test_cache_by_sha():
     assert result1 == result3
 
 
+def test_render_cache_evicts_the_least_recently_used_texts():
+    render_cache = RenderCache(max_size=2, timeout=60)
+    keys = [render_cache.make_key(dummy_project, text) for text in ("a", "b", "c")]
+
+    with patch("taiga.mdrender.service.cache") as shared_cache:
+        shared_cache.get.return_value = None
+        render_cache.set(keys[0], "A")
+        render_cache.set(keys[1], "B")
+        assert render_cache.get(keys[0]) == "A"
+        render_cache.set(keys[2], "C")
+
+        assert render_cache.get(keys[1]) is None
+        assert render_cache.get(keys[0]) == "A"
+        assert render_cache.get(keys[2]) == "C"
+        shared_cache.set.assert_called_with(keys[2], "C", timeout=60)
+
+    assert render_cache.stats == {"local_hits": 3, "shared_hits": 0, "misses": 1, "evictions": 1}
+
+
+def test_render_cache_key_is_versioned():
+    with patch("taiga.mdrender.service.RENDER_CACHE_VERSION", 1):
+        key1 = RenderCache().make_key(dummy_project, "test")
+    with patch("taiga.mdrender.service.RENDER_CACHE_VERSION", 2):
+        key2 = RenderCache().make_key(dummy_project, "test")
+    assert key1 != key2
+
+
+def test_render_cache_local_entries_expire():
+    render_cache = RenderCache(max_size=2, timeout=60)
+    key = render_cache.make_key(dummy_project, "a")
+
+    with patch("taiga.mdrender.service.cache") as shared_cache, \
+            patch("taiga.mdrender.service.time") as mock_time:
+        shared_cache.get.return_value = None
+        mock_time.time.return_value = 1000
+        render_cache.set(key, "A")
+
+        mock_time.time.return_value = 1059
+        assert render_cache.get(key) == "A"
+
+        mock_time.time.return_value = 1060
+        assert render_cache.get(key) is None
+
+    assert render_cache.stats == {"local_hits": 1, "shared_hits": 0, "misses": 1, "evictions": 0}
+    assert len(render_cache._local) == 0
+
+
+def test_markdown_engine_is_reused_and_bound_to_the_project():
+    other_project = MagicMock()
+    other_project.id = 2
+    other_project.slug = "other"
+
+    md1 = _get_markdown(dummy_project)
+    assert md1.project == dummy_project
+
+    md2 = _get_markdown(other_project)
+    assert md2 is md1
+    assert md2.project == other_project
+
+    expected_result = "<p><a class=\"reference wiki\" href=\"http://localhost:9001/project/other/wiki/reused\" title=\"reused\">reused</a></p>"
+    assert render(other_project, "[[reused]]") == expected_result
+    expected_result = "<p><a class=\"reference wiki\" href=\"http://localhost:9001/project/test/wiki/reused\" title=\"reused\">reused</a></p>"
+    assert render(dummy_project, "[[reused]]") == expected_result
+
+
+def test_batch_render_renders_each_text_once():
+    with patch("taiga.mdrender.service._get_markdown") as get_markdown_mock:
+        get_markdown_mock.return_value.convert.side_effect = lambda text: "<p>{}</p>".format(text)
+
+        with batch_render():
+            result = [render(dummy_project, text) for text in ["batch-1", "batch-2", "batch-1"]]
+
+        assert result == ["<p>batch-1</p>", "<p>batch-2</p>", "<p>batch-1</p>"]
+        assert get_markdown_mock.call_count == 2
+
+
 def test_get_diff_of_htmls_insertions():
     result = get_diff_of_htmls("", "<p>test</p>")
     assert result == "<ins style=\"background:#e6ffe6;\">&lt;p&gt;test&lt;/p&gt;</ins>"
@@ -243,8 +344,9 @@ def test_get_diff_of_htmls_modifications():
 
 
 def test_render_and_extract_references():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
+    with patch("taiga.mdrender.extensions.references.get_instances_by_refs") as mock:
+        instance = MagicMock()
+        mock.return_value = {1: instance}
         instance.content_type.model = "issue"
         instance.content_object.subject = "test"
         (_, extracted) = render_and_extract(dummy_project, "**#1**")
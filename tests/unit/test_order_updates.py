@@ -163,3 +163,39 @@ def test_apply_order_updates_multiple_elements_duplicated_orders():
         "e": 5,
         "f": 6
     }
+
+
+def test_apply_order_updates_stops_shifting_in_gaps():
+    orders = {
+        "a": 1,
+        "b": 2,
+        "c": 3,
+        "d": 5,
+        "e": 6,
+        "f": 10
+    }
+    new_orders = {
+        "f": 2
+    }
+    apply_order_updates(orders, new_orders)
+    assert orders == {
+        "f": 2,
+        "b": 3,
+        "c": 4
+    }
+
+
+def test_apply_order_updates_spaced_orders_only_move_the_element():
+    orders = {
+        "a": 1000,
+        "b": 2000,
+        "c": 3000,
+        "d": 4000
+    }
+    new_orders = {
+        "d": 1001
+    }
+    apply_order_updates(orders, new_orders)
+    assert orders == {
+        "d": 1001
+    }
@@ -23,7 +23,10 @@ import django_sites as sites
 import re
 
 from taiga.base.utils.urls import get_absolute_url, is_absolute_url, build_url
-from taiga.base.utils.db import save_in_bulk, update_in_bulk, to_tsquery
+from taiga.base.utils.db import save_in_bulk, update_in_bulk, update_attr_in_bulk_for_ids, to_tsquery
+from taiga.projects.userstories.models import UserStory
+
+from .. import factories as f
 
 pytestmark = pytest.mark.django_db
 
@@ -107,3 +110,21 @@ def test_to_tsquery():
         expected = re.sub("([0-9])", r"'\1':*", expected)
         actual = to_tsquery(input)
         assert actual == expected
+
+
+def test_update_attr_in_bulk_for_ids():
+    project = f.ProjectFactory.create()
+    other_project = f.ProjectFactory.create()
+    milestone = f.MilestoneFactory.create(project=project)
+    us1 = f.UserStoryFactory.create(project=project, milestone=milestone, backlog_order=1)
+    us2 = f.UserStoryFactory.create(project=project, milestone=None, backlog_order=2)
+    us3 = f.UserStoryFactory.create(project=other_project, milestone=None, backlog_order=3)
+
+    update_attr_in_bulk_for_ids({us1.id: 30, us2.id: 20, us3.id: 10}, "backlog_order", UserStory,
+                                filters={"project_id": project.id}, chunk_size=1)
+    orders = dict(UserStory.objects.values_list("id", "backlog_order"))
+    assert orders == {us1.id: 30, us2.id: 20, us3.id: 3}
+
+    update_attr_in_bulk_for_ids({us1.id: None, us2.id: milestone.id}, "milestone_id", UserStory)
+    milestones = dict(UserStory.objects.values_list("id", "milestone_id"))
+    assert milestones == {us1.id: None, us2.id: milestone.id, us3.id: None}